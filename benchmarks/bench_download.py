@@ -0,0 +1,108 @@
+"""
+Peak memory of media downloads by media size.
+
+A local server streams media of every --sizes (in MiB) and each download runs in a fresh
+process, whose peak RSS is reported. "buffered" reads the whole body before writing it,
+like download_media used to; "sync" and "async" are the streaming WhatsApp and
+AsyncWhatsApp download_media.
+
+Usage:
+    python benchmarks/bench_download.py [--sizes 10 50 200]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCK = os.urandom(1024 * 1024)
+
+
+def serve() -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            size = int(self.path.strip("/"))
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(size * len(BLOCK)))
+            self.end_headers()
+            for _ in range(size):
+                self.wfile.write(BLOCK)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def child(mode: str, url: str, path: str) -> None:
+    from whatsapp import WhatsApp, AsyncWhatsApp
+
+    options = dict(token="benchmark", phone_number_id={1: "123456"}, offline=True)
+    if mode == "buffered":
+        wa = WhatsApp(**options)
+        wa.session.trust_env = False
+        content = wa._request("GET", url).content
+        with open(path + ".mp4", "wb") as f:
+            f.write(content)
+    elif mode == "sync":
+        wa = WhatsApp(**options)
+        wa.session.trust_env = False
+        wa.download_media(url, "video/mp4", path)
+    else:
+
+        async def main():
+            async with AsyncWhatsApp(**options) as wa:
+                await wa.download_media(url, "video/mp4", path)
+
+        asyncio.run(main())
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    server = serve()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    modes = ("buffered", "sync", "async")
+    print("peak RSS in MiB")
+    print(f"{'size MiB':>10}" + "".join(f"{mode:>12}" for mode in modes))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            row = []
+            for mode in modes:
+                out = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--child",
+                        mode,
+                        f"{base_url}/{size}",
+                        os.path.join(directory, "media"),
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                row.append(int(out.split()[-1]) / 1024)
+            print(f"{size:>10}" + "".join(f"{rss:12.1f}" for rss in row))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
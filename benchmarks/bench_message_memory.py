@@ -0,0 +1,119 @@
+"""
+Memory held by received messages, measured with tracemalloc.
+
+Every message is built from its own decoded webhook delivery, like the webhook does,
+and the delivery is then only referenced by the message. "dict" replays the previous
+Message layout (instance __dict__, full payload and eagerly copied fields), "slots"
+is the current Message and "slots, keep_data=False" drops the payload after parsing.
+
+Usage:
+    python benchmarks/bench_message_memory.py [--count 100000]
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from whatsapp import WhatsApp, Message
+from whatsapp.ext._parser import MEDIA_TYPES, parse
+
+
+def delivery(i: int) -> bytes:
+    message = {
+        "from": "5511999999999",
+        "id": f"wamid.{i:032d}",
+        "timestamp": "1700000000",
+    }
+    if i % 2:
+        message.update(type="text", text={"body": f"Hello number {i}"})
+    else:
+        message.update(
+            type="image",
+            image={"id": str(i), "mime_type": "image/jpeg", "sha256": "x" * 44},
+        )
+    return json.dumps(
+        {
+            "object": "whatsapp_business_account",
+            "entry": [
+                {
+                    "id": "waba",
+                    "changes": [
+                        {
+                            "field": "messages",
+                            "value": {
+                                "messaging_product": "whatsapp",
+                                "metadata": {
+                                    "display_phone_number": "15550000000",
+                                    "phone_number_id": "123456",
+                                },
+                                "contacts": [
+                                    {
+                                        "profile": {"name": "Alice"},
+                                        "wa_id": "5511999999999",
+                                    }
+                                ],
+                                "messages": [message],
+                            },
+                        }
+                    ],
+                }
+            ],
+        }
+    ).encode()
+
+
+class DictMessage:
+    """The previous Message layout: a __dict__ instance with eagerly copied fields."""
+
+    def __init__(self, data: dict, instance: WhatsApp):
+        self.instance = instance
+        self.url = instance.url
+        self.headers = instance.headers
+        self.data = data
+        self.rec = "individual"
+        event = parse(data)
+        self.id = event.id
+        self.type = event.type
+        self.to = event.mobile
+        self.content = event.content
+        self.name = event.name
+        self.author = event.author
+        if event.type in MEDIA_TYPES:
+            setattr(self, event.type, event.media)
+
+
+def measure(build, payloads) -> int:
+    gc.collect()
+    tracemalloc.start()
+    messages = [build(json.loads(payload)) for payload in payloads]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del messages
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    wa = WhatsApp("benchmark", {1: "123456"}, offline=True, logger=False)
+    payloads = [delivery(i) for i in range(args.count)]
+    print(f"{args.count} messages")
+    print(f"{'layout':<28}{'total MiB':>12}{'bytes/message':>16}")
+    for name, build in (
+        ("dict", lambda data: DictMessage(data, wa)),
+        ("slots", lambda data: Message(instance=wa, data=data)),
+        (
+            "slots, keep_data=False",
+            lambda data: Message(instance=wa, data=data, keep_data=False),
+        ),
+    ):
+        size = measure(build, payloads)
+        print(f"{name:<28}{size / 2**20:12.1f}{size / args.count:16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Micro-benchmark of the per-message cost of parsing a webhook payload.
+
+"before" replays what Message.__init__ used to do: six get_* calls, each walking
+data["entry"][0]["changes"][0]["value"] again inside its own try/except, plus the
+get_author call made by reply(). "after" is the single-pass parser used now by
+Message and by the get_* helpers.
+
+Usage:
+    python benchmarks/bench_parse.py [--number 200000]
+"""
+
+import argparse
+import timeit
+
+from whatsapp import WhatsApp, Message
+from whatsapp.ext._parser import parse
+
+PAYLOADS = {
+    "text": {"type": "text", "text": {"body": "Hello"}},
+    "image": {
+        "type": "image",
+        "image": {"id": "1234", "mime_type": "image/jpeg", "sha256": "x"},
+    },
+    "interactive": {
+        "type": "interactive",
+        "interactive": {
+            "type": "button_reply",
+            "button_reply": {"id": "b1", "title": "Yes"},
+        },
+    },
+}
+
+
+def payload(message: dict) -> dict:
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "waba",
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "messaging_product": "whatsapp",
+                            "metadata": {"phone_number_id": "123"},
+                            "contacts": [
+                                {"profile": {"name": "Alice"}, "wa_id": "5511999999999"}
+                            ],
+                            "messages": [
+                                {
+                                    "from": "5511999999999",
+                                    "id": "wamid.benchmark",
+                                    "timestamp": "1700000000",
+                                    **message,
+                                }
+                            ],
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def legacy(data: dict) -> None:
+    def value():
+        return data["entry"][0]["changes"][0]["value"]
+
+    fields = {}
+    for name, getter in (
+        ("id", lambda: value()["messages"][0]["id"]),
+        ("type", lambda: value()["messages"][0]["type"]),
+        ("to", lambda: value()["contacts"][0]["wa_id"]),
+        ("content", lambda: value()["messages"][0]["text"]["body"]),
+        ("name", lambda: value()["contacts"][0]["profile"]["name"]),
+        ("author", lambda: value()["messages"][0]["from"]),
+    ):
+        try:
+            fields[name] = getter()
+        except Exception:
+            fields[name] = None
+    kind = fields["type"]
+    try:
+        if "messages" in value() and kind in value()["messages"][0]:
+            fields[kind] = value()["messages"][0][kind]
+    except Exception:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    wa = WhatsApp("benchmark", {1: "123456"}, offline=True, logger=False)
+    print(f"{'payload':<12}{'before':>12}{'after':>12}{'Message()':>12}  (ns/message)")
+    for name, message in PAYLOADS.items():
+        data = payload(message)
+        results = [
+            min(timeit.repeat(lambda: fn(data), number=args.number, repeat=3))
+            / args.number
+            * 1e9
+            for fn in (legacy, parse, lambda d: Message(instance=wa, data=d))
+        ]
+        print(f"{name:<12}" + "".join(f"{ns:12.0f}" for ns in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark of the sync client with and without the pooled keep-alive session.
+
+A local HTTPS stand-in of the Graph API is started on 127.0.0.1 with a throwaway
+self-signed certificate (requires the openssl binary), then the same number of
+send_template calls are made through a client reusing its pooled session and
+through a client opening a new session (new TCP + TLS handshake) for every request.
+
+Usage:
+    python benchmarks/bench_pooling.py [--requests 300] [--threads 1]
+"""
+
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from whatsapp import WhatsApp
+
+RESPONSE = json.dumps(
+    {
+        "messaging_product": "whatsapp",
+        "contacts": [{"input": "5511999999999", "wa_id": "5511999999999"}],
+        "messages": [{"id": "wamid.benchmark"}],
+    }
+).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+class _UnpooledSession:
+    """Opens a new session for every request, like the bare requests.post calls used to."""
+
+    def __init__(self, verify: str):
+        self.verify = verify
+
+    def request(self, method, url, **kwargs):
+        with requests.Session() as session:
+            session.trust_env = False
+            return session.request(method, url, verify=self.verify, **kwargs)
+
+
+def _certificate(directory: str):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl",
+            "req",
+            "-x509",
+            "-newkey",
+            "rsa:2048",
+            "-nodes",
+            "-days",
+            "1",
+            "-subj",
+            "/CN=127.0.0.1",
+            "-addext",
+            "subjectAltName=IP:127.0.0.1",
+            "-keyout",
+            key,
+            "-out",
+            cert,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def serve_https(cert: str, key: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(client: WhatsApp, total: int, threads: int) -> float:
+    def send(i):
+        client.send_template("hello_world", "5511999999999")
+
+    start = time.perf_counter()
+    if threads == 1:
+        for i in range(total):
+            send(i)
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(send, range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = _certificate(directory)
+        server = serve_https(cert, key)
+        base_url = f"https://127.0.0.1:{server.server_address[1]}/v20.0"
+
+        client = WhatsApp(
+            token="benchmark",
+            phone_number_id={1: "123456"},
+            update_check=False,
+            version="v20.0",
+            base_url=base_url,
+            logger=False,
+            pool_maxsize=max(args.threads, 10),
+        )
+        # the certificate is self-signed: don't let REQUESTS_CA_BUNDLE override it
+        client.session.trust_env = False
+        client.session.verify = cert
+        pooled = run(client, args.requests, args.threads)
+
+        client.session = _UnpooledSession(cert)
+        unpooled = run(client, args.requests, args.threads)
+        server.shutdown()
+
+    print(f"requests: {args.requests}, threads: {args.threads}")
+    print(f"without pooling: {unpooled:10.1f} req/s")
+    print(f"with pooling:    {pooled:10.1f} req/s ({pooled / unpooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
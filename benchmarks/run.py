@@ -0,0 +1,607 @@
+"""
+Benchmark suite of the clients, run against the local Graph API emulator (whatsapp.emulator).
+
+    send        messages per second of a send_template loop, WhatsApp.send_template_bulk
+                and AsyncWhatsApp.send_template_bulk
+    webhook     deliveries per second through the FastAPI hook (parse + dispatch), in process
+    message     cost of building a Message from a delivery
+    startup     WhatsApp.__init__ and AsyncWhatsApp.__init__ time
+    media       upload and download throughput of both clients
+    outbox      messages per second of WhatsApp.send_template_bulk without an outbox and with a
+                SQLite outbox in synchronous NORMAL and FULL mode
+    batch       messages per second of the bulk sends of both clients, one request per message
+                and coalesced into Graph API batch calls (batch=True)
+    transport   messages per second of the bulk sends of both clients with their default
+                transport (requests, aiohttp) and with httpx (HTTP/2 when h2 is installed)
+    prepared    CPU time per message of send_template and of send_prepared with the same
+                template, body encoding by requests included but no network, and of the
+                payload alone: dict built and encoded per message, or PreparedMessage.render
+
+Every benchmark runs --repeat times and the median of each metric is kept. The results are
+written to benchmarks/results/<version>+dev.json (or --output) with the Python version,
+platform and git commit, then compared with the results of the latest released version stored
+there (or --compare): metrics worse by more than --threshold are reported as regressions, and
+--fail exits with status 1. The development tree carries the version of the last release, so
+its results are named <version>+dev and are never used as a baseline; --release names them
+<version>.json instead, to store the baseline of a release from its tagged tree. An existing
+results file is only overwritten with --force.
+
+The measurements the emulator can't make have their own scripts in benchmarks/:
+    bench_pooling.py            pooled and unpooled sends over HTTPS (TCP + TLS handshakes)
+    bench_parse.py              webhook parse cost of the previous getters and of the parser
+    bench_message_memory.py     memory held by 100k received messages, with tracemalloc
+    bench_download.py           peak RSS of media downloads by media size
+
+Usage:
+    python benchmarks/run.py [--only send media] [--repeat 3] [--quick] [--compare FILE] [--fail]
+    python benchmarks/run.py --no-save --fail     # check a change against the stored baseline
+    python benchmarks/run.py --release            # baseline of a release, from its tagged tree
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+import requests
+
+from whatsapp import WhatsApp, AsyncWhatsApp, Message, PreparedMessage, Slot
+from whatsapp.constants import VERSION
+from whatsapp.emulator import GraphEmulator
+from whatsapp.ext._bulk import template_message
+from whatsapp.transport import HttpxTransport, Transport, http2_available
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# name: (unit, True if higher is better)
+METRICS: Dict[str, Tuple[str, bool]] = {
+    "send.sync_loop": ("msg/s", True),
+    "send.sync_bulk": ("msg/s", True),
+    "send.async_bulk": ("msg/s", True),
+    "webhook.deliveries": ("deliveries/s", True),
+    "message.construct": ("us", False),
+    "startup.sync": ("us", False),
+    "startup.async": ("us", False),
+    "media.sync_upload": ("MiB/s", True),
+    "media.sync_download": ("MiB/s", True),
+    "media.async_upload": ("MiB/s", True),
+    "media.async_download": ("MiB/s", True),
+    "outbox.none": ("msg/s", True),
+    "outbox.normal": ("msg/s", True),
+    "outbox.full": ("msg/s", True),
+    "batch.sync_requests": ("msg/s", True),
+    "batch.sync_batched": ("msg/s", True),
+    "batch.async_requests": ("msg/s", True),
+    "batch.async_batched": ("msg/s", True),
+    "transport.sync_requests": ("msg/s", True),
+    "transport.sync_httpx": ("msg/s", True),
+    "transport.async_aiohttp": ("msg/s", True),
+    "transport.async_httpx": ("msg/s", True),
+    "prepared.send_template": ("us", False),
+    "prepared.send_prepared": ("us", False),
+    "prepared.encode_dict": ("us", False),
+    "prepared.render": ("us", False),
+}
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Dict[str, float]]] = {}
+
+
+def benchmark(function):
+    BENCHMARKS[function.__name__.replace("bench_", "")] = function
+    return function
+
+
+def client_options(emulator: GraphEmulator) -> dict:
+    return dict(
+        token="benchmark",
+        phone_number_id={1: "123456"},
+        offline=True,
+        logger=False,
+        base_url=emulator.base_url,
+    )
+
+
+def sync_client(emulator: GraphEmulator, **kwargs) -> WhatsApp:
+    wa = WhatsApp(**client_options(emulator), **kwargs)
+    if wa.session is not None:
+        wa.session.trust_env = False
+    return wa
+
+
+def delivery(i: int) -> dict:
+    """A webhook delivery holding one text message."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "waba",
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "messaging_product": "whatsapp",
+                            "metadata": {
+                                "display_phone_number": "15550000000",
+                                "phone_number_id": "123456",
+                            },
+                            "contacts": [
+                                {"profile": {"name": "User"}, "wa_id": "5511999999999"}
+                            ],
+                            "messages": [
+                                {
+                                    "from": "5511999999999",
+                                    "id": f"wamid.{i:032d}",
+                                    "timestamp": "1700000000",
+                                    "type": "text",
+                                    "text": {"body": f"Hello number {i}"},
+                                }
+                            ],
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+
+
+@benchmark
+def bench_send(args: argparse.Namespace) -> Dict[str, float]:
+    recipients = [f"55119{i:08d}" for i in range(args.messages)]
+    with GraphEmulator(latency=args.latency, record=False) as emulator:
+        wa = sync_client(emulator, pool_maxsize=args.concurrency)
+        # the one-at-a-time loop is slow, time a tenth of the recipients
+        sample = recipients[: max(1, args.messages // 10)]
+        start = time.perf_counter()
+        for recipient in sample:
+            wa.send_template("hello_world", recipient)
+        loop = len(sample) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = wa.send_template_bulk(
+            "hello_world", recipients, concurrency=args.concurrency
+        )
+        bulk = len(recipients) / (time.perf_counter() - start)
+        assert all(r.ok for r in results)
+
+        async def run_async() -> float:
+            async with AsyncWhatsApp(**client_options(emulator)) as client:
+                start = time.perf_counter()
+                results = await client.send_template_bulk(
+                    "hello_world", recipients, concurrency=args.concurrency
+                )
+                assert all(r.ok for r in results)
+                return len(recipients) / (time.perf_counter() - start)
+
+        async_bulk = asyncio.run(run_async())
+    return {
+        "send.sync_loop": loop,
+        "send.sync_bulk": bulk,
+        "send.async_bulk": async_bulk,
+    }
+
+
+@benchmark
+def bench_webhook(args: argparse.Namespace) -> Dict[str, float]:
+    import httpx
+
+    wa = WhatsApp("benchmark", {1: "123456"}, offline=True, logger=False)
+    received = []
+
+    async def on_message(message):
+        received.append(message.id)
+
+    wa.on_message(on_message)
+    bodies = [json.dumps(delivery(i)).encode() for i in range(args.deliveries)]
+
+    async def run() -> float:
+        transport = httpx.ASGITransport(app=wa.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://hook") as c:
+            headers = {"Content-Type": "application/json"}
+            start = time.perf_counter()
+            for body in bodies:
+                r = await c.post("/", content=body, headers=headers)
+                assert r.status_code == 200
+            return len(bodies) / (time.perf_counter() - start)
+
+    rate = asyncio.run(run())
+    assert len(received) == len(bodies)
+    return {"webhook.deliveries": rate}
+
+
+@benchmark
+def bench_message(args: argparse.Namespace) -> Dict[str, float]:
+    wa = WhatsApp("benchmark", {1: "123456"}, offline=True, logger=False)
+    data = delivery(0)
+    number = args.number
+    seconds = timeit.timeit(lambda: Message(instance=wa, data=data), number=number)
+    return {"message.construct": seconds / number * 1e6}
+
+
+@benchmark
+def bench_startup(args: argparse.Namespace) -> Dict[str, float]:
+    kwargs = dict(
+        token="benchmark",
+        phone_number_id={1: "123456"},
+        logger=False,
+        version="v20.0",
+        update_check=False,
+    )
+    number = max(1, args.number // 100)
+    results = {}
+    for name, cls in (("startup.sync", WhatsApp), ("startup.async", AsyncWhatsApp)):
+        seconds = timeit.timeit(lambda: cls(**kwargs), number=number)
+        results[name] = seconds / number * 1e6
+    return results
+
+
+@benchmark
+def bench_media(args: argparse.Namespace) -> Dict[str, float]:
+    size = args.media_size * 1024 * 1024
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "video.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        with GraphEmulator(record=False) as emulator:
+            wa = sync_client(emulator)
+            start = time.perf_counter()
+            media_id = wa.upload_media(path)["id"]
+            sync_upload = time.perf_counter() - start
+            url = wa.query_media_url(media_id)
+            start = time.perf_counter()
+            wa.download_media(url, "video/mp4", io.BytesIO())
+            sync_download = time.perf_counter() - start
+
+            async def run_async() -> Tuple[float, float]:
+                async with AsyncWhatsApp(**client_options(emulator)) as client:
+                    start = time.perf_counter()
+                    media_id = (await client.upload_media(path))["id"]
+                    upload = time.perf_counter() - start
+                    media = await client.query_media_url(media_id)
+                    start = time.perf_counter()
+                    await client.download_media(media["url"], "video/mp4", io.BytesIO())
+                    return upload, time.perf_counter() - start
+
+            async_upload, async_download = asyncio.run(run_async())
+    mib = size / 1024 / 1024
+    return {
+        "media.sync_upload": mib / sync_upload,
+        "media.sync_download": mib / sync_download,
+        "media.async_upload": mib / async_upload,
+        "media.async_download": mib / async_download,
+    }
+
+
+@benchmark
+def bench_outbox(args: argparse.Namespace) -> Dict[str, float]:
+    from whatsapp.outbox import Outbox
+
+    recipients = [f"55119{i:08d}" for i in range(args.messages)]
+    rates = {}
+    with GraphEmulator(latency=args.latency, record=False) as emulator:
+        with tempfile.TemporaryDirectory() as directory:
+            for mode in ("none", "normal", "full"):
+                outbox = None
+                if mode != "none":
+                    path = os.path.join(directory, f"{mode}.db")
+                    outbox = Outbox(path, synchronous=mode.upper())
+                wa = sync_client(emulator, pool_maxsize=args.concurrency, outbox=outbox)
+                start = time.perf_counter()
+                results = wa.send_template_bulk(
+                    "hello_world", recipients, concurrency=args.concurrency
+                )
+                if outbox is not None:
+                    outbox.flush()
+                rates[f"outbox.{mode}"] = len(recipients) / (
+                    time.perf_counter() - start
+                )
+                assert all(r.ok for r in results)
+                if outbox is not None:
+                    outbox.close()
+    return rates
+
+
+@benchmark
+def bench_batch(args: argparse.Namespace) -> Dict[str, float]:
+    recipients = [f"55119{i:08d}" for i in range(args.messages)]
+    rates = {}
+    with GraphEmulator(latency=args.latency, record=False) as emulator:
+        for batch in (False, True):
+            name = "batched" if batch else "requests"
+            wa = sync_client(emulator, pool_maxsize=args.concurrency, batch=batch)
+            start = time.perf_counter()
+            results = wa.send_template_bulk(
+                "hello_world", recipients, concurrency=args.concurrency
+            )
+            rates[f"batch.sync_{name}"] = len(recipients) / (
+                time.perf_counter() - start
+            )
+            assert all(r.ok for r in results)
+
+            async def run_async() -> float:
+                async with AsyncWhatsApp(
+                    **client_options(emulator), batch=batch
+                ) as client:
+                    start = time.perf_counter()
+                    results = await client.send_template_bulk(
+                        "hello_world", recipients, concurrency=args.concurrency * 4
+                    )
+                    assert all(r.ok for r in results)
+                    return len(recipients) / (time.perf_counter() - start)
+
+            rates[f"batch.async_{name}"] = asyncio.run(run_async())
+    return rates
+
+
+@benchmark
+def bench_transport(args: argparse.Namespace) -> Dict[str, float]:
+    recipients = [f"55119{i:08d}" for i in range(args.messages)]
+    rates = {}
+    with GraphEmulator(latency=args.latency, record=False) as emulator:
+        httpx = HttpxTransport(
+            http2=http2_available(), max_connections=args.concurrency, trust_env=False
+        )
+        for name, transport in (("requests", None), ("httpx", httpx)):
+            wa = sync_client(
+                emulator, pool_maxsize=args.concurrency, transport=transport
+            )
+            start = time.perf_counter()
+            results = wa.send_template_bulk(
+                "hello_world", recipients, concurrency=args.concurrency
+            )
+            rates[f"transport.sync_{name}"] = len(recipients) / (
+                time.perf_counter() - start
+            )
+            assert all(r.ok for r in results)
+            wa.transport.close()
+
+        for name, transport in (("aiohttp", None), ("httpx", "httpx")):
+
+            async def run_async() -> float:
+                async with AsyncWhatsApp(
+                    **client_options(emulator), transport=transport
+                ) as client:
+                    start = time.perf_counter()
+                    results = await client.send_template_bulk(
+                        "hello_world", recipients, concurrency=args.concurrency * 4
+                    )
+                    assert all(r.ok for r in results)
+                    return len(recipients) / (time.perf_counter() - start)
+
+            rates[f"transport.async_{name}"] = asyncio.run(run_async())
+    return rates
+
+
+class EncodingTransport(Transport):
+    """Encodes every request like requests does before sending it, and answers it without a network."""
+
+    def __init__(self):
+        self.response = requests.Response()
+        self.response.status_code = 200
+        self.response._content = json.dumps({"messages": [{"id": "wamid.1"}]}).encode()
+
+    def send(self, method: str, url: str, kwargs: dict) -> requests.Response:
+        request = requests.Request(
+            method,
+            url,
+            headers=kwargs.get("headers"),
+            json=kwargs.get("json"),
+            data=kwargs.get("data"),
+        )
+        request.prepare()
+        return self.response
+
+
+@benchmark
+def bench_prepared(args: argparse.Namespace) -> Dict[str, float]:
+    components = [
+        {
+            "type": "body",
+            "parameters": [
+                {"type": "text", "text": "Ana"},
+                {"type": "text", "text": "#12345"},
+            ],
+        }
+    ]
+    slots = [
+        {
+            "type": "body",
+            "parameters": [
+                {"type": "text", "text": Slot("name")},
+                {"type": "text", "text": Slot("order")},
+            ],
+        }
+    ]
+    prepared = PreparedMessage.template("order_shipped", slots)
+    wa = WhatsApp(
+        "benchmark",
+        {1: "123456"},
+        offline=True,
+        logger=False,
+        transport=EncodingTransport(),
+    )
+    number = args.number
+    # process time: the CPU spent on a message, whatever the threads of the client
+    timings = {
+        "prepared.send_template": lambda: wa.send_template(
+            "order_shipped", "5511999999999", components
+        ),
+        "prepared.send_prepared": lambda: wa.send_prepared(
+            prepared, "5511999999999", name="Ana", order="#12345"
+        ),
+        "prepared.encode_dict": lambda: json.dumps(
+            dict(
+                template_message("order_shipped", components, "en_US"),
+                to="5511999999999",
+            )
+        ).encode(),
+        "prepared.render": lambda: prepared.render(
+            "5511999999999", name="Ana", order="#12345"
+        ),
+    }
+    results = {}
+    for name, function in timings.items():
+        timer = timeit.Timer(function, timer=time.process_time)
+        results[name] = timer.timeit(number=number) / number * 1e6
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def version_key(path: str) -> Tuple[int, ...]:
+    name = os.path.basename(path)[: -len(".json")]
+    return tuple(int(p) if p.isdigit() else 0 for p in name.split("."))
+
+
+def is_release(path: str) -> bool:
+    """Whether a results file is the baseline of a release, not of a development tree."""
+    name = os.path.basename(path)[: -len(".json")]
+    return all(p.isdigit() for p in name.split("."))
+
+
+def previous_results(exclude: str) -> str:
+    """
+    Returns the stored results of the latest released version up to the one of the package,
+    if any, leaving out the file the results are written to.
+    """
+    if not os.path.isdir(RESULTS):
+        return ""
+    files = [
+        os.path.join(RESULTS, name)
+        for name in os.listdir(RESULTS)
+        if name.endswith(".json")
+    ]
+    current = version_key(f"{VERSION}.json")
+    older = [
+        p
+        for p in files
+        if is_release(p)
+        and version_key(p) <= current
+        and os.path.abspath(p) != os.path.abspath(exclude)
+    ]
+    return max(older, key=version_key) if older else ""
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    """Prints the change of every metric and returns the names of the regressions."""
+    regressions = []
+    for name, value in results.items():
+        unit, higher_is_better = METRICS[name]
+        if name not in baseline:
+            print(f"{name:24} {value:12.1f} {unit:13} (new)")
+            continue
+        before = baseline[name]["value"]
+        change = (value - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:24} {value:12.1f} {unit:13} {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--deliveries", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--media-size", type=int, default=16, help="MiB")
+    parser.add_argument("--output")
+    parser.add_argument(
+        "--release", action="store_true", help="store the results as <version>.json"
+    )
+    parser.add_argument("--compare", help="results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument(
+        "--force", action="store_true", help="overwrite an existing results file"
+    )
+    parser.add_argument("--fail", action="store_true", help="exit 1 on regressions")
+    args = parser.parse_args()
+    version = VERSION if args.release else f"{VERSION}+dev"
+    if args.output is None:
+        args.output = os.path.join(RESULTS, f"{version}.json")
+    if not args.no_save and not args.force and os.path.exists(args.output):
+        parser.error(
+            f"{args.output} already exists, pass --force to overwrite it, "
+            "--output to write the results elsewhere or --no-save"
+        )
+    if args.quick:
+        args.messages, args.deliveries, args.number = 200, 200, 2000
+        args.media_size = 2
+
+    results: Dict[str, float] = {}
+    for name in args.only or list(BENCHMARKS):
+        runs = [BENCHMARKS[name](args) for _ in range(args.repeat)]
+        for metric in runs[0]:
+            results[metric] = statistics.median(run[metric] for run in runs)
+
+    baseline_path = args.compare or previous_results(
+        "" if args.no_save else args.output
+    )
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)["results"]
+        print(f"compared with {baseline_path}")
+    regressions = compare(results, baseline, args.threshold)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        report = {
+            "version": version,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": args.repeat,
+            "quick": args.quick,
+            "results": {},
+        }
+        # metrics of the benchmarks left out by --only are kept from the previous run
+        if os.path.exists(args.output):
+            with open(args.output) as f:
+                report["results"].update(json.load(f)["results"])
+        for name, value in results.items():
+            report["results"][name] = {
+                "value": round(value, 3),
+                "unit": METRICS[name][0],
+                "higher_is_better": METRICS[name][1],
+            }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"results written to {args.output}")
+
+    if regressions and args.fail:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
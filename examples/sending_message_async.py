@@ -12,8 +12,6 @@ if __name__ == "__main__":
     )
     async def run_test():
         response = await msg.send()
-        while not response.done():
-            await asyncio.sleep(.1)
-        print(response.result())
+        print(response)
         
     asyncio.run(run_test())
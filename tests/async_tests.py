@@ -8,9 +8,11 @@ load_dotenv()
 token = getenv("GRAPH_API_TOKEN")
 phone_number_id = {1: getenv("TEST_PHONE_NUMBER_ID")}
 dest_phone_number = getenv("DEST_PHONE_NUMBER")
+# set it to the base_url printed by `python -m whatsapp.emulator` to run without the real API
+base_url = getenv("GRAPH_API_URL", "")
 
-app = AsyncWhatsApp(token=token, phone_number_id=phone_number_id, update_check=False, logger=True, debug=True)
-syncapp = WhatsApp(token=token, phone_number_id=phone_number_id, update_check=False, logger=True, debug=True)
+app = AsyncWhatsApp(token=token, phone_number_id=phone_number_id, base_url=base_url, update_check=False, logger=True, debug=True)
+syncapp = WhatsApp(token=token, phone_number_id=phone_number_id, base_url=base_url, update_check=False, logger=True, debug=True)
 loop = asyncio.get_event_loop()
 msg = app.create_message(to=dest_phone_number, content="Hello world")
 
@@ -99,9 +101,7 @@ async def run_test():
         dest_phone_number,
         sender=1,
     )
-    while not v.done():
-        await asyncio.sleep(1)
-    try: app.handle(v.result())
+    try: app.handle(v)
     except Exception as error:
         print(f"error: {error}")
     print("sending wrong button")
@@ -113,9 +113,7 @@ async def run_test():
         dest_phone_number,
         sender=1,
     )
-    while not v.done():
-        await asyncio.sleep(1)
-    try: app.handle(v.result())
+    try: app.handle(v)
     except Exception as error:  
         print(f"error: {error}")
         raise Exception("Error")
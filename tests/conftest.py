@@ -0,0 +1,212 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Callable, Union
+import pytest
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.emulator import GraphEmulator
+
+
+@pytest.fixture
+def emulator():
+    with GraphEmulator(token="token") as emulator:
+        yield emulator
+
+
+def client(emulator: GraphEmulator, token: str = "token", **kwargs) -> WhatsApp:
+    """A WhatsApp client of the emulator, with the phone numbers 1 and 2."""
+    wa = WhatsApp(
+        token,
+        {1: "123", 2: "456"},
+        offline=True,
+        base_url=emulator.base_url,
+        **kwargs,
+    )
+    if wa.session is not None:
+        # the emulator is local, proxies of the environment must not be used
+        wa.session.trust_env = False
+    return wa
+
+
+def async_client(
+    emulator: GraphEmulator, token: str = "token", **kwargs
+) -> AsyncWhatsApp:
+    """An AsyncWhatsApp client of the emulator, with the phone numbers 1 and 2."""
+    return AsyncWhatsApp(
+        token,
+        {1: "123", 2: "456"},
+        offline=True,
+        base_url=emulator.base_url,
+        **kwargs,
+    )
+
+
+class FakeResponse:
+    """
+    Answer of a FakeSession, with the interface of a requests and of an aiohttp response.
+
+    json() returns a coroutine when the response comes from an awaitable session.
+    """
+
+    def __init__(
+        self, status: int = 200, body: Any = None, headers: dict = None, text: str = ""
+    ):
+        self.status_code = self.status = status
+        self.ok = 200 <= status < 300
+        self.body = {} if body is None else body
+        self.headers = headers or {}
+        self.text = text
+        self.awaitable = False
+
+    def json(self, content_type=None):
+        if self.awaitable:
+            return self._json()
+        return self.body
+
+    async def _json(self):
+        return self.body
+
+    async def read(self):
+        return json.dumps(self.body).encode()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    """
+    Stands in for the requests session of WhatsApp, or the aiohttp session of AsyncWhatsApp
+    when awaitable is True.
+
+    Every request is answered with the next scripted response, raised if it is an exception,
+    then with answer(method, url, kwargs) if given, else with an empty 200. Requests take
+    delay seconds, and the session records what was sent and the most requests in flight.
+    """
+
+    closed = False
+
+    def __init__(
+        self,
+        *responses: Union[FakeResponse, Exception],
+        answer: Callable[[str, str, dict], FakeResponse] = None,
+        awaitable: bool = False,
+        delay: float = 0,
+    ):
+        self.responses = list(responses)
+        self.answer = answer
+        self.awaitable = awaitable
+        self.delay = delay
+        # (time.monotonic(), url) of every request
+        self.sent = []
+        # the data and the json of every request, files are read
+        self.bodies = []
+        self.payloads = []
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs):
+        if self.awaitable:
+            return _AsyncRequest(self, method, url, kwargs)
+        self._start(url, kwargs)
+        try:
+            time.sleep(self.delay)
+            return self._respond(method, url, kwargs)
+        finally:
+            self._end()
+
+    def _start(self, url: str, kwargs: dict) -> None:
+        data = kwargs.get("data")
+        with self._lock:
+            self.sent.append((time.monotonic(), url))
+            self.bodies.append(data.read() if hasattr(data, "read") else data)
+            self.payloads.append(kwargs.get("json"))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _end(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _respond(self, method: str, url: str, kwargs: dict) -> FakeResponse:
+        if self.responses:
+            response = self.responses.pop(0)
+        elif self.answer is not None:
+            response = self.answer(method, url, kwargs)
+        else:
+            response = FakeResponse()
+        if isinstance(response, Exception):
+            raise response
+        response.awaitable = self.awaitable
+        return response
+
+
+class _AsyncRequest:
+    def __init__(self, session: FakeSession, method: str, url: str, kwargs: dict):
+        self.session, self.method, self.url, self.kwargs = session, method, url, kwargs
+
+    async def __aenter__(self) -> FakeResponse:
+        self.session._start(self.url, self.kwargs)
+        try:
+            await asyncio.sleep(self.session.delay)
+            return self.session._respond(self.method, self.url, self.kwargs)
+        finally:
+            self.session._end()
+
+    async def __aexit__(self, *args):
+        pass
+
+
+def received_message(
+    content: Any = "hi", id: str = "wamid.1", author: str = "111", type: str = "text"
+) -> dict:
+    """A message sent by a user: content is the text, or the object of the other types."""
+    return {
+        "from": author,
+        "id": id,
+        "timestamp": "1700000000",
+        "type": type,
+        type: {"body": content} if type == "text" else content,
+    }
+
+
+def status_update(id: str = "wamid.out", status: str = "delivered") -> dict:
+    """A status of a message sent by the business."""
+    return {"id": id, "status": status, "timestamp": "1700000000", "recipient_id": "1"}
+
+
+def contact(wa_id: str = "111", name: str = "Alice") -> dict:
+    return {"profile": {"name": name}, "wa_id": wa_id}
+
+
+def webhook_value(messages=(), statuses=(), contacts=None) -> dict:
+    """Value of a change of the messages field, the contacts default to Alice (111)."""
+    value = {
+        "messaging_product": "whatsapp",
+        "metadata": {"display_phone_number": "15550000000", "phone_number_id": "123"},
+    }
+    if messages:
+        value["contacts"] = [contact()] if contacts is None else contacts
+        value["messages"] = list(messages)
+    if statuses:
+        value["statuses"] = list(statuses)
+    return value
+
+
+def delivery(*values: dict) -> dict:
+    """A webhook delivery with one entry per value."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {"id": "waba", "changes": [{"field": "messages", "value": value}]}
+            for value in values
+        ],
+    }
+
+
+def text_delivery(id: str = "wamid.1", statuses=()) -> dict:
+    """A webhook delivery of one text message from Alice, and the statuses given."""
+    return delivery(webhook_value([received_message(id=id)], statuses))
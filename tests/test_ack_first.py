@@ -0,0 +1,114 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.ext._queue import DispatchQueue
+from conftest import text_delivery
+
+
+@pytest.fixture(params=[WhatsApp, AsyncWhatsApp])
+def client(request):
+    return request.param
+
+
+def test_ack_before_handlers_and_drain_on_shutdown(client):
+    wa = client("token", {1: "123"}, offline=True, ack_first=True)
+    received = []
+
+    async def on_message(msg):
+        await asyncio.sleep(0.2)
+        received.append(msg.id)
+
+    wa.on_message(on_message)
+    with TestClient(wa.app) as http:
+        start = time.perf_counter()
+        for i in range(3):
+            assert http.post("/", json=text_delivery(f"wamid.{i}")).status_code == 200
+        assert time.perf_counter() - start < 0.2
+        assert received == []
+    # leaving the client shuts the app down, which drains the queue
+    assert sorted(received) == ["wamid.0", "wamid.1", "wamid.2"]
+    assert wa.dispatch_queue.depth == 0
+
+
+def test_full_queue_answers_503(client):
+    wa = client(
+        "token",
+        {1: "123"},
+        offline=True,
+        ack_first=True,
+        webhook_workers=1,
+        webhook_queue_size=1,
+    )
+    received = []
+
+    async def on_message(msg):
+        await asyncio.sleep(0.3)
+        received.append(msg.id)
+
+    wa.on_message(on_message)
+    with TestClient(wa.app) as http:
+        assert http.post("/", json=text_delivery("wamid.0")).status_code == 200
+        time.sleep(0.05)  # the worker takes the first delivery
+        assert http.post("/", json=text_delivery("wamid.1")).status_code == 200
+        response = http.post("/", json=text_delivery("wamid.2"))
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+    assert received == ["wamid.0", "wamid.1"]
+
+
+def test_invalid_delivery_is_rejected():
+    wa = WhatsApp("token", {1: "123"}, offline=True, ack_first=True)
+    with TestClient(wa.app) as http:
+        assert http.post("/", json={"object": "x"}).status_code == 400
+        assert http.post("/", content=b"not json").status_code == 400
+        assert wa.dispatch_queue.depth == 0
+
+
+def test_stop_drops_deliveries_after_timeout():
+    async def main():
+        done = []
+
+        async def dispatch(data):
+            await asyncio.sleep(0.2)
+            done.append(data)
+
+        queue = DispatchQueue(dispatch, workers=1, maxsize=10)
+        assert all(queue.put(i) for i in range(3))
+        dropped = await queue.stop(timeout=0.05)
+        assert not queue.put(3)
+        return done, dropped
+
+    done, dropped = asyncio.run(main())
+    assert (done, dropped) == ([], 2)
+
+
+def test_restart_on_a_new_loop_keeps_queued_deliveries():
+    done, stuck = [], [True]
+
+    async def dispatch(data):
+        if stuck[0]:
+            # the worker of the first loop never finishes its delivery
+            await asyncio.Event().wait()
+        done.append(data)
+
+    queue = DispatchQueue(dispatch, workers=1, maxsize=10)
+
+    async def enqueue():
+        assert all(queue.put(i) for i in range(3))
+        await asyncio.sleep(0.01)
+        # the loop ends without draining the queue, like a reloaded server
+        for task in queue._tasks:
+            task.cancel()
+
+    asyncio.run(enqueue())
+    assert queue.depth == 2
+
+    async def drain():
+        queue.start()
+        return await queue.stop()
+
+    stuck[0] = False
+    assert asyncio.run(drain()) == 0
+    assert done == [1, 2]
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import pytest
+from whatsapp.batch import UNPROCESSED, Batcher, batch_form, split_answers
+from whatsapp.errors import ExpiredTokenException, UnknownErrorException
+from whatsapp.retry import RetryPolicy
+from conftest import client, async_client
+
+
+def test_form_and_answers():
+    form = batch_form(
+        "https://graph.facebook.com/v20.0",
+        [
+            (
+                "https://graph.facebook.com/v20.0/123/messages",
+                {"to": "1", "template": {"name": "hello_world"}},
+            )
+        ],
+    )
+    [request] = json.loads(form["batch"])
+    assert request["relative_url"] == "123/messages"
+    assert request["body"] == "to=1&template=%7B%22name%22%3A+%22hello_world%22%7D"
+
+    answers = [{"code": 200, "body": '{"messages": [{"id": "wamid.1"}]}'}, None]
+    assert split_answers(200, json.dumps(answers).encode(), 2) == [
+        (200, b'{"messages": [{"id": "wamid.1"}]}'),
+        (500, UNPROCESSED),
+    ]
+    # a failed call fails every message with its answer
+    assert split_answers(401, b"{}", 2) == [(401, b"{}")] * 2
+
+
+def test_bulk_sends_are_coalesced(emulator):
+    wa = client(emulator, batch=True, pool_maxsize=32)
+    recipients = [f"5511{i:09d}" for i in range(120)]
+    results = wa.send_template_bulk("hello_world", recipients, concurrency=32)
+    assert all(r.ok for r in results)
+    assert sorted(m["to"] for m in emulator.messages) == recipients
+    assert emulator.messages[0]["template"]["name"] == "hello_world"
+    assert emulator.stats["batches"] == wa.batcher.batches
+    assert emulator.stats["requests"] == emulator.stats["batches"] < 30
+
+
+def test_errors_are_answered_to_their_message(emulator):
+    wa = client(emulator, batch=True, retry=RetryPolicy(base_delay=0.001))
+    emulator.inject(131000, path="/messages")
+    with pytest.raises(UnknownErrorException):
+        wa.send_template("hello_world", "5511999999999")
+    # a throttled message is retried in the next batch
+    emulator.inject(130429, path="/messages")
+    assert wa.send_template("hello_world", "5511999999999")["messages"][0]["id"]
+    assert emulator.stats["errors"] == {131000: 1, 130429: 1}
+
+    with pytest.raises(ExpiredTokenException):
+        client(emulator, token="expired", batch=True).send_template(
+            "hello_world", "5511999999999"
+        )
+
+
+def test_async_sends_are_coalesced(emulator):
+    async def main():
+        async with async_client(emulator, batch=True) as wa:
+            results = await wa.send_template_bulk(
+                "hello_world", [f"5511{i:09d}" for i in range(120)], concurrency=64
+            )
+            emulator.inject(131000, path="/messages")
+            failed = await wa.send_template("hello_world", "5511999999999")
+            return results, failed, wa.batcher.batches
+
+    results, failed, batches = asyncio.run(main())
+    assert all(r.ok for r in results) and len(emulator.messages) == 120
+    assert batches == emulator.stats["batches"] < 30
+    assert failed["error"]["code"] == 131000
+
+
+def test_close_posts_queued_messages_and_stops_the_threads():
+    posted = []
+
+    def post(items):
+        posted.append(len(items))
+        return [(200, b"{}")] * len(items)
+
+    with Batcher(post, window=60) as batcher:
+        futures = [batcher.submit("url", {"to": str(i)}) for i in range(3)]
+        collector = batcher._collector
+    # the window is not waited for, the messages are posted on close
+    assert [f.result(timeout=1) for f in futures] == [(200, b"{}")] * 3
+    assert posted == [3] and not collector.is_alive()
+    # a message submitted after close is posted alone
+    assert batcher.submit("url", {}).result(timeout=1) == (200, b"{}")
+    assert posted == [3, 1]
+
+
+def test_client_close_flushes_the_batcher(emulator):
+    with client(emulator, batch=True, batch_window=60) as wa:
+        future = wa.executor.send_template("hello_world", "5511999999999")
+        while not wa.batcher._pending:
+            pass
+    assert future.result(timeout=1)["messages"][0]["id"].startswith("wamid.")
+    assert emulator.stats["batches"] == 1
+
+    async def main():
+        async with async_client(emulator, batch=True, batch_window=60) as wa:
+            task = wa.spawn(wa.send_template("hello_world", "5511999999999"))
+            await asyncio.sleep(0.01)
+        return task.result()
+
+    assert asyncio.run(main())["messages"][0]["id"].startswith("wamid.")
+    assert emulator.stats["batches"] == 2
+
+
+def test_async_client_batches_again_after_aclose(emulator):
+    wa = async_client(emulator, batch=True)
+
+    async def main():
+        results = await wa.send_template_bulk(
+            "hello_world", [f"5511{i:09d}" for i in range(40)], concurrency=40
+        )
+        await wa.aclose()
+        return results
+
+    for run in range(2):
+        assert all(r.ok for r in asyncio.run(main()))
+        # each run of the client coalesces its messages, the second one included
+        assert emulator.stats["requests"] == emulator.stats["batches"] <= 3 * (run + 1)
+    assert (
+        len(emulator.messages) == 80 and wa.batcher.batches == emulator.stats["batches"]
+    )
@@ -0,0 +1,77 @@
+import asyncio
+from whatsapp import WhatsApp, AsyncWhatsApp
+from conftest import FakeResponse, FakeSession
+
+
+def answer(method: str, url: str, kwargs: dict) -> FakeResponse:
+    payload = kwargs["json"]
+    if payload["to"] == "bad":
+        error = {"message": "Message undeliverable", "code": 131026}
+        return FakeResponse(400, {"error": error})
+    return FakeResponse(200, {"messages": [{"id": f"wamid.{payload['to']}"}]})
+
+
+def check(results, session, concurrency):
+    assert [r.recipient for r in results] == [str(i) for i in range(50)] + ["bad"]
+    assert all(r.ok for r in results[:50])
+    assert results[0].message_id == "wamid.0"
+    assert (results[-1].ok, results[-1].error_code) == (False, 131026)
+    assert results[-1].error == "Message undeliverable"
+    assert session.max_in_flight <= concurrency
+    assert session.max_in_flight > 1
+
+
+def test_sync_bulk_template():
+    wa = WhatsApp("token", {1: "123"}, offline=True)
+    wa.session = FakeSession(answer=answer, delay=0.01)
+    streamed = []
+    recipients = (str(i) for i in range(50))
+    results = wa.send_template_bulk(
+        "hello_world",
+        [*recipients, ("bad", [{"type": "body"}])],
+        concurrency=8,
+        on_result=streamed.append,
+    )
+    check(results, wa.session, 8)
+    assert len(streamed) == 51
+    assert wa.session.payloads[0]["template"]["name"] == "hello_world"
+    bad = next(p for p in wa.session.payloads if p["to"] == "bad")
+    assert bad["template"]["components"] == [{"type": "body"}]
+
+
+def test_sync_broadcast():
+    wa = WhatsApp("token", {1: "123"}, offline=True)
+    wa.session = FakeSession(answer=answer, delay=0.01)
+    message = {"type": "text", "text": {"body": "hi"}}
+    results = wa.broadcast(
+        message, [str(i) for i in range(50)] + ["bad"], concurrency=4
+    )
+    check(results, wa.session, 4)
+    assert wa.session.payloads[0]["messaging_product"] == "whatsapp"
+    assert "to" not in message
+
+
+def test_async_bulk_with_async_iterable():
+    wa = AsyncWhatsApp("token", {1: "123"}, offline=True)
+    session = FakeSession(answer=answer, awaitable=True, delay=0.01)
+
+    async def recipients():
+        for i in range(50):
+            yield str(i)
+        yield "bad"
+
+    async def main():
+        wa._session, wa._session_loop = session, asyncio.get_running_loop()
+        streamed = []
+
+        async def on_result(result):
+            streamed.append(result)
+
+        results = await wa.send_template_bulk(
+            "hello_world", recipients(), concurrency=10, on_result=on_result
+        )
+        return results, streamed
+
+    results, streamed = asyncio.run(main())
+    check(results, session, 10)
+    assert len(streamed) == 51
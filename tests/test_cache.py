@@ -0,0 +1,194 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.cache import TTLCache, MemoryMediaCache, SQLiteMediaCache, SingleFlight
+from conftest import FakeResponse, FakeSession
+
+
+def upload_session() -> FakeSession:
+    """Answers every request with a new media id."""
+
+    def answer(method, url, kwargs):
+        return FakeResponse(body={"id": f"media.{len(session.sent)}"})
+
+    session = FakeSession(answer=answer)
+    return session
+
+
+def media_url_session() -> FakeSession:
+    """Answers media url queries slowly, so that concurrent queries overlap."""
+
+    def answer(method, url, kwargs):
+        media_id = url.rsplit("/", 1)[1]
+        return FakeResponse(
+            body={"url": f"https://cdn.test/{media_id}", "id": media_id}
+        )
+
+    return FakeSession(answer=answer, delay=0.05)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_and_evicts():
+    clock = Clock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a is now the most recently used
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1 and cache.get("c") == 3
+    clock.now = 10
+    assert cache.get("a") is None and len(cache) == 1
+    cache.set("d", 4, ttl=1)
+    assert cache.pop("d") == 4 and cache.get("d") is None
+
+
+def test_sqlite_cache_is_shared_and_expires(tmp_path):
+    path = str(tmp_path / "media.db")
+    first, second = SQLiteMediaCache(path), SQLiteMediaCache(path)
+    first.set("123:abc", "media.1")
+    assert second.get("123:abc") == "media.1"
+    second.discard("media.1")
+    assert first.get("123:abc") is None
+    expired = SQLiteMediaCache(path, ttl=-1)
+    expired.set("123:abc", "media.2")
+    assert first.get("123:abc") is None
+
+
+@pytest.mark.parametrize("media_cache", [True, "sqlite"])
+def test_upload_is_skipped_for_known_content(tmp_path, media_cache):
+    if media_cache == "sqlite":
+        media_cache = str(tmp_path / "media.db")
+    brochure = tmp_path / "brochure.pdf"
+    brochure.write_bytes(b"%PDF brochure")
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(b"%PDF brochure")
+    wa = WhatsApp("token", {1: "123", 2: "456"}, offline=True, media_cache=media_cache)
+    wa.session = upload_session()
+
+    assert wa.upload_media(str(brochure)) == {"id": "media.1"}
+    # same content, even under another name: no upload
+    assert wa.upload_media(str(copy)) == {"id": "media.1"}
+    # media ids belong to a phone number, another sender uploads again
+    assert wa.upload_media(str(brochure), sender=2) == {"id": "media.2"}
+    brochure.write_bytes(b"%PDF brochure v2")
+    assert wa.upload_media(str(brochure)) == {"id": "media.3"}
+    assert len(wa.session.sent) == 3
+
+    wa.delete_media("media.3")
+    assert wa.upload_media(str(brochure)) == {"id": "media.5"}
+
+
+def test_async_upload_uses_the_cache(tmp_path):
+    image = tmp_path / "header.png"
+    image.write_bytes(b"png")
+    wa = AsyncWhatsApp(
+        "token", {1: "123"}, offline=True, media_cache=MemoryMediaCache()
+    )
+    requests = []
+
+    class Response:
+        status = 200
+
+        async def json(self):
+            return {"id": "media.1"}
+
+    async def request(method, url, **kwargs):
+        requests.append(url)
+        return Response()
+
+    wa._request = request
+
+    async def main():
+        return [await wa.upload_media(str(image)) for _ in range(3)]
+
+    assert asyncio.run(main()) == [{"id": "media.1"}] * 3
+    assert requests == [f"{wa.base_url}/123/media"]
+
+
+def test_query_media_url_is_cached_and_single_flight():
+    wa = WhatsApp("token", {1: "123"}, offline=True)
+    wa.session = media_url_session()
+    with ThreadPoolExecutor(8) as pool:
+        urls = list(pool.map(wa.query_media_url, ["media.1"] * 8))
+    assert urls == ["https://cdn.test/media.1"] * 8
+    assert len(wa.session.sent) == 1
+    assert wa.query_media_url("media.1") == "https://cdn.test/media.1"
+    assert wa.query_media_url("media.2") == "https://cdn.test/media.2"
+    assert len(wa.session.sent) == 2
+
+    clock = Clock()
+    wa.media_url_cache.clock = clock
+    wa.media_url_cache.clear()
+    wa.query_media_url("media.1")
+    clock.now = 240
+    wa.query_media_url("media.1")
+    assert len(wa.session.sent) == 4
+
+    uncached = WhatsApp("token", {1: "123"}, offline=True, media_url_ttl=0)
+    uncached.session = media_url_session()
+    uncached.query_media_url("media.1")
+    uncached.query_media_url("media.1")
+    assert len(uncached.session.sent) == 2
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    def run(_):
+        with pytest.raises(ValueError):
+            flight.do("key", fail)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(run, range(4)))
+    assert len(calls) == 1
+    # nothing is kept once the call is over
+    assert flight.do("key", lambda: 1) == 1
+
+
+def test_async_query_media_url_is_cached_and_single_flight():
+    wa = AsyncWhatsApp("token", {1: "123"}, offline=True)
+    requests = []
+
+    class Response:
+        status = 200
+
+        def __init__(self, media_id):
+            self.media_id = media_id
+
+        async def json(self):
+            return {"url": f"https://cdn.test/{self.media_id}", "id": self.media_id}
+
+    async def request(method, url, **kwargs):
+        requests.append(url)
+        await asyncio.sleep(0.05)
+        return Response(url.rsplit("/", 1)[1])
+
+    wa._request = request
+
+    async def query(media_id):
+        return await wa.query_media_url(media_id)
+
+    async def main():
+        first = await asyncio.gather(*[query("media.1") for _ in range(8)])
+        again = await query("media.1")
+        return first, again
+
+    first, again = asyncio.run(main())
+    assert [data["url"] for data in first] == ["https://cdn.test/media.1"] * 8
+    assert again == first[0]
+    assert requests == [f"{wa.base_url}/media.1"]
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.cache import TTLCache
+from whatsapp.dedup import MemoryDeduplicator, SQLiteDeduplicator
+from conftest import status_update, text_delivery
+
+# a message and a status of another one, delivered again in the tests
+DELIVERY = text_delivery(statuses=[status_update()])
+
+
+def recording_client(**kwargs):
+    wa = WhatsApp("token", {1: "123"}, offline=True, **kwargs)
+    received = []
+
+    async def on_message(message):
+        received.append(message.id)
+
+    async def on_status(status):
+        received.append(wa.get_delivery(status))
+
+    wa.on_message(on_message)
+    wa.on_status(on_status)
+    return wa, received
+
+
+def test_ttl_cache_add_is_set_if_absent():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    assert cache.add("a") and not cache.add("a")
+    now[0] = 10
+    assert cache.add("a")
+    assert cache.add("b") and cache.add("c") and "a" not in cache
+
+
+@pytest.mark.parametrize("dedup", [True, "sqlite"])
+def test_redelivered_events_are_dispatched_once(tmp_path, dedup):
+    if dedup == "sqlite":
+        dedup = str(tmp_path / "dedup.db")
+    wa, received = recording_client(dedup=dedup, metrics=True)
+    client = TestClient(wa.app)
+    for _ in range(3):
+        assert client.post("/", json=DELIVERY).json() == {"success": True}
+    assert received == ["delivered", "wamid.1"]
+    # a new status of the same message is a new event
+    client.post("/", json=text_delivery(statuses=[status_update(status="read")]))
+    client.post("/", json=text_delivery("wamid.2", [status_update()]))
+    assert received == ["delivered", "wamid.1", "read", "wamid.2"]
+    assert wa.metrics.snapshot()["duplicates"] == {"message": 3, "status": 3}
+
+
+def test_without_dedup_every_delivery_is_dispatched():
+    wa, received = recording_client()
+    client = TestClient(wa.app)
+    client.post("/", json=DELIVERY)
+    client.post("/", json=DELIVERY)
+    assert received == ["delivered", "wamid.1"] * 2
+
+
+def test_sqlite_window_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "dedup.db")
+    first, first_received = recording_client(dedup=path)
+    second = AsyncWhatsApp("token", {1: "123"}, offline=True, dedup=path)
+    second_received = []
+
+    async def on_message(message):
+        second_received.append(message.id)
+
+    second.on_message(on_message)
+    TestClient(first.app).post("/", json=DELIVERY)
+    TestClient(second.app).post("/", json=DELIVERY)
+    assert first_received == ["delivered", "wamid.1"] and second_received == []
+
+    expired = SQLiteDeduplicator(path, ttl=-1)
+    assert not expired.seen("message:wamid.9") and not expired.seen("message:wamid.9")
+
+
+def test_concurrent_checks_let_one_through(tmp_path):
+    for dedup in (MemoryDeduplicator(), SQLiteDeduplicator(str(tmp_path / "d.db"))):
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(dedup.seen, ["message:wamid.1"] * 32))
+        assert results.count(False) == 1
+
+
+@pytest.mark.parametrize("dedup", [True, "sqlite"])
+def test_failed_handlers_run_again_on_redelivery(tmp_path, dedup):
+    if dedup == "sqlite":
+        dedup = str(tmp_path / "dedup.db")
+    wa = WhatsApp("token", {1: "123"}, offline=True, dedup=dedup)
+    calls, failures = [], [RuntimeError("handler failed")]
+
+    async def on_message(message):
+        calls.append(message.id)
+        if failures:
+            raise failures.pop()
+
+    async def on_status(status):
+        calls.append(wa.get_delivery(status))
+
+    wa.on_message(on_message)
+    wa.on_status(on_status)
+    client = TestClient(wa.app, raise_server_exceptions=False)
+    assert client.post("/", json=DELIVERY).status_code == 500
+    assert client.post("/", json=DELIVERY).status_code == 200
+    # the status handler returned the first time, only the message is dispatched again
+    assert calls == ["delivered", "wamid.1", "wamid.1"]
+    client.post("/", json=DELIVERY)
+    assert calls == ["delivered", "wamid.1", "wamid.1"]
+
+
+def test_failed_status_handler_forgets_the_events_not_handled():
+    wa = WhatsApp("token", {1: "123"}, offline=True, dedup=True)
+    calls = []
+
+    async def on_message(message):
+        calls.append(message.id)
+
+    async def on_status(status):
+        calls.append(wa.get_delivery(status))
+        if len(calls) == 1:
+            raise RuntimeError("handler failed")
+
+    wa.on_message(on_message)
+    wa.on_status(on_status)
+    client = TestClient(wa.app, raise_server_exceptions=False)
+    client.post("/", json=DELIVERY)
+    client.post("/", json=DELIVERY)
+    assert calls == ["delivered", "delivered", "wamid.1"]
+
+
+def test_event_handler_failure_does_not_dispatch_the_message_again():
+    wa, received = recording_client(dedup=True)
+
+    async def on_event(message):
+        raise RuntimeError("handler failed")
+
+    wa.on_event(on_event)
+    client = TestClient(wa.app, raise_server_exceptions=False)
+    assert client.post("/", json=DELIVERY).status_code == 500
+    client.post("/", json=DELIVERY)
+    # on_message returned before on_event failed, the message was handled
+    assert received == ["delivered", "wamid.1"]
+
+
+class ThreadRecordingDeduplicator(MemoryDeduplicator):
+    """MemoryDeduplicator recording the threads its methods are called from."""
+
+    def __init__(self, blocking: bool):
+        super().__init__()
+        self.blocking = blocking
+        self.threads = []
+
+    def seen(self, key):
+        self.threads.append(threading.get_ident())
+        return super().seen(key)
+
+    def forget(self, key):
+        self.threads.append(threading.get_ident())
+        super().forget(key)
+
+
+@pytest.mark.parametrize("blocking", [True, False])
+def test_blocking_deduplicators_run_off_the_event_loop(blocking):
+    dedup = ThreadRecordingDeduplicator(blocking)
+    wa = AsyncWhatsApp("token", {1: "123"}, offline=True, dedup=dedup)
+
+    async def on_message(message):
+        raise RuntimeError("handler failed")
+
+    wa.on_message(on_message)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await wa.dispatch(text_delivery())
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert len(dedup.threads) == 2  # seen, then forget after the failure
+    assert all((thread != loop_thread) == blocking for thread in dedup.threads)
+    assert SQLiteDeduplicator.blocking and not MemoryDeduplicator.blocking
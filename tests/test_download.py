@@ -0,0 +1,148 @@
+import asyncio
+import io
+import aiohttp
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.errors import InvalidParameterException
+from whatsapp.retry import RetryPolicy
+from whatsapp.transport import AiohttpTransport
+
+CONTENT = os.urandom(5 * 1024 * 1024 + 123)
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        failures = {"/flaky": 1}
+
+        def do_GET(self):
+            if self.failures.get(self.path):
+                # answered once with a transient error, then like /media
+                self.failures[self.path] -= 1
+                status, kind = 503, "application/json"
+                body = json.dumps({"error": {"message": "later", "code": 2}}).encode()
+            elif self.path in ("/media", "/flaky"):
+                status, body, kind = 200, CONTENT, "video/mp4"
+            else:
+                status, kind = 404, "application/json"
+                body = json.dumps({"error": {"message": "missing", "code": 100}})
+                body = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def sync_client() -> WhatsApp:
+    wa = WhatsApp("token", {1: "123"}, offline=True)
+    wa.session.trust_env = False
+    return wa
+
+
+def download(base_url: str, *args, **kwargs):
+    """Runs AsyncWhatsApp.download_media and returns the result of the download."""
+
+    async def main():
+        async with AsyncWhatsApp("token", {1: "123"}, offline=True) as wa:
+            return await wa.download_media(base_url, *args, **kwargs)
+
+    return asyncio.run(main())
+
+
+def test_sync_download_to_path(base_url, tmp_path):
+    path = sync_client().download_media(
+        f"{base_url}/media", "video/mp4", str(tmp_path / "video")
+    )
+    assert path == str(tmp_path / "video.mp4")
+    assert (tmp_path / "video.mp4").read_bytes() == CONTENT
+
+
+def test_sync_download_to_file_object_and_sink(base_url):
+    buffer = io.BytesIO()
+    wa = sync_client()
+    assert wa.download_media(f"{base_url}/media", "video/mp4", buffer) is buffer
+    assert buffer.getvalue() == CONTENT
+    chunks = []
+    assert wa.download_media(
+        f"{base_url}/media", "video/mp4", sink=chunks.append, chunk_size=1024 * 1024
+    )
+    assert b"".join(chunks) == CONTENT
+    assert max(map(len, chunks)) <= 1024 * 1024 and len(chunks) > 5
+
+
+def test_async_download_to_path(base_url, tmp_path):
+    path = download(f"{base_url}/media", "video/mp4", str(tmp_path / "video"))
+    assert path == str(tmp_path / "video.mp4")
+    assert (tmp_path / "video.mp4").read_bytes() == CONTENT
+
+
+def test_async_download_to_file_object_and_sink(base_url):
+    buffer = io.BytesIO()
+    assert download(f"{base_url}/media", "video/mp4", buffer) is buffer
+    assert buffer.getvalue() == CONTENT
+    chunks = []
+
+    async def sink(chunk):
+        chunks.append(chunk)
+
+    assert download(f"{base_url}/media", "video/mp4", sink=sink, chunk_size=65536)
+    assert b"".join(chunks) == CONTENT
+    assert max(map(len, chunks)) <= 65536
+
+
+def test_download_errors(base_url):
+    error = {"error": {"message": "missing", "code": 100}}
+    assert download(f"{base_url}/missing", "video/mp4") == error
+    with pytest.raises(InvalidParameterException):
+        sync_client().download_media(f"{base_url}/missing", "video/mp4")
+
+
+def test_async_download_goes_through_the_request_chain(base_url):
+    class Disconnecting(AiohttpTransport):
+        """Loses the connection of the first request."""
+
+        def __init__(self):
+            super().__init__()
+            self.failed = False
+
+        def stream(self, method, url, kwargs):
+            if not self.failed:
+                self.failed = True
+                raise aiohttp.ServerDisconnectedError()
+            return super().stream(method, url, kwargs)
+
+    async def main():
+        async with AsyncWhatsApp(
+            "token",
+            {1: "123"},
+            offline=True,
+            transport=Disconnecting(),
+            retry=RetryPolicy(base_delay=0.001),
+            metrics=True,
+        ) as wa:
+            buffer = await wa.download_media(
+                f"{base_url}/flaky", "video/mp4", io.BytesIO()
+            )
+            return buffer.getvalue(), wa.metrics.snapshot(), wa.retry_policy.stats
+
+    content, snapshot, stats = asyncio.run(main())
+    assert content == CONTENT
+    # the lost connection and the 503 answer are retried, like the downloads of WhatsApp
+    assert stats.reasons == {"ServerDisconnectedError": 1, "code 2": 1}
+    (download,) = snapshot["requests"]
+    assert download["endpoint"] == "download" and download["statuses"] == {"200": 1}
@@ -0,0 +1,175 @@
+import asyncio
+import io
+import time
+import pytest
+from whatsapp.emulator import GraphEmulator
+from whatsapp.errors import (
+    AppRateLimitException,
+    ExpiredTokenException,
+    InvalidParameterException,
+)
+from whatsapp.ratelimit import RateLimiter
+from whatsapp.retry import RetryPolicy
+from conftest import client, async_client
+
+
+def test_messages_and_media_round_trip(emulator, tmp_path):
+    wa = client(emulator)
+    response = wa.send_template("hello_world", "5511999999999", sender=2)
+    assert response["messages"][0]["id"].startswith("wamid.")
+    assert emulator.messages[0]["sender"] == "456"
+    assert emulator.messages[0]["template"]["name"] == "hello_world"
+
+    image = tmp_path / "logo.png"
+    image.write_bytes(b"\x89PNG emulated")
+    media_id = wa.upload_media(str(image))["id"]
+    assert emulator.media[media_id]["content"] == b"\x89PNG emulated"
+    url = wa.query_media_url(media_id)
+    buffer = io.BytesIO()
+    wa.download_media(url, "image/png", buffer)
+    assert buffer.getvalue() == b"\x89PNG emulated"
+    assert wa.delete_media(media_id) == {"success": True}
+    with pytest.raises(InvalidParameterException):
+        wa.delete_media(media_id)
+    assert emulator.stats["messages"] == 1 and emulator.stats["uploads"] == 1
+
+
+def test_error_injection(emulator):
+    wa = client(emulator)
+    emulator.inject(130429, path="/messages")
+    with pytest.raises(AppRateLimitException):
+        wa.send_template("hello_world", "5511999999999")
+    assert wa.send_template("hello_world", "5511999999999")["messages"]
+
+    emulator.inject(130429, count=2)
+    retrying = client(emulator, retry=RetryPolicy(base_delay=0.001))
+    assert retrying.send_template("hello_world", "5511999999999")["messages"]
+    assert retrying.retry_policy.stats.retries == 2
+    assert emulator.stats["errors"] == {130429: 3}
+
+    with pytest.raises(ValueError):
+        emulator.inject(999999)
+    with pytest.raises(ExpiredTokenException):
+        client(emulator, token="wrong").send_template("hello_world", "5511999999999")
+
+
+def test_random_errors_and_latency():
+    with GraphEmulator(latency=0.05, error_rate=0.5, seed=1) as emulator:
+        wa = client(emulator)
+        start = time.perf_counter()
+        failures = 0
+        for _ in range(10):
+            try:
+                wa.send_template("hello_world", "5511999999999")
+            except Exception:
+                failures += 1
+        assert time.perf_counter() - start >= 0.5
+        assert 0 < failures < 10
+        assert emulator.stats["errors"] == {131000: failures}
+
+
+def test_rate_limit_simulation():
+    # the clock only moves when the test advances it, the refill does not depend on timing
+    now = [0.0]
+    clock = lambda: now[0]
+    with GraphEmulator(rate_limit=2, rate_burst=5, clock=clock) as emulator:
+        wa = client(emulator)
+        results = wa.send_template_bulk("hello_world", [f"55{i}" for i in range(10)])
+        assert sum(r.ok for r in results) == 5
+        assert {r.error_code for r in results if not r.ok} == {130429}
+        # each phone number id has its own limit
+        assert wa.send_template("hello_world", "5511999999999", sender=2)["messages"]
+        # one second refills two tokens
+        now[0] += 1
+        results = wa.send_template_bulk("hello_world", [f"55{i}" for i in range(3)])
+        assert [r.ok for r in results].count(True) == 2
+
+        # a client-side limiter under the emulated limit avoids the errors: every message
+        # waits for the time the limiter reserves before it is sent
+        emulator.reset()
+        limiter = RateLimiter(1.6, 5, clock=clock)
+        for i in range(7):
+            now[0] += limiter.bucket("123").reserve()
+            assert wa.send_template("hello_world", f"55{i}")["messages"]
+
+
+def test_async_client(emulator, tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"mp4" * 1000)
+
+    async def main():
+        async with async_client(emulator) as wa:
+            sent = await wa.send_template("hello_world", "5511999999999")
+            media_id = (await wa.upload_media(str(video)))["id"]
+            media = await wa.query_media_url(media_id)
+            buffer = io.BytesIO()
+            await wa.download_media(media["url"], "video/mp4", buffer)
+            return sent, media, buffer.getvalue()
+
+    sent, media, content = asyncio.run(main())
+    assert sent["messages"][0]["id"].startswith("wamid.")
+    assert media["file_size"] == 3000 and media["mime_type"] == "video/mp4"
+    assert content == b"mp4" * 1000
+
+
+def test_async_authorized(emulator):
+    async def main():
+        async with async_client(emulator) as wa:
+            accepted = await wa.authorized
+        async with async_client(emulator, token="wrong") as wa:
+            return accepted, await wa.authorized
+
+    assert asyncio.run(main()) == (True, False)
+    assert emulator.stats["requests"] == 2
+
+
+def test_clients_send_the_same_payloads(emulator):
+    def send(wa):
+        button = {"header": "Menu", "body": "Pick one", "action": {"button": "Open"}}
+        reply = {"type": "button", "action": {"buttons": [{"type": "reply"}]}}
+        return [
+            wa.send_image("https://example.com/a.png", "5511", caption="Hi"),
+            wa.send_sticker("sticker", "5511", link=False, sender=2),
+            wa.send_audio("audio", "5511", link=False),
+            wa.send_video("https://example.com/a.mp4", "5511"),
+            wa.send_document("https://example.com/a.pdf", "5511", caption="Doc"),
+            wa.send_location("-23.5", "-46.6", "Home", "Rua dois, 123", "5511"),
+            wa.send_button(button, "5511"),
+            wa.send_reply_button(reply, "5511"),
+            wa.send_contacts([{"name": {"formatted_name": "Alice"}}], "5511"),
+            wa.send_custom_json(
+                {"messaging_product": "whatsapp", "type": "text"}, "5511"
+            ),
+            wa.send_template("hello_world", "5511"),
+        ]
+
+    def payloads():
+        # the ids of the emulator differ, the messages themselves must not
+        messages = [dict(message, id=None) for message in emulator.messages]
+        emulator.messages.clear()
+        return messages
+
+    send(client(emulator))
+    sync_messages = payloads()
+
+    async def main():
+        wa = async_client(emulator)
+        await asyncio.gather(*send(wa))
+        await wa.aclose()
+
+    asyncio.run(main())
+    assert sorted(payloads(), key=repr) == sorted(sync_messages, key=repr)
+    assert [message["type"] for message in sync_messages] == [
+        "image",
+        "sticker",
+        "audio",
+        "video",
+        "document",
+        "location",
+        "interactive",
+        "interactive",
+        "contacts",
+        "text",
+        "template",
+    ]
+    assert sync_messages[1]["sender"] == "456"
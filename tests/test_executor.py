@@ -0,0 +1,51 @@
+import itertools
+import time
+from concurrent.futures import Future
+import pytest
+from whatsapp import AsyncWhatsApp
+from conftest import client
+
+
+def test_methods_return_futures(emulator):
+    wa = client(emulator, pool_maxsize=4)
+    assert wa.executor is wa.executor and wa.executor.max_workers == 4
+    future = wa.executor.send_template("hello_world", "5511999999999")
+    assert isinstance(future, Future)
+    assert future.result()["messages"][0]["id"].startswith("wamid.")
+    assert wa.executor.submit(lambda: wa.phone_number_id).result() == "123"
+    with pytest.raises(AttributeError):
+        wa.executor.phone_number_id()
+    assert AsyncWhatsApp("token", {1: "123"}, offline=True).executor is None
+
+
+def test_map_sends_in_parallel_and_in_order(emulator):
+    emulator.latency = 0.05
+    wa = client(emulator, executor_workers=10)
+    recipients = [f"5511{i:09d}" for i in range(40)]
+    start = time.perf_counter()
+    responses = list(
+        wa.executor.map(wa.send_template, itertools.repeat("hello_world"), recipients)
+    )
+    # one at a time, the 40 sends take 2 seconds
+    assert time.perf_counter() - start < 1
+    assert [r["contacts"][0]["input"] for r in responses] == recipients
+
+
+def test_map_submits_every_call_up_front(emulator):
+    wa = client(emulator, executor_workers=2)
+    recipients = [f"5511{i:09d}" for i in range(6)]
+    # like Executor.map, the calls run without the results being consumed
+    wa.executor.map(wa.send_template, itertools.repeat("hello_world"), recipients)
+    wa.executor.shutdown()
+    assert sorted(m["to"] for m in emulator.messages) == recipients
+
+    emulator.latency = 0.2
+    wa = client(emulator, executor_workers=2)
+    responses = wa.executor.map(
+        wa.send_template, itertools.repeat("hello_world"), recipients
+    )
+    assert next(responses)["messages"][0]["id"].startswith("wamid.")
+    # the calls not started yet are cancelled when the iteration stops
+    responses.close()
+    wa.executor.shutdown()
+    assert len(emulator.messages) < 6 + 6
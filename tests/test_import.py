@@ -0,0 +1,61 @@
+import subprocess
+import sys
+import pytest
+
+HEAVY = ("fastapi", "uvicorn", "bs4", "aiohttp", "requests", "requests_toolbelt")
+
+# budgets for `import whatsapp` alone, importing the web stack eagerly costs several times more
+IMPORT_TIME_BUDGET = 0.3  # seconds
+IMPORT_RSS_BUDGET = 20 * 1024 * 1024  # bytes
+
+
+def python(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def loaded(code: str) -> set:
+    result = python(
+        f"import sys\n{code}\nprint(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    return set(result.stdout.split())
+
+
+def test_import_does_not_load_heavy_dependencies():
+    assert loaded("import whatsapp") == set()
+
+
+def test_dependencies_are_loaded_on_first_use():
+    sync = "from whatsapp import WhatsApp\nwa = WhatsApp('t', {1: '1'}, offline=True)"
+    assert loaded(sync) == {"requests"}
+    assert "fastapi" in loaded(f"{sync}\nwa.app")
+    assert "aiohttp" not in loaded(
+        "from whatsapp import AsyncWhatsApp\nAsyncWhatsApp('t', {1: '1'}, offline=True)"
+    )
+
+
+def test_import_time():
+    result = python("import whatsapp")
+    # stderr lines look like "import time:   self [us] | cumulative | package"
+    line = next(
+        l for l in result.stderr.splitlines() if l.split("|")[-1].strip() == "whatsapp"
+    )
+    cumulative = int(line.split("|")[1]) / 1e6
+    assert cumulative < IMPORT_TIME_BUDGET
+
+
+def test_import_rss():
+    pytest.importorskip("resource")
+    result = python(
+        "import resource, sys\n"
+        "before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "import whatsapp\n"
+        "after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        "print((after - before) * (1 if sys.platform == 'darwin' else 1024))"
+    )
+    assert int(result.stdout) < IMPORT_RSS_BUDGET
@@ -0,0 +1,82 @@
+import pytest
+from fastapi.testclient import TestClient
+from whatsapp import WhatsApp, AsyncWhatsApp, Message, AsyncMessage
+from conftest import delivery, received_message, webhook_value
+
+
+def image_delivery() -> dict:
+    image = {"id": "media", "mime_type": "image/jpeg"}
+    return delivery(webhook_value([received_message(image, type="image")]))
+
+
+@pytest.fixture(params=[(WhatsApp, Message), (AsyncWhatsApp, AsyncMessage)])
+def client(request):
+    cls, message = request.param
+    return cls("token", {1: "123"}, offline=True), message
+
+
+def test_message_is_slotted(client):
+    wa, message = client
+    msg = message(instance=wa, data=image_delivery())
+    assert not hasattr(msg, "__dict__")
+    with pytest.raises(AttributeError):
+        msg.unknown = 1
+    assert msg.url == wa.url and msg.headers is wa.headers
+
+
+def test_media_is_read_lazily(client):
+    wa, message = client
+    data = image_delivery()
+    msg = message(instance=wa, data=data)
+    assert msg.image == {"id": "media", "mime_type": "image/jpeg"}
+    assert msg.media is msg.image
+    assert msg.video is None and msg.location is None
+    # the object is read from the payload on access, not copied at construction
+    data["entry"][0]["changes"][0]["value"]["messages"][0]["image"]["id"] = "changed"
+    assert msg.image["id"] == "changed"
+
+
+def test_keep_data_false_drops_the_payload(client):
+    wa, message = client
+    msg = message(instance=wa, data=image_delivery(), keep_data=False)
+    assert msg.data is None
+    assert (msg.id, msg.name, msg.author) == ("wamid.1", "Alice", "111")
+    assert msg.image["id"] == "media"
+
+
+def test_reply_without_data(client):
+    wa, message = client
+    msg = message(instance=wa, to="222", content="hi")
+    assert msg.author is None and msg.image is None
+    if message is Message:
+        assert msg.reply("hello") == {"error": "No data provided"}
+
+
+def test_dispatch_without_payload():
+    wa = WhatsApp("token", {1: "123"}, offline=True, keep_message_data=False)
+    received = []
+
+    async def on_message(msg):
+        received.append(msg)
+
+    wa.on_message(on_message)
+    TestClient(wa.app).post("/", json=image_delivery())
+    assert [(msg.id, msg.data, msg.image["id"]) for msg in received] == [
+        ("wamid.1", None, "media")
+    ]
+
+
+def test_payload_is_kept_by_default():
+    received = []
+
+    async def on_message(msg):
+        received.append(msg)
+
+    for options in ({}, {"keep_message_data": False}):
+        wa = WhatsApp("token", {1: "123"}, offline=True, **options)
+        wa.on_message(on_message)
+        TestClient(wa.app).post("/", json=image_delivery())
+    kept, dropped = received
+    # handlers reading the payload with the get_* helpers keep working
+    assert kept.data == image_delivery() and wa.get_author(kept.data) == "111"
+    assert dropped.data is None and dropped.image["id"] == "media"
@@ -0,0 +1,133 @@
+import asyncio
+import io
+import pytest
+from fastapi.testclient import TestClient
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.errors import UnknownErrorException
+from whatsapp.metrics import Histogram, Metrics
+from whatsapp.retry import RetryPolicy
+from conftest import client, async_client, status_update, text_delivery
+
+
+def by_endpoint(snapshot: dict) -> dict:
+    return {(r["method"], r["endpoint"], r["type"]): r for r in snapshot["requests"]}
+
+
+def test_histogram_quantiles():
+    histogram = Histogram((0.1, 0.2, 0.4))
+    for value in (0.05, 0.15, 0.15, 0.3):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 0]
+    assert histogram.quantile(0.5) == pytest.approx(0.15)
+    assert histogram.quantile(1) == pytest.approx(0.4)
+    histogram.observe(10)
+    assert histogram.quantile(1) == 0.4
+
+
+def test_requests_errors_and_retries_are_recorded(emulator, tmp_path):
+    wa = client(emulator, retry=RetryPolicy(base_delay=0.001), metrics=True)
+    wa.send_template("hello_world", "5511999999999")
+    emulator.inject(130429)
+    wa.send_template("hello_world", "5511999999999")
+    emulator.inject(131000)
+    with pytest.raises(UnknownErrorException):
+        wa.send_template("hello_world", "5511999999999")
+    image = tmp_path / "logo.png"
+    image.write_bytes(b"png")
+    wa.download_media(
+        wa.query_media_url(wa.upload_media(str(image))["id"]), "image/png", io.BytesIO()
+    )
+
+    snapshot = wa.metrics.snapshot()
+    requests = by_endpoint(snapshot)
+    templates = requests[("POST", "messages", "template")]
+    assert templates["count"] == 3
+    assert templates["statuses"] == {"200": 2, "500": 1}
+    assert templates["p50"] > 0 and templates["sum"] > 0
+    assert requests[("POST", "media", "")]["count"] == 1
+    assert requests[("GET", "node", "")]["count"] == 1
+    assert requests[("GET", "download", "")]["statuses"] == {"200": 1}
+    assert snapshot["errors"] == {131000: 1}
+    assert snapshot["retries"] == {"code 130429": 1}
+    backoff = wa.retry_policy.stats.backoff_seconds
+    assert snapshot["retry_backoff_seconds"] == backoff > 0
+
+    text = wa.metrics.render()
+    assert (
+        'whatsapp_requests_total{method="POST",endpoint="messages",type="template",status="500"} 1'
+        in text
+    )
+    assert 'whatsapp_api_errors_total{code="131000"} 1' in text
+    assert 'whatsapp_retries_total{reason="code 130429"} 1' in text
+    assert f"whatsapp_retry_backoff_seconds_total {backoff}" in text
+    assert (
+        'whatsapp_request_duration_seconds_count{method="POST",endpoint="messages",type="template"} 3'
+        in text
+    )
+
+
+def test_handlers_and_metrics_route():
+    wa = WhatsApp("token", {1: "123"}, offline=True, metrics=True)
+
+    async def on_message(message):
+        await asyncio.sleep(0.01)
+
+    async def on_status(status):
+        raise RuntimeError("broken handler")
+
+    wa.on_message(on_message)
+    wa.on_status(on_status)
+    client = TestClient(wa.app, raise_server_exceptions=False)
+    client.post("/", json=text_delivery())
+    client.post("/", json=text_delivery(statuses=[status_update("wamid.a", "read")]))
+    handlers = wa.metrics.snapshot()["handlers"]
+    assert handlers["message"]["count"] == 1 and handlers["message"]["sum"] >= 0.01
+    assert handlers["status"]["count"] == 1 and handlers["status"]["errors"] == 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'whatsapp_handler_errors_total{handler="status"} 1' in response.text
+    assert "whatsapp_webhook_queue_depth 0" in response.text
+    # without metrics there is no route
+    plain = WhatsApp("token", {1: "123"}, offline=True)
+    assert TestClient(plain.app).get("/metrics").status_code == 404
+
+
+def test_queue_depth_and_shared_metrics():
+    metrics = Metrics()
+    wa = WhatsApp("token", {1: "123"}, offline=True, ack_first=True, metrics=metrics)
+    other = AsyncWhatsApp("token", {1: "123"}, offline=True, metrics=metrics)
+    assert wa.metrics is other.metrics is metrics
+
+    async def main():
+        wa.dispatch_queue.start()
+        for _ in range(3):
+            wa.dispatch_queue.put(
+                text_delivery(statuses=[status_update("wamid.a", "read")])
+            )
+        depth = metrics.snapshot()["webhook_queue_depth"]
+        await wa.dispatch_queue.stop()
+        return depth
+
+    assert asyncio.run(main()) == 3
+    assert metrics.queue_depth() == 0
+
+
+def test_async_client_records_requests(emulator):
+    async def main():
+        async with async_client(emulator, metrics=True) as wa:
+            await wa.send_template("hello_world", "5511999999999")
+            emulator.inject(131000)
+            await wa.send_template("hello_world", "5511999999999")
+            await wa.download_media(f"{emulator.url}/download/missing", "image/png")
+            return wa.metrics.snapshot()
+
+    snapshot = asyncio.run(main())
+    requests = by_endpoint(snapshot)
+    assert requests[("POST", "messages", "template")]["statuses"] == {
+        "200": 1,
+        "500": 1,
+    }
+    assert requests[("GET", "download", "")]["statuses"] == {"400": 1}
+    assert snapshot["errors"] == {131000: 1, 100: 1}
@@ -0,0 +1,91 @@
+import asyncio
+import sqlite3
+import time
+import pytest
+from whatsapp.emulator import GraphEmulator
+from whatsapp.errors import UnknownErrorException
+from whatsapp.outbox import Outbox
+from conftest import client, async_client
+
+
+def crash(path: str, emulator: GraphEmulator, recipients: list) -> None:
+    """Leaves pending entries in an outbox, like a process killed while sending."""
+    url = f"{emulator.base_url}/123/messages"
+    with sqlite3.connect(path) as db:
+        for i, recipient in enumerate(recipients):
+            payload = (
+                '{"messaging_product": "whatsapp", "type": "template", '
+                f'"to": "{recipient}", "template": {{"name": "hello_world"}}}}'
+            )
+            db.execute(
+                "INSERT INTO outbox (id, url, payload, status, created, updated) "
+                "VALUES (?, ?, ?, 'pending', ?, ?)",
+                (f"lost{i}", url, payload, time.time(), time.time()),
+            )
+
+
+def test_messages_are_journaled_and_settled(emulator, tmp_path):
+    wa = client(emulator, outbox=str(tmp_path / "outbox.db"))
+    wa.send_template("hello_world", "5511999999999")
+    emulator.inject(131000)
+    with pytest.raises(UnknownErrorException):
+        wa.send_template("hello_world", "5511999999999")
+    # read receipts are not journaled
+    receipt = {"messaging_product": "whatsapp", "status": "read", "message_id": "1"}
+    wa._request("POST", wa.url, headers=wa.headers, json=receipt)
+    assert wa.outbox.counts() == {"sent": 1, "failed": 1}
+    assert wa.outbox.pending() == [] and wa.replay_outbox() == []
+    wa.outbox.close()
+
+
+def test_pending_messages_are_replayed(emulator, tmp_path):
+    path = str(tmp_path / "outbox.db")
+    Outbox(path).close()
+    crash(path, emulator, ["5511000000001", "5511000000002"])
+
+    wa = client(emulator, outbox=path)
+    results = wa.replay_outbox()
+    assert sorted(r.recipient for r in results) == ["5511000000001", "5511000000002"]
+    assert all(r.ok for r in results)
+    # the entries are replayed in parallel, in any order
+    assert sorted(m["to"] for m in emulator.messages) == sorted(
+        r.recipient for r in results
+    )
+    assert wa.outbox.counts() == {"sent": 2}
+    # the replayed entries are settled, a second replay sends nothing
+    assert wa.replay_outbox() == []
+    wa.outbox.close()
+    assert Outbox(path).pending() == []
+
+
+def test_async_client_journals_and_replays(emulator, tmp_path):
+    path = str(tmp_path / "outbox.db")
+    Outbox(path).close()
+    crash(path, emulator, ["5511000000001"])
+
+    async def main():
+        async with async_client(emulator, outbox=path) as wa:
+            replayed = await wa.replay_outbox()
+            await asyncio.gather(
+                *(
+                    wa.send_template("hello_world", f"55110000001{i:02d}")
+                    for i in range(20)
+                )
+            )
+            return replayed, wa.outbox
+
+    replayed, outbox = asyncio.run(main())
+    assert [r.ok for r in replayed] == [True]
+    assert outbox.counts() == {"sent": 21}
+    # concurrent sends share commits
+    assert outbox.commits < 42
+    outbox.close()
+
+
+def test_outbox_rejects_unknown_modes_and_closed_writes(tmp_path):
+    with pytest.raises(ValueError):
+        Outbox(str(tmp_path / "outbox.db"), synchronous="SOMETIMES")
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    outbox.close()
+    with pytest.raises(RuntimeError):
+        outbox.record("https://graph.facebook.com/v20.0/123/messages", {})
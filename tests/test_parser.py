@@ -0,0 +1,73 @@
+import pytest
+from whatsapp import WhatsApp, Message
+from whatsapp.ext._parser import parse, parse_all
+from conftest import delivery, received_message, status_update, webhook_value
+
+
+@pytest.fixture
+def wa():
+    return WhatsApp("token", {1: "123"}, offline=True)
+
+
+def test_text_message(wa):
+    data = delivery(webhook_value([received_message("hello")]))
+    event = parse(data)
+    assert (event.kind, event.id, event.type, event.content) == (
+        "message",
+        "wamid.1",
+        "text",
+        "hello",
+    )
+    assert (event.author, event.mobile, event.name) == ("111", "111", "Alice")
+    assert wa.is_message(data)
+    assert wa.get_message(data) == "hello"
+    assert wa.get_message_timestamp(data) == "1700000000"
+    assert wa.get_image(data) is None
+
+
+@pytest.mark.parametrize(
+    "type, getter",
+    [
+        ("image", "get_image"),
+        ("video", "get_video"),
+        ("audio", "get_audio"),
+        ("document", "get_document"),
+        ("sticker", "get_sticker"),
+        ("location", "get_location"),
+        ("interactive", "get_interactive_response"),
+    ],
+)
+def test_media_message(wa, type, getter):
+    body = {"id": "media", "mime_type": "x/y"}
+    data = delivery(webhook_value([received_message(body, type=type)]))
+    assert getattr(wa, getter)(data) == body
+    msg = Message(instance=wa, data=data)
+    assert (msg.id, msg.type, msg.name, msg.to) == ("wamid.1", type, "Alice", "111")
+    assert getattr(msg, type) == body
+    assert msg.content is None
+
+
+def test_status(wa):
+    data = delivery(webhook_value(statuses=[status_update("wamid.2", "read")]))
+    assert not wa.is_message(data)
+    assert wa.get_delivery(data) == "read"
+    assert wa.get_message_id(data) is None
+    assert wa.changed_field(data) == "messages"
+
+
+def test_message_without_data(wa):
+    msg = Message(instance=wa, to="222", content="hi")
+    assert (msg.id, msg.type, msg.to, msg.content, msg.name) == (
+        None,
+        "text",
+        "222",
+        "hi",
+        None,
+    )
+    assert parse({}) is None
+    assert list(parse_all({})) == []
+
+
+def test_event_data_roundtrip():
+    event = next(parse_all(delivery(webhook_value([received_message("hello")]))))
+    assert parse(event.data).content == "hello"
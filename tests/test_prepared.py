@@ -0,0 +1,101 @@
+import asyncio
+import json
+import pytest
+from whatsapp import PreparedMessage, Slot
+from whatsapp.ext._bulk import template_message
+from conftest import client, async_client
+
+COMPONENTS = [
+    {
+        "type": "body",
+        "parameters": [
+            {"type": "text", "text": Slot("name")},
+            {"type": "text", "text": Slot("total")},
+        ],
+    }
+]
+
+
+def parameters(message: dict) -> list:
+    return [p["text"] for p in message["template"]["components"][0]["parameters"]]
+
+
+def test_render_matches_the_message_built_per_send():
+    prepared = PreparedMessage.template("hello_world")
+    assert prepared.slots == ("to",) and prepared.type == "template"
+    expected = dict(template_message("hello_world", None, "en_US"), to="5511")
+    assert json.loads(prepared.render("5511")) == expected
+
+    prepared = PreparedMessage.template("order", COMPONENTS, "pt_BR")
+    name = 'Ana "100%" \\ ção\n'
+    body = prepared.render("5511", name=name, total=12.5)
+    assert body.type == "template"
+    assert parameters(json.loads(body)) == [name, 12.5]
+    assert prepared.payload("5522", name="Bia", total="1")["to"] == "5522"
+    with pytest.raises(ValueError):
+        prepared.render("5511", name="Ana")
+
+
+def test_slots_anywhere_and_repeated():
+    prepared = PreparedMessage(
+        {
+            "type": "text",
+            "text": {"body": Slot("body"), "preview_url": Slot("preview")},
+            "biz_opaque_callback_data": Slot("body"),
+        }
+    )
+    message = prepared.payload("5511", body="Hi %s", preview=False)
+    assert message["text"] == {"body": "Hi %s", "preview_url": False}
+    assert message["biz_opaque_callback_data"] == "Hi %s"
+    assert message["messaging_product"] == "whatsapp"
+    with pytest.raises(TypeError):
+        PreparedMessage({"type": "text", "text": {"body": object()}})
+
+
+def test_send_prepared(emulator):
+    wa = client(emulator, metrics=True)
+    prepared = PreparedMessage.template("order", COMPONENTS)
+    sent = wa.send_prepared(prepared, "5511999999999", name="Ana", total="10")
+    assert sent["messages"][0]["id"].startswith("wamid.")
+    results = wa.send_prepared_bulk(
+        prepared,
+        [(f"5511{i:09d}", {"name": f"user {i}", "total": str(i)}) for i in range(10)],
+        concurrency=4,
+    )
+    assert all(r.ok for r in results)
+    for message in emulator.messages[1:]:
+        i = int(message["to"][4:])
+        assert parameters(message) == [f"user {i}", str(i)]
+    (labels,) = wa.metrics.snapshot()["requests"]
+    assert labels["type"] == "template" and labels["count"] == 11
+
+
+def test_send_prepared_with_outbox_and_batch(emulator, tmp_path):
+    prepared = PreparedMessage({"type": "text", "text": {"body": "Hello"}})
+    wa = client(emulator, outbox=str(tmp_path / "outbox.db"), batch=True)
+    results = wa.send_prepared_bulk(prepared, [f"5511{i:09d}" for i in range(5)])
+    assert all(r.ok for r in results)
+    assert wa.outbox.counts() == {"sent": 5}
+    assert emulator.stats["batches"] >= 1
+    wa.outbox.close()
+
+
+def test_async_send_prepared(emulator):
+    prepared = PreparedMessage.template("order", COMPONENTS)
+
+    async def recipients():
+        for i in range(20):
+            yield f"5511{i:09d}", {"name": f"user {i}", "total": str(i)}
+
+    async def main():
+        async with async_client(emulator) as wa:
+            sent = await wa.send_prepared(prepared, "5511", name="Ana", total="1")
+            results = await wa.send_prepared_bulk(prepared, recipients())
+            return sent, results
+
+    sent, results = asyncio.run(main())
+    assert sent["messages"][0]["id"].startswith("wamid.")
+    assert all(r.ok for r in results) and len(results) == 20
+    assert sorted(m["to"] for m in emulator.messages) == sorted(
+        ["5511"] + [f"5511{i:09d}" for i in range(20)]
+    )
@@ -0,0 +1,62 @@
+import asyncio
+import time
+import pytest
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.ratelimit import RateLimiter, TokenBucket, sender_of
+from conftest import FakeSession
+
+
+def test_bucket_allows_burst_then_rate():
+    bucket = TokenBucket(rate=100, burst=5)
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    assert bucket.reserve() == pytest.approx(0.01, abs=0.002)
+    assert bucket.reserve() == pytest.approx(0.02, abs=0.002)
+    bucket.refund()
+    assert bucket.reserve() == pytest.approx(0.02, abs=0.002)
+
+
+def test_sender_of():
+    assert sender_of("https://graph.facebook.com/v24.0/123/messages") == "123"
+    assert sender_of("https://graph.facebook.com/v24.0/123/media") is None
+    assert sender_of("https://graph.facebook.com/v24.0/456") is None
+
+
+def test_sync_sends_are_limited_per_sender():
+    wa = WhatsApp(
+        "token", {1: "123", 2: "456"}, offline=True, rate_limit=50, rate_burst=1
+    )
+    wa.session = FakeSession()
+    start = time.monotonic()
+    for _ in range(6):
+        wa.send_template("hello_world", "999")
+        wa.send_template("hello_world", "999", sender=2)
+    elapsed = time.monotonic() - start
+    # 5 waits of 1/50 s for each number, the two numbers do not wait for each other
+    assert 0.09 < elapsed < 0.2
+    assert {url.split("/")[-2] for _, url in wa.session.sent} == {"123", "456"}
+    # media and other calls are not limited
+    assert wa.rate_limiter.bucket("123").reserve() > 0
+    assert sender_of(wa.base_url + "/media-id") is None
+
+
+def test_sync_and_async_clients_share_a_limiter():
+    limiter = RateLimiter(50, burst=1)
+    wa = WhatsApp("token", {1: "123"}, offline=True, rate_limit=limiter)
+    awa = AsyncWhatsApp("token", {1: "123"}, offline=True, rate_limit=limiter)
+    wa.session = FakeSession()
+    session = FakeSession(awaitable=True)
+
+    async def main():
+        awa._session, awa._session_loop = session, asyncio.get_running_loop()
+        await asyncio.gather(
+            *(awa._request("POST", awa.url, json={}) for _ in range(5))
+        )
+
+    start = time.monotonic()
+    for _ in range(5):
+        wa._request("POST", wa.url, json={})
+    asyncio.run(main())
+    assert 0.17 < time.monotonic() - start < 0.4
+    times = sorted(t for t, _ in wa.session.sent + session.sent)
+    # request n is never sent before the bucket had time to refill n tokens
+    assert all(t - start >= n / 50 - 0.005 for n, t in enumerate(times))
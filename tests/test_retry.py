@@ -0,0 +1,163 @@
+import asyncio
+import socket
+import time
+import pytest
+import requests
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.retry import RetryPolicy, retry_after
+from conftest import FakeResponse, FakeSession
+
+
+def error(code: int) -> dict:
+    return {"error": {"message": "error", "code": code}}
+
+
+def client(session, **kwargs) -> WhatsApp:
+    wa = WhatsApp("token", {1: "123"}, offline=True, **kwargs)
+    wa.session = session
+    return wa
+
+
+def test_retries_transient_codes():
+    session = FakeSession(
+        FakeResponse(400, error(4)),
+        FakeResponse(503, error(131016)),
+        FakeResponse(200, {"messages": [{"id": "wamid"}]}),
+    )
+    wa = client(session, retry=RetryPolicy(base_delay=0.001))
+    assert wa.send_template("hello_world", "999") == {"messages": [{"id": "wamid"}]}
+    stats = wa.retry_policy.stats.snapshot()
+    assert (stats["requests"], stats["retries"], stats["gave_up"]) == (1, 2, 0)
+    assert stats["reasons"] == {"code 4": 1, "code 131016": 1}
+
+
+def test_does_not_retry_permanent_codes():
+    session = FakeSession(FakeResponse(400, error(100)), FakeResponse(200, {}))
+    wa = client(session, retry=3)
+    r = wa._request("POST", wa.url, json={})
+    assert r.status_code == 400 and len(session.responses) == 1
+    assert wa.retry_policy.stats.retries == 0
+
+
+def test_gives_up_after_max_attempts():
+    session = FakeSession(*(FakeResponse(502, {}) for _ in range(3)))
+    wa = client(session, retry=RetryPolicy(max_attempts=3, base_delay=0.001))
+    assert wa._request("GET", wa.url).status_code == 502
+    stats = wa.retry_policy.stats.snapshot()
+    assert (stats["retries"], stats["gave_up"]) == (2, 1)
+    assert stats["reasons"] == {"status 502": 2}
+
+
+def test_honors_retry_after():
+    session = FakeSession(
+        FakeResponse(429, {}, {"Retry-After": "0.05"}), FakeResponse(200, {})
+    )
+    wa = client(session, retry=RetryPolicy(base_delay=0))
+    start = time.monotonic()
+    assert wa._request("GET", wa.url).status_code == 200
+    assert time.monotonic() - start >= 0.05
+    assert wa.retry_policy.stats.backoff_seconds == pytest.approx(0.05)
+    assert retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert retry_after("soon") is None
+
+
+def test_deadline():
+    session = FakeSession(FakeResponse(503, error(2)), FakeResponse(200, {}))
+    wa = client(session, retry=RetryPolicy(base_delay=10, max_delay=10, deadline=0.1))
+    # the jittered delay may be shorter than the deadline, force the longest one
+    wa.retry_policy.backoff = lambda retry: 10
+    assert wa._request("GET", wa.url).status_code == 503
+    assert wa.retry_policy.stats.deadline_exceeded == 1
+
+
+def test_retries_connection_errors_and_rebuilds_streamed_bodies(tmp_path, monkeypatch):
+    media = tmp_path / "image.png"
+    media.write_bytes(b"png bytes")
+    opened = []
+
+    def tracked_open(*args, **kwargs):
+        opened.append(open(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr("whatsapp.ext._media.open", tracked_open, raising=False)
+    session = FakeSession(
+        requests.ConnectionError("refused"), FakeResponse(200, {"id": "media"})
+    )
+    wa = client(session, retry=RetryPolicy(base_delay=0.001))
+    assert wa.upload_media(str(media)) == {"id": "media"}
+    assert len(session.bodies) == 2
+    assert session.bodies[0] == session.bodies[1]
+    assert b"png bytes" in session.bodies[1]
+    # the file is opened once for all the attempts and closed after the upload
+    assert len(opened) == 1 and opened[0].closed
+
+
+def test_async_client_retries():
+    session = FakeSession(
+        FakeResponse(400, error(130429)),
+        FakeResponse(200, {"messages": [{"id": "wamid"}]}),
+        awaitable=True,
+    )
+    wa = AsyncWhatsApp(
+        "token", {1: "123"}, offline=True, retry=RetryPolicy(base_delay=0.001)
+    )
+
+    async def main():
+        wa._session, wa._session_loop = session, asyncio.get_running_loop()
+        r = await wa._request("POST", wa.url, json={})
+        return r.status, await r.json()
+
+    assert asyncio.run(main()) == (200, {"messages": [{"id": "wamid"}]})
+    assert wa.retry_policy.stats.reasons == {"code 130429": 1}
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    delays = [policy.backoff(5) for _ in range(200)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+    assert not policy.is_retryable_code(131048)  # spam is throttling, but permanent
+    assert policy.is_retryable_code(80007)
+
+
+def test_messages_are_only_retried_when_they_were_not_processed():
+    session = FakeSession(
+        FakeResponse(503, {}),
+        FakeResponse(500, {}),
+        FakeResponse(500, {}),
+        FakeResponse(200, {}),
+    )
+    wa = client(session, retry=RetryPolicy(base_delay=0.001))
+    # a 503 message was not processed, a 500 one may have been sent
+    r = wa._request("POST", f"{wa.base_url}/123/messages", json={"to": "999"})
+    assert r.status_code == 500
+    assert len(session.responses) == 2
+    # other requests are retried on 500
+    assert wa._request("GET", wa.url).status_code == 200
+    assert wa.retry_policy.stats.reasons == {"status 503": 1, "status 500": 1}
+
+
+def test_messages_are_only_retried_on_errors_before_sending():
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    port = closed.getsockname()[1]
+    closed.close()
+    wa = WhatsApp(
+        "token",
+        {1: "123"},
+        offline=True,
+        base_url=f"http://127.0.0.1:{port}",
+        retry=RetryPolicy(max_attempts=2, base_delay=0.001),
+    )
+    # the connection was refused, the message never left
+    with pytest.raises(requests.ConnectionError):
+        wa.send_template("hello_world", "999")
+    assert wa.retry_policy.stats.reasons == {"ConnectionError": 1}
+    assert wa.transport.unsent(requests.ConnectTimeout("connect timeout"))
+
+    # the connection was lost after the message was written, it may have been sent
+    session = FakeSession(requests.ConnectionError("reset"), FakeResponse(200, {}))
+    wa = client(session, retry=RetryPolicy(base_delay=0.001))
+    with pytest.raises(requests.ConnectionError):
+        wa.send_template("hello_world", "999")
+    assert len(session.responses) == 1 and wa.retry_policy.stats.retries == 0
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from conftest import async_client
+
+
+def test_sends_return_their_result(emulator):
+    async def main():
+        async with async_client(emulator) as wa:
+            sent = await wa.send_template("hello_world", "5511999999999")
+            many = await asyncio.gather(
+                *(wa.send_template("hello_world", f"5511{i:09d}") for i in range(50))
+            )
+            return sent, many
+
+    sent, many = asyncio.run(main())
+    assert sent["messages"][0]["id"].startswith("wamid.")
+    assert len({r["messages"][0]["id"] for r in many}) == 50
+
+
+def test_spawned_sends_are_drained_on_close(emulator):
+    emulator.latency = 0.02
+
+    async def main():
+        async with async_client(emulator) as wa:
+            tasks = [
+                wa.spawn(wa.send_template("hello_world", f"5511{i:09d}"))
+                for i in range(20)
+            ]
+            assert len(wa._tasks) == 20
+        return wa, tasks
+
+    wa, tasks = asyncio.run(main())
+    assert len(emulator.messages) == 20
+    assert all(task.done() for task in tasks) and not wa._tasks
+
+
+def test_drain_cancels_after_timeout_and_logs_failures(emulator, caplog):
+    async def failing():
+        raise RuntimeError("broken send")
+
+    async def main():
+        wa = async_client(emulator)
+        emulator.latency = 1
+        slow = wa.spawn(wa.send_template("hello_world", "5511999999999"))
+        wa.spawn(failing())
+        await wa.drain(timeout=0.05)
+        emulator.latency = 0
+        await wa.aclose()
+        return slow
+
+    with caplog.at_level(logging.ERROR):
+        slow = asyncio.run(main())
+    assert slow.cancelled()
+    assert "broken send" in caplog.text
@@ -0,0 +1,102 @@
+import asyncio
+import io
+import os
+import pytest
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.transport import (
+    AsyncHttpxTransport,
+    BufferedResponse,
+    HttpxTransport,
+    Transport,
+    http2_available,
+)
+from conftest import client, async_client
+
+CONTENT = os.urandom(300 * 1024)
+
+
+def test_httpx_transport(emulator, tmp_path):
+    wa = client(emulator, transport="httpx", batch=True)
+    assert isinstance(wa.transport, HttpxTransport) and wa.session is None
+    # HTTP/2 is used when h2 is installed, HTTP/1.1 otherwise
+    assert wa.transport.client._transport._pool._http2 == http2_available()
+    sent = wa.send_template("hello_world", "5511999999999")
+    assert sent["messages"][0]["id"].startswith("wamid.")
+    assert emulator.stats["batches"] == 1
+
+    media = tmp_path / "photo.jpg"
+    media.write_bytes(CONTENT)
+    media_id = wa.upload_media(str(media))["id"]
+    buffer = io.BytesIO()
+    wa.download_media(wa.query_media_url(media_id), "image/jpeg", buffer)
+    assert buffer.getvalue() == CONTENT
+    wa.transport.close()
+
+
+def test_async_httpx_transport(emulator, tmp_path):
+    media = tmp_path / "photo.jpg"
+    media.write_bytes(CONTENT)
+
+    async def main():
+        async with async_client(emulator, transport="httpx", batch=True) as wa:
+            assert isinstance(wa.transport, AsyncHttpxTransport)
+            sent = await asyncio.gather(
+                *(wa.send_template("hello_world", f"5511{i:09d}") for i in range(20))
+            )
+            media_id = (await wa.upload_media(str(media)))["id"]
+            url = (await wa.query_media_url(media_id))["url"]
+            buffer = io.BytesIO()
+            await wa.download_media(url, "image/jpeg", buffer)
+            return sent, buffer.getvalue(), wa
+
+    sent, downloaded, wa = asyncio.run(main())
+    assert len({r["messages"][0]["id"] for r in sent}) == 20
+    assert emulator.stats["batches"] == 1 and downloaded == CONTENT
+    assert wa.transport._client is None
+
+
+def test_unknown_transport():
+    with pytest.raises(ValueError):
+        WhatsApp("token", {1: "123"}, offline=True, transport="urllib3")
+    with pytest.raises(ValueError):
+        AsyncWhatsApp("token", {1: "123"}, offline=True, transport="requests")
+
+
+def test_custom_transport_keeps_retries_and_metrics():
+    class Scripted(Transport):
+        connection_errors = (ConnectionError,)
+        unsent_errors = (ConnectionRefusedError,)
+
+        def __init__(self, *answers):
+            self.answers = list(answers)
+            self.requests = []
+
+        def send(self, method, url, kwargs):
+            self.requests.append((method, url, kwargs["json"]))
+            answer = self.answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+    class Response:
+        status_code, ok, headers = 200, True, {}
+
+        def json(self):
+            return {"messages": [{"id": "wamid.1"}]}
+
+    transport = Scripted(ConnectionRefusedError("refused"), Response())
+    wa = WhatsApp(
+        "token", {1: "123"}, offline=True, transport=transport, retry=2, metrics=True
+    )
+    assert wa.send_template("hello_world", "5511999999999") == Response().json()
+    assert len(transport.requests) == 2
+    assert transport.requests[1][2]["to"] == "5511999999999"
+    assert wa.retry_policy.stats.retries == 1
+
+
+def test_buffered_response():
+    async def main():
+        r = BufferedResponse(200, b'{"id": "1"}', "https://graph.facebook.com")
+        return r.ok, await r.json(), await r.text()
+
+    assert asyncio.run(main()) == (True, {"id": "1"}, '{"id": "1"}')
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from whatsapp import AsyncWhatsApp
+from whatsapp.async_ext._media import multipart
+
+SIZE = 50 * 1024 * 1024
+
+
+@pytest.fixture
+def server():
+    """Stand-in of the media endpoint reading the upload slowly, like a real network would."""
+    received = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            digest = hashlib.sha256()
+            read = 0
+            while read < length:
+                chunk = self.rfile.read(min(1024 * 1024, length - read))
+                digest.update(chunk)
+                read += len(chunk)
+                time.sleep(0.01)
+            received.update(
+                path=self.path,
+                length=read,
+                sha256=digest.hexdigest(),
+                content_type=self.headers["Content-Type"],
+            )
+            body = json.dumps({"id": "media.1"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v20.0", received
+    server.shutdown()
+
+
+def test_upload_streams_without_blocking_the_loop(server, tmp_path):
+    base_url, received = server
+    media = tmp_path / "video.mp4"
+    content = os.urandom(1024 * 1024) * (SIZE // (1024 * 1024))
+    media.write_bytes(content)
+    wa = AsyncWhatsApp("token", {1: "123"}, offline=True, base_url=base_url)
+    updates = []
+
+    async def main():
+        lag = 0.0
+        uploading = True
+
+        async def ticker():
+            nonlocal lag
+            while uploading:
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lag = max(lag, time.perf_counter() - start - 0.005)
+
+        start = time.perf_counter()
+        async with wa:
+            # the session is created before the ticker starts, importing aiohttp blocks the loop
+            wa.session
+            task = asyncio.create_task(ticker())
+            result = await wa.upload_media(
+                str(media), progress=lambda sent, total: updates.append((sent, total))
+            )
+        elapsed = time.perf_counter() - start
+        uploading = False
+        await task
+        return result, elapsed, lag
+
+    result, elapsed, lag = asyncio.run(main())
+    assert result == {"id": "media.1"}
+    # the server needs at least 0.5s to read the 50 chunks, the loop never stalls meanwhile
+    assert elapsed > 0.5
+    assert lag < 0.1
+    assert received["path"] == "/v20.0/123/media"
+    total = updates[-1][1]
+    assert updates[-1] == (total, total) == (received["length"], received["length"])
+    assert all(a[0] < b[0] for a, b in zip(updates, updates[1:]))
+    boundary = received["content_type"].split("boundary=")[1]
+    head, tail = multipart(boundary, "video.mp4", "video/mp4")
+    assert received["sha256"] == hashlib.sha256(head + content + tail).hexdigest()
+
+
+def test_multipart_filename_is_escaped():
+    head, tail = multipart("b", 'a"b\r\nc.mp4', "video/mp4")
+    assert b'filename="a%22b%0D%0Ac.mp4"\r\n' in head
+    assert head.count(b"\r\n") == multipart("b", "c.mp4", "video/mp4")[0].count(b"\r\n")
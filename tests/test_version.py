@@ -0,0 +1,78 @@
+import pytest
+from whatsapp import WhatsApp, AsyncWhatsApp
+from whatsapp.constants import DEFAULT_API_VERSION
+from whatsapp.ext import _version
+from conftest import FakeResponse
+
+CHANGELOG = "<table><tr><td>Version</td><td>v99.0</td></tr></table>"
+
+
+@pytest.fixture
+def calls(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHATSAPP_CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        if url == _version.PYPI_URL:
+            return FakeResponse(body={"info": {"version": "0"}})
+        return FakeResponse(text=CHANGELOG)
+
+    monkeypatch.setattr("requests.get", get)
+    return calls
+
+
+@pytest.mark.parametrize("cls", [WhatsApp, AsyncWhatsApp])
+def test_pinned_version_makes_no_request(calls, cls):
+    wa = cls("token", {1: "123"}, version="v20.0", update_check=False)
+    assert wa.LATEST == "v20.0"
+    assert calls == []
+
+
+@pytest.mark.parametrize("cls", [WhatsApp, AsyncWhatsApp])
+def test_offline_makes_no_request(calls, cls):
+    wa = cls("token", {1: "123"}, offline=True)
+    assert wa.LATEST == DEFAULT_API_VERSION
+    assert calls == []
+
+
+def test_latest_version_is_cached(calls):
+    assert WhatsApp("token", {1: "123"}).LATEST == "v99.0"
+    assert WhatsApp("token", {1: "123"}).LATEST == "v99.0"
+    assert calls == [_version.CHANGELOG_URL, _version.PYPI_URL]
+    # offline mode reuses the cached version
+    assert WhatsApp("token", {1: "123"}, offline=True).LATEST == "v99.0"
+
+
+def test_expired_cache_is_refreshed(calls):
+    WhatsApp("token", {1: "123"}, update_check=False)
+    WhatsApp("token", {1: "123"}, update_check=False, version_cache_ttl=0)
+    assert calls == [_version.CHANGELOG_URL, _version.CHANGELOG_URL]
+
+
+def test_failed_fetches_are_not_retried_before_failure_ttl(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHATSAPP_CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        raise OSError("network unreachable")
+
+    monkeypatch.setattr("requests.get", get)
+    assert WhatsApp("token", {1: "123"}).LATEST == DEFAULT_API_VERSION
+    assert WhatsApp("token", {1: "123"}).LATEST == DEFAULT_API_VERSION
+    assert calls == [_version.CHANGELOG_URL, _version.PYPI_URL]
+    monkeypatch.setattr(_version, "FAILURE_TTL", 0)
+    WhatsApp("token", {1: "123"})
+    assert calls == [_version.CHANGELOG_URL, _version.PYPI_URL] * 2
+
+
+def test_failed_cache_write_leaves_no_temporary_file(monkeypatch, tmp_path):
+    monkeypatch.setenv("WHATSAPP_CACHE_DIR", str(tmp_path))
+
+    def replace(src, dst):
+        raise OSError("read-only")
+
+    monkeypatch.setattr("os.replace", replace)
+    _version.write_cache("graph_api", "v99.0")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,93 @@
+import pytest
+from fastapi.testclient import TestClient
+from whatsapp import WhatsApp, AsyncWhatsApp
+from conftest import (
+    async_client,
+    contact,
+    delivery,
+    received_message,
+    status_update,
+    text_delivery,
+    webhook_value,
+)
+
+# two entries: one message, then two messages from different users and two statuses
+DELIVERY = delivery(
+    webhook_value([received_message("first")]),
+    webhook_value(
+        [
+            received_message("second", "wamid.2", "222"),
+            received_message("third", "wamid.3", "333"),
+        ],
+        [status_update("wamid.a", "delivered"), status_update("wamid.b", "read")],
+        contacts=[contact("222", "Bob"), contact("333", "Carol")],
+    ),
+)
+
+
+@pytest.fixture(params=[WhatsApp, AsyncWhatsApp])
+def wa(request):
+    return request.param("token", {1: "123"}, offline=True)
+
+
+def test_iter_events_walks_every_message_and_status(wa):
+    events = list(wa.iter_events(DELIVERY))
+    assert [kind for kind, _ in events] == ["message"] * 3 + ["status"] * 2
+    messages = [event for kind, event in events if kind == "message"]
+    assert [wa.get_message(m) for m in messages] == ["first", "second", "third"]
+    assert [wa.get_name(m) for m in messages] == ["Alice", "Bob", "Carol"]
+    statuses = [event for kind, event in events if kind == "status"]
+    assert [wa.get_delivery(s) for s in statuses] == ["delivered", "read"]
+
+
+def test_hook_dispatches_every_event(wa):
+    received, statuses = [], []
+
+    async def on_message(msg):
+        received.append((msg.id, msg.name, msg.content))
+
+    async def on_status(event):
+        statuses.append(wa.get_delivery(event))
+
+    wa.on_message(on_message)
+    wa.on_status(on_status)
+    response = TestClient(wa.app).post("/", json=DELIVERY)
+    assert response.json() == {"success": True}
+    assert received == [
+        ("wamid.1", "Alice", "first"),
+        ("wamid.2", "Bob", "second"),
+        ("wamid.3", "Carol", "third"),
+    ]
+    assert statuses == ["delivered", "read"]
+
+
+def test_batch_handler_receives_the_whole_delivery(wa):
+    batches, single = [], []
+
+    async def on_batch(messages):
+        batches.append([msg.id for msg in messages])
+
+    async def on_message(msg):
+        single.append(msg)
+
+    wa.on_message(on_message)
+    wa.on_messages_batch(on_batch)
+    TestClient(wa.app).post("/", json=DELIVERY)
+    assert batches == [["wamid.1", "wamid.2", "wamid.3"]]
+    assert single == []
+
+
+def test_async_handler_replies(emulator):
+    wa = async_client(emulator)
+    replies = []
+
+    async def on_message(msg):
+        replies.append(await msg.reply("Hello back"))
+
+    wa.on_message(on_message)
+    with TestClient(wa.app) as client:
+        assert client.post("/", json=text_delivery()).json() == {"success": True}
+    assert replies[0]["messages"][0]["id"].startswith("wamid.")
+    (sent,) = emulator.messages
+    assert sent["text"]["body"] == "Hello back"
+    assert sent["context"] == {"message_id": "wamid.1"}
@@ -6,8 +6,10 @@ load_dotenv()
 token = getenv("GRAPH_API_TOKEN")
 phone_number_id = {1: getenv("TEST_PHONE_NUMBER_ID")}
 dest_phone_number = getenv("DEST_PHONE_NUMBER")
+# set it to the base_url printed by `python -m whatsapp.emulator` to run without the real API
+base_url = getenv("GRAPH_API_URL", "")
 
-app = WhatsApp(token=token, phone_number_id=phone_number_id, update_check=False)
+app = WhatsApp(token=token, phone_number_id=phone_number_id, base_url=base_url, update_check=False)
 msg = app.create_message(to=dest_phone_number, content="Hello world")
 
 
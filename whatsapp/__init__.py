@@ -3,18 +3,17 @@ Unofficial Python wrapper for the WhatsApp Cloud API.
 """
 
 from __future__ import annotations
-import requests
+from typing import Union
 import logging
-import json
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
-from fastapi import FastAPI, HTTPException, Request
-from uvicorn import run as _run
+import threading
 from .constants import VERSION
-from .ext._property import authorized
-from .ext._send_others import send_custom_json, send_contacts
+from .ext._version import latest_api_version, check_for_updates
+from .ext._property import authorized, executor
+from .ext._session import create_session, request, post_batch, close, enter, exit
+from .ext._send_others import send_custom_json, send_prepared, send_contacts
 from .ext._message import send_template
+from .ext._bulk import BulkResult, send_template_bulk, broadcast, send_prepared_bulk, replay_outbox
 from .ext._send_media import (
     send_image,
     send_video,
@@ -43,14 +42,58 @@ from .ext._static import (
     get_location,
     get_video,
     changed_field,
+    iter_events,
+)
+from .ext._dispatch import dispatch
+from .ext._queue import DispatchQueue
+from .ratelimit import RateLimiter, create_limiter
+from .retry import RetryPolicy, create_policy
+from .metrics import Metrics, create_metrics
+from .dedup import Deduplicator, create_deduplicator
+from .outbox import Outbox, create_outbox
+from .batch import BATCH_WINDOW, Batcher, AsyncBatcher
+from .executor import SendExecutor
+from .prepared import PreparedMessage, Slot
+from .transport import (
+    Transport,
+    AsyncTransport,
+    create_transport,
+    create_async_transport,
+)
+from .cache import MEDIA_URL_TTL, MediaCache, TTLCache, SingleFlight, AsyncSingleFlight, create_media_cache
+from .ext._parser import WebhookEvent
+from .ext._base_message import BaseMessage
+from .ext._payloads import (
+    messages_url,
+    reaction_message,
+    read_receipt,
+    text_message,
 )
 
 from .async_ext._property import authorized as async_authorized
+from .async_ext._session import (
+    session as async_session,
+    request as async_request,
+    post_batch as async_post_batch,
+    stream as async_stream,
+    aclose,
+    aenter,
+    aexit,
+    spawn,
+    drain,
+)
 from .async_ext._send_others import (
     send_custom_json as async_send_custom_json,
+    send_prepared as async_send_prepared,
     send_contacts as async_send_contacts,
 )
 from .async_ext._message import send_template as async_send_template
+from .async_ext._bulk import (
+    send_template_bulk as async_send_template_bulk,
+    broadcast as async_broadcast,
+    send_prepared_bulk as async_send_prepared_bulk,
+    replay_outbox as async_replay_outbox,
+)
 from .async_ext._send_media import (
     send_image as async_send_image,
     send_video as async_send_video,
@@ -88,6 +131,7 @@ from .async_ext._static import (
     get_location as async_get_location,
     get_video as async_get_video,
     changed_field as async_changed_field,
+    iter_events as async_iter_events,
 )
 
 from .errors import Handle
@@ -103,6 +147,30 @@ class WhatsApp:
         verify_token: str = "",
         debug: bool = True,
         version: str = "latest",
+        offline: bool = False,
+        version_cache_ttl: float = 86400,
+        base_url: str = "",
+        timeout: float = 30,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        max_retries: int = 0,
+        keep_message_data: bool = True,
+        ack_first: bool = False,
+        webhook_workers: int = 4,
+        webhook_queue_size: int = 1000,
+        drain_timeout: float = 30,
+        rate_limit: Union[float, RateLimiter, None] = None,
+        rate_burst: Union[int, None] = None,
+        retry: Union[int, RetryPolicy, None] = None,
+        media_cache: Union[MediaCache, str, bool, None] = None,
+        media_url_ttl: float = MEDIA_URL_TTL,
+        metrics: Union[Metrics, bool] = False,
+        dedup: Union[Deduplicator, str, bool, None] = None,
+        outbox: Union[Outbox, str, None] = None,
+        batch: bool = False,
+        batch_window: float = BATCH_WINDOW,
+        executor_workers: Union[int, None] = None,
+        transport: Union[Transport, str, None] = None,
     ):
         """
         Initialize the WhatsApp Object
@@ -111,8 +179,107 @@ class WhatsApp:
             token[str]: Token for the WhatsApp cloud API obtained from the Facebook developer portal
             phone_number_id[str]: Phone number id for the WhatsApp cloud API obtained from the developer portal
             logger[bool]: Whether to enable logging or not (default: True)
+            version[str]: Graph API version to use, "latest" to resolve it from the changelog (default: "latest")
+            offline[bool]: Never use the network while constructing the object: the latest version comes from the cache or DEFAULT_API_VERSION and updates are not checked (default: False)
+            version_cache_ttl[float]: Seconds the resolved API version and update check are cached on disk (default: 86400)
+            base_url[str]: Base url of the Graph API, including the version (default: https://graph.facebook.com/<version>)
+            timeout[float]: Timeout in seconds of every request to the API (default: 30)
+            pool_connections[int]: Number of host pools kept by the HTTP session (default: 10)
+            pool_maxsize[int]: Maximum number of keep-alive connections per host (default: 10)
+            max_retries[int]: Number of retries for connection errors and 502/503/504 responses (default: 0)
+            keep_message_data[bool]: Keep the webhook payload in the data attribute of received messages, False to only keep the parsed fields and the message itself, which takes about a quarter of the memory (default: True)
+            ack_first[bool]: Acknowledge webhook deliveries as soon as they are queued and call the handlers from background workers (default: False)
+            webhook_workers[int]: Number of workers dispatching queued deliveries in ack-first mode (default: 4)
+            webhook_queue_size[int]: Maximum number of queued deliveries in ack-first mode, the webhook answers 503 when it is full (default: 1000)
+            drain_timeout[float]: Seconds the queued deliveries are given to be dispatched when the app shuts down (default: 30)
+            rate_limit[float | RateLimiter]: Messages per second each sender phone number may send, requests wait for capacity instead of being throttled by Meta. Pass a RateLimiter to share it between clients (default: None, no limit)
+            rate_burst[int]: Messages each sender phone number may send at once (default: rate_limit)
+            retry[int | RetryPolicy]: Number of retries of requests that failed for a transient reason (throttling, service unavailable, 429/5xx, connection errors; messages only on 429/503 and on connection errors before they were sent), or a RetryPolicy (default: None, no retries)
+            media_cache[bool | str | MediaCache]: Reuse the media id of files already uploaded from the same phone number: True for an in-memory cache, a path for a SQLite cache shared between processes, or a MediaCache (default: None, no cache)
+            media_url_ttl[float]: Seconds the url returned by query_media_url is reused, 0 disables the cache (default: 240)
+            metrics[bool | Metrics]: Record request latencies, error codes, retries, webhook queue depth and handler durations, read with metrics.snapshot() and served on GET /metrics of app: True, or a Metrics shared between clients (default: False)
+            dedup[bool | str | Deduplicator]: Skip webhook messages and statuses already dispatched, e.g. when Meta delivers them again: True for an in-memory window, a path for a SQLite window shared between workers, or a Deduplicator (default: None, no deduplication)
+            outbox[str | Outbox]: Journal every message in a SQLite outbox before sending it, so that the messages of a crashed process are sent again by replay_outbox(): the path of the outbox (one per process), or an Outbox (default: None, no outbox)
+            batch[bool]: Coalesce the messages sent within batch_window into Graph API batch calls of up to 50 messages, for high-volume sends (default: False)
+            batch_window[float]: Seconds the first queued message waits for others when batch is enabled (default: 0.005)
+            executor_workers[int]: Number of threads of the executor running sends in parallel (default: pool_maxsize)
+            transport[str | Transport]: HTTP stack of the requests: "requests", "httpx" (HTTP/2 if h2 is installed), or a Transport (default: requests)
         """
 
+        self._setup(
+            token=token,
+            phone_number_id=phone_number_id,
+            logger=logger,
+            update_check=update_check,
+            verify_token=verify_token,
+            debug=debug,
+            version=version,
+            offline=offline,
+            version_cache_ttl=version_cache_ttl,
+            base_url=base_url,
+            timeout=timeout,
+            keep_message_data=keep_message_data,
+            ack_first=ack_first,
+            webhook_workers=webhook_workers,
+            webhook_queue_size=webhook_queue_size,
+            drain_timeout=drain_timeout,
+            rate_limit=rate_limit,
+            rate_burst=rate_burst,
+            retry=retry,
+            media_cache=media_cache,
+            media_url_ttl=media_url_ttl,
+            metrics=metrics,
+            dedup=dedup,
+            outbox=outbox,
+            batch=batch,
+            batch_window=batch_window,
+        )
+        self.executor_workers = executor_workers or pool_maxsize
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # the requests session is only created if the requests transport uses it,
+        # the transport reads it on every request so a session assigned later is used
+        self.session = (
+            create_session(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=max_retries,
+            )
+            if transport in (None, "requests")
+            else None
+        )
+        self.transport = create_transport(transport, lambda: self.session, pool_maxsize)
+
+    def _setup(
+        self,
+        token: str,
+        phone_number_id: dict,
+        logger: bool,
+        update_check: bool,
+        verify_token: str,
+        debug: bool,
+        version: str,
+        offline: bool,
+        version_cache_ttl: float,
+        base_url: str,
+        timeout: float,
+        keep_message_data: bool,
+        ack_first: bool,
+        webhook_workers: int,
+        webhook_queue_size: int,
+        drain_timeout: float,
+        rate_limit: Union[float, RateLimiter, None],
+        rate_burst: Union[int, None],
+        retry: Union[int, RetryPolicy, None],
+        media_cache: Union[MediaCache, str, bool, None],
+        media_url_ttl: float,
+        metrics: Union[Metrics, bool],
+        dedup: Union[Deduplicator, str, bool, None],
+        outbox: Union[Outbox, str, None],
+        batch: bool,
+        batch_window: float,
+    ):
+        """Setup shared by WhatsApp and AsyncWhatsApp, the arguments are the ones of WhatsApp."""
         # Check if the version is up to date
         logging.getLogger(__name__).addHandler(logging.NullHandler())
 
@@ -136,56 +303,15 @@ class WhatsApp:
             pass
 
         self.VERSION = VERSION  # package version
-        r = requests.get(
-            "https://developers.facebook.com/docs/graph-api/changelog/"
-        ).text
 
-        # dynamically get the latest version of the API
+        # dynamically get the latest version of the API, cached on disk for version_cache_ttl seconds
         if version == "latest":
-            soup = BeautifulSoup(r, features="html.parser")
-            t1 = soup.findAll("table")
-
-            def makeversion(table: BeautifulSoup) -> str:
-                result = []
-                allrows = table.findAll("tr")
-                for row in allrows:
-                    result.append([])
-                    allcols = row.findAll("td")
-                    for col in allcols:
-                        thestrings = [(s) for s in col.findAll(text=True)]
-                        thetext = "".join(thestrings)
-                        result[-1].append(thetext)
-                return result[0][1]
-
-            self.LATEST = makeversion(t1[0])  # latest version of the API
+            self.LATEST = latest_api_version(offline=offline, ttl=version_cache_ttl)
         else:
             self.LATEST = version
 
         if update_check is True:
-            latest = str(
-                requests.get("https://pypi.org/pypi/whatsapp-python/json").json()[
-                    "info"
-                ]["version"]
-            )
-            if self.VERSION != latest:
-                try:
-                    version_int = int(self.VERSION.replace(".", ""))
-                except:
-                    version_int = 0
-                try:
-                    latest_int = int(latest.replace(".", ""))
-                except:
-                    latest_int = 0
-                # this is to avoid the case where the version is 1.0.10 and the latest is 1.0.2 (possible if user is using the github version)
-                if version_int < latest_int:
-                    if version_int == 0:
-                        logging.critical(
-                            f"There was an error while checking for updates, please check for updates manually. This may be due to the version being a post-release version (e.g. 1.0.0.post1) or a pre-release version (e.g. 1.0.0a1). READ THE CHANGELOG BEFORE UPDATING. NEW VERSIONS MAY BREAK YOUR CODE IF NOT PROPERLY UPDATED."
-                        )
-                    else:
-                        logging.critical(
-                            f"Whatsapp-python is out of date. Please update to the latest version {latest}. READ THE CHANGELOG BEFORE UPDATING. NEW VERSIONS MAY BREAK YOUR CODE IF NOT PROPERLY UPDATED."
-                        )
+            check_for_updates(offline=offline, ttl=version_cache_ttl)
 
         if token == "":
             logging.error("Token not provided")
@@ -195,9 +321,35 @@ class WhatsApp:
             raise ValueError("Phone number ID not provided but required")
         self.token = token
         self.phone_number_id = phone_number_id
-        self.base_url = f"https://graph.facebook.com/{self.LATEST}"
+        self.base_url = base_url or f"https://graph.facebook.com/{self.LATEST}"
         self.url = f"{self.base_url}/{phone_number_id}/messages"
         self.verify_token = verify_token
+        self.timeout = timeout
+        self.keep_message_data = keep_message_data
+        self.drain_timeout = drain_timeout
+        self.rate_limiter = create_limiter(rate_limit, rate_burst)
+        self.retry_policy = create_policy(retry)
+        self.media_cache = create_media_cache(media_cache)
+        self.media_url_cache = TTLCache(ttl=media_url_ttl) if media_url_ttl > 0 else None
+        self._media_url_flight = self._flight_type()
+        self.dispatch_queue = (
+            DispatchQueue(self.dispatch, webhook_workers, webhook_queue_size)
+            if ack_first
+            else None
+        )
+        self.deduplicator = create_deduplicator(dedup)
+        self.outbox = create_outbox(outbox)
+        self.batcher = (
+            self._batcher_type(self._post_batch, window=batch_window)
+            if batch
+            else None
+        )
+        self.metrics = create_metrics(metrics)
+        if self.metrics is not None:
+            if self.retry_policy is not None:
+                self.metrics.track_retries(self.retry_policy.stats)
+            if self.dispatch_queue is not None:
+                self.metrics.track_queue(lambda: self.dispatch_queue.depth)
 
         async def base(*args):
             pass
@@ -205,6 +357,8 @@ class WhatsApp:
         self.message_handler = base
         self.other_handler = base
         self.verification_handler = base
+        self.status_handler = base
+        self.batch_handler = None
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.token}",
@@ -216,47 +370,7 @@ class WhatsApp:
             logging.disable(logging.DEBUG)
             logging.disable(logging.ERROR)
 
-        self.app = FastAPI()
-
-        # Verification handler has 1 argument: challenge (str | bool): str if verification is successful, False if not
-
-        @self.app.get("/")
-        async def verify_endpoint(r: Request):
-            if r.query_params.get("hub.verify_token") == self.verify_token:
-                logging.debug("Webhook verified successfully")
-                challenge = r.query_params.get("hub.challenge")
-                await self.verification_handler(challenge)
-                await self.other_handler(challenge)
-                return int(challenge)
-            logging.error("Webhook Verification failed - token mismatch")
-            await self.verification_handler(False)
-            await self.other_handler(False)
-            return {"success": False}
-
-        @self.app.post("/")
-        async def hook(r: Request):
-            try:
-                # Handle Webhook Subscriptions
-                data = await r.json()
-                if data is None:
-                    return {"success": False}
-                data_str = json.dumps(data, indent=4)
-                # log the data received only if the log level is debug
-                logging.debug(f"Received webhook data: {data_str}")
-
-                changed_field = self.changed_field(data)
-                if changed_field == "messages":
-                    new_message = self.is_message(data)
-                    if new_message:
-                        msg = Message(instance=self, data=data)
-                        await self.message_handler(msg)
-                        await self.other_handler(msg)
-                return {"success": True}
-            except Exception as e:
-                logging.error(f"Error parsing message: {e}")
-                raise HTTPException(
-                    status_code=500, detail={"success": False, "error": str(e)}
-                )
+        self._app = None
 
     # all the files starting with _ are imported here, and should not be imported directly.
 
@@ -277,6 +391,7 @@ class WhatsApp:
     get_video = staticmethod(get_video)
     changed_field = staticmethod(changed_field)
     get_author = staticmethod(get_author)
+    iter_events = staticmethod(iter_events)
 
     send_button = send_button
     create_button = create_button
@@ -292,9 +407,36 @@ class WhatsApp:
     download_media = download_media
     delete_media = delete_media
     send_template = send_template
+    send_template_bulk = send_template_bulk
+    broadcast = broadcast
+    send_prepared_bulk = send_prepared_bulk
+    replay_outbox = replay_outbox
     send_custom_json = send_custom_json
+    send_prepared = send_prepared
     send_contacts = send_contacts
     authorized = property(authorized)
+    executor = property(executor)
+    _request = request
+    _post_batch = post_batch
+    _batcher_type = Batcher
+    _flight_type = SingleFlight
+    dispatch = dispatch
+    close = close
+    __enter__ = enter
+    __exit__ = exit
+
+    @property
+    def app(self) -> FastAPI:
+        """
+        The FastAPI application serving the webhook.
+
+        It's built on first access, so FastAPI is only imported by processes that serve the webhook.
+        """
+        if self._app is None:
+            from .ext._webhook import build_app
+
+            self._app = build_app(self)
+        return self._app
 
     def create_message(self, **kwargs) -> Message:
         """
@@ -335,7 +477,30 @@ class WhatsApp:
         """
         self.verification_handler = handler
 
+    def on_status(self, handler: function):
+        """
+        Set the handler for message statuses (sent, delivered, read, failed)
+
+        Args:
+            handler[function]: The handler function, called with a webhook payload holding a single status
+        """
+        self.status_handler = handler
+
+    def on_messages_batch(self, handler: function):
+        """
+        Set the handler for all the messages of a webhook delivery
+
+        The handler is called once per delivery with the list of Message objects,
+        instead of calling the on_message and on_event handlers for every message.
+
+        Args:
+            handler[function]: The handler function
+        """
+        self.batch_handler = handler
+
     def run(self, host: str = "localhost", port: int = 5000, **options):
+        from uvicorn import run as _run
+
         _run(self.app, host=host, port=port, **options)
 
 
@@ -349,6 +514,30 @@ class AsyncWhatsApp(WhatsApp):
         verify_token: str = "",
         debug: bool = True,
         version: str = "latest",
+        offline: bool = False,
+        version_cache_ttl: float = 86400,
+        base_url: str = "",
+        timeout: float = 30,
+        connector_limit: int = 100,
+        connector_limit_per_host: int = 0,
+        keepalive_timeout: float = 30,
+        ttl_dns_cache: int = 300,
+        keep_message_data: bool = True,
+        ack_first: bool = False,
+        webhook_workers: int = 4,
+        webhook_queue_size: int = 1000,
+        drain_timeout: float = 30,
+        rate_limit: Union[float, RateLimiter, None] = None,
+        rate_burst: Union[int, None] = None,
+        retry: Union[int, RetryPolicy, None] = None,
+        media_cache: Union[MediaCache, str, bool, None] = None,
+        media_url_ttl: float = MEDIA_URL_TTL,
+        metrics: Union[Metrics, bool] = False,
+        dedup: Union[Deduplicator, str, bool, None] = None,
+        outbox: Union[Outbox, str, None] = None,
+        batch: bool = False,
+        batch_window: float = BATCH_WINDOW,
+        transport: Union[AsyncTransport, str, None] = None,
     ):
         """
         Initialize the WhatsApp Object
@@ -357,151 +546,78 @@ class AsyncWhatsApp(WhatsApp):
             token[str]: Token for the WhatsApp cloud API obtained from the Facebook developer portal
             phone_number_id[str]: Phone number id for the WhatsApp cloud API obtained from the developer portal
             logger[bool]: Whether to enable logging or not (default: True)
+            version[str]: Graph API version to use, "latest" to resolve it from the changelog (default: "latest")
+            offline[bool]: Never use the network while constructing the object: the latest version comes from the cache or DEFAULT_API_VERSION and updates are not checked (default: False)
+            version_cache_ttl[float]: Seconds the resolved API version and update check are cached on disk (default: 86400)
+            base_url[str]: Base url of the Graph API, including the version (default: https://graph.facebook.com/<version>)
+            timeout[float]: Total timeout in seconds of every request to the API (default: 30)
+            connector_limit[int]: Maximum number of simultaneous connections, 0 for no limit (default: 100)
+            connector_limit_per_host[int]: Maximum number of simultaneous connections to the same host, 0 for no limit (default: 0)
+            keepalive_timeout[float]: Seconds an idle connection is kept alive in the pool (default: 30)
+            ttl_dns_cache[int]: Seconds DNS lookups are cached by the connector (default: 300)
+            keep_message_data[bool]: Keep the webhook payload in the data attribute of received messages, False to only keep the parsed fields and the message itself, which takes about a quarter of the memory (default: True)
+            ack_first[bool]: Acknowledge webhook deliveries as soon as they are queued and call the handlers from background workers (default: False)
+            webhook_workers[int]: Number of workers dispatching queued deliveries in ack-first mode (default: 4)
+            webhook_queue_size[int]: Maximum number of queued deliveries in ack-first mode, the webhook answers 503 when it is full (default: 1000)
+            drain_timeout[float]: Seconds the queued deliveries are given to be dispatched when the app shuts down (default: 30)
+            rate_limit[float | RateLimiter]: Messages per second each sender phone number may send, requests wait for capacity instead of being throttled by Meta. Pass a RateLimiter to share it between clients (default: None, no limit)
+            rate_burst[int]: Messages each sender phone number may send at once (default: rate_limit)
+            retry[int | RetryPolicy]: Number of retries of requests that failed for a transient reason (throttling, service unavailable, 429/5xx, connection errors; messages only on 429/503 and on connection errors before they were sent), or a RetryPolicy (default: None, no retries)
+            media_cache[bool | str | MediaCache]: Reuse the media id of files already uploaded from the same phone number: True for an in-memory cache, a path for a SQLite cache shared between processes, or a MediaCache (default: None, no cache)
+            media_url_ttl[float]: Seconds the url returned by query_media_url is reused, 0 disables the cache (default: 240)
+            metrics[bool | Metrics]: Record request latencies, error codes, retries, webhook queue depth and handler durations, read with metrics.snapshot() and served on GET /metrics of app: True, or a Metrics shared between clients (default: False)
+            dedup[bool | str | Deduplicator]: Skip webhook messages and statuses already dispatched, e.g. when Meta delivers them again: True for an in-memory window, a path for a SQLite window shared between workers, or a Deduplicator (default: None, no deduplication)
+            outbox[str | Outbox]: Journal every message in a SQLite outbox before sending it, so that the messages of a crashed process are sent again by replay_outbox(): the path of the outbox (one per process), or an Outbox (default: None, no outbox)
+            batch[bool]: Coalesce the messages sent within batch_window into Graph API batch calls of up to 50 messages, for high-volume sends (default: False)
+            batch_window[float]: Seconds the first queued message waits for others when batch is enabled (default: 0.005)
+            transport[str | AsyncTransport]: HTTP stack of the requests: "aiohttp", "httpx" (HTTP/2 if h2 is installed, slower than aiohttp), or an AsyncTransport (default: aiohttp)
+
+        The instance keeps one aiohttp session open, close it with `await whatsapp.aclose()`
+        or use the instance as an async context manager (`async with AsyncWhatsApp(...) as whatsapp:`).
+
+        Every method is a coroutine returning its result (`await whatsapp.send_template(...)`);
+        to send without waiting, run it with `whatsapp.spawn(...)`, the pending sends are awaited on close.
         """
 
-        # Check if the version is up to date
-        logging.getLogger(__name__).addHandler(logging.NullHandler())
-        self.l = phone_number_id
-
-        if isinstance(phone_number_id, dict):
-            # use first phone number id as default
-            phone_number_id = phone_number_id[list(phone_number_id.keys())[0]]
-
-        elif phone_number_id == "":
-            logging.error("Phone number ID not provided")
-            raise ValueError("Phone number ID not provided but required")
-        elif isinstance(phone_number_id, str):
-            logging.critical(
-                "The phone number ID should be a dictionary of phone numbers and their IDs. Using strings is deprecated."
-            )
-            raise ValueError(
-                "Phone number ID should be a dictionary of phone numbers and their IDs"
-            )
-        else:
-            pass
-
-        self.VERSION = VERSION  # package version
-        r = requests.get(
-            "https://developers.facebook.com/docs/graph-api/changelog/"
-        ).text
-
-        # dynamically get the latest version of the API
-        if version == "latest":
-            soup = BeautifulSoup(r, features="html.parser")
-            t1 = soup.findAll("table")
-
-            def makeversion(table: BeautifulSoup) -> str:
-                result = []
-                allrows = table.findAll("tr")
-                for row in allrows:
-                    result.append([])
-                    allcols = row.findAll("td")
-                    for col in allcols:
-                        thestrings = [(s) for s in col.findAll(text=True)]
-                        thetext = "".join(thestrings)
-                        result[-1].append(thetext)
-                return result[0][1]
-
-            self.LATEST = makeversion(t1[0])  # latest version of the API
-        else:
-            self.LATEST = version
-
-        if update_check is True:
-            latest = str(
-                requests.get("https://pypi.org/pypi/whatsapp-python/json").json()[
-                    "info"
-                ]["version"]
-            )
-            if self.VERSION != latest:
-                try:
-                    version_int = int(self.VERSION.replace(".", ""))
-                except:
-                    version_int = 0
-                try:
-                    latest_int = int(latest.replace(".", ""))
-                except:
-                    latest_int = 0
-                # this is to avoid the case where the version is 1.0.10 and the latest is 1.0.2 (possible if user is using the github version)
-                if version_int < latest_int:
-                    if version_int == 0:
-                        logging.critical(
-                            f"There was an error while checking for updates, please check for updates manually. This may be due to the version being a post-release version (e.g. 1.0.0.post1) or a pre-release version (e.g. 1.0.0a1). READ THE CHANGELOG BEFORE UPDATING. NEW VERSIONS MAY BREAK YOUR CODE IF NOT PROPERLY UPDATED."
-                        )
-                    else:
-                        logging.critical(
-                            f"Whatsapp-python is out of date. Please update to the latest version {latest}. READ THE CHANGELOG BEFORE UPDATING. NEW VERSIONS MAY BREAK YOUR CODE IF NOT PROPERLY UPDATED."
-                        )
-
-        if token == "":
-            logging.error("Token not provided")
-            raise ValueError("Token not provided but required")
-        if phone_number_id == "":
-            logging.error("Phone number ID not provided")
-            raise ValueError("Phone number ID not provided but required")
-        self.token = token
-        self.phone_number_id = phone_number_id
-        self.base_url = f"https://graph.facebook.com/{self.LATEST}"
-        self.url = f"{self.base_url}/{phone_number_id}/messages"
-        self.verify_token = verify_token
-
-        async def base(*args):
-            pass
-
-        self.message_handler = base
-        self.other_handler = base
-        self.verification_handler = base
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.token}",
-        }
-        if logger is False:
-            logging.disable(logging.INFO)
-            logging.disable(logging.ERROR)
-        if debug is False:
-            logging.disable(logging.DEBUG)
-            logging.disable(logging.ERROR)
-
-        self.app = FastAPI()
-
-        # Verification handler has 1 argument: challenge (str | bool): str if verification is successful, False if not
-
-        @self.app.get("/")
-        async def verify_endpoint(r: Request):
-            if r.query_params.get("hub.verify_token") == self.verify_token:
-                logging.debug("Webhook verified successfully")
-                challenge = r.query_params.get("hub.challenge")
-                await self.verification_handler(challenge)
-                await self.other_handler(challenge)
-                return int(challenge)
-            logging.error("Webhook Verification failed - token mismatch")
-            await self.verification_handler(False)
-            await self.other_handler(False)
-            return {"success": False}
-
-        @self.app.post("/")
-        async def hook(r: Request):
-            try:
-                # Handle Webhook Subscriptions
-                data = await r.json()
-                if data is None:
-                    return {"success": False}
-                data_str = json.dumps(data, indent=4)
-                # log the data received only if the log level is debug
-                logging.debug(f"Received webhook data: {data_str}")
-
-                changed_field = self.changed_field(data)
-                if changed_field == "messages":
-                    new_message = self.is_message(data)
-                    if new_message:
-                        msg = Message(instance=self, data=data)
-                        await self.message_handler(msg)
-                        await self.other_handler(msg)
-                return {"success": True}
-            except Exception as e:
-                logging.error(f"Error parsing message: {e}")
-                raise HTTPException(
-                    status_code=500, detail={"success": False, "error": str(e)}
-                )
+        self._setup(
+            token=token,
+            phone_number_id=phone_number_id,
+            logger=logger,
+            update_check=update_check,
+            verify_token=verify_token,
+            debug=debug,
+            version=version,
+            offline=offline,
+            version_cache_ttl=version_cache_ttl,
+            base_url=base_url,
+            timeout=timeout,
+            keep_message_data=keep_message_data,
+            ack_first=ack_first,
+            webhook_workers=webhook_workers,
+            webhook_queue_size=webhook_queue_size,
+            drain_timeout=drain_timeout,
+            rate_limit=rate_limit,
+            rate_burst=rate_burst,
+            retry=retry,
+            media_cache=media_cache,
+            media_url_ttl=media_url_ttl,
+            metrics=metrics,
+            dedup=dedup,
+            outbox=outbox,
+            batch=batch,
+            batch_window=batch_window,
+        )
+        self.connector_limit = connector_limit
+        self.connector_limit_per_host = connector_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        # the session is created on first use, in the event loop running the requests
+        self._session = None
+        self._session_loop = None
+        self._tasks = set()
+        self.transport = create_async_transport(
+            transport, lambda: self.session, connector_limit, timeout
+        )
 
     # all the files starting with _ are imported here, and should not be imported directly.
 
@@ -522,6 +638,7 @@ class AsyncWhatsApp(WhatsApp):
     get_video = staticmethod(get_video)
     changed_field = staticmethod(changed_field)
     get_author = staticmethod(get_author)
+    iter_events = staticmethod(iter_events)
 
     send_button = async_send_button
     create_button = async_create_button
@@ -537,10 +654,30 @@ class AsyncWhatsApp(WhatsApp):
     download_media = async_download_media
     delete_media = async_delete_media
     send_template = async_send_template
+    send_template_bulk = async_send_template_bulk
+    broadcast = async_broadcast
+    send_prepared_bulk = async_send_prepared_bulk
+    replay_outbox = async_replay_outbox
     send_custom_json = async_send_custom_json
+    send_prepared = async_send_prepared
     send_contacts = async_send_contacts
     authorized = property(async_authorized)
-    
+    # coroutines are run concurrently with spawn() instead
+    executor = None
+    session = property(async_session)
+    _request = async_request
+    _post_batch = async_post_batch
+    _batcher_type = AsyncBatcher
+    _flight_type = AsyncSingleFlight
+    _stream = async_stream
+    spawn = spawn
+    drain = drain
+    aclose = aclose
+    # the connections of the async client are closed in the event loop
+    close = aclose
+    __aenter__ = aenter
+    __aexit__ = aexit
+
     def handle(self, data: dict):
         return Handle(data)
 
@@ -584,117 +721,36 @@ class AsyncWhatsApp(WhatsApp):
         self.verification_handler = handler
 
     def run(self, host: str = "localhost", port: int = 5000, **options):
+        from uvicorn import run as _run
+
         _run(self.app, host=host, port=port, **options)
 
 
-class Message:
-    # type: ignore
-    def __init__(
-        self,
-        id: int = None,
-        data: dict = {},
-        instance: WhatsApp = None,
-        content: str = "",
-        to: str = "",
-        rec_type: str = "individual",
-    ):
-        self.instance = instance
-        self.url = self.instance.url
-        self.headers = self.instance.headers
-
-        try:
-            self.id = instance.get_message_id(data)
-        except:
-            self.id = id
-        try:
-            self.type = self.instance.get_message_type(data)
-        except:
-            self.type = "text"
-        self.data = data
-        self.rec = rec_type
-
-        try:
-            self.to =  to if to != "" else self.instance.get_mobile(data)
-        except:
-            self.to = to
-            
-        try:
-            self.content = content if content != "" else self.instance.get_message(data)
-        except:
-            self.content = content
-        try:
-            self.name = self.instance.get_name(data)
-        except:
-            self.name = None
-
-        if self.type == "image":
-            try:
-                self.image = self.instance.get_image(data)
-            except:
-                self.image = None
-        if self.type == "sticker":
-            try:
-                self.sticker = self.instance.get_sticker(data)
-            except:
-                self.sticker = None
-        elif self.type == "video":
-            try:
-                self.video = self.instance.get_video(data)
-            except:
-                self.video = None
-        elif self.type == "audio":
-            try:
-                self.audio = self.instance.get_audio(data)
-            except:
-                pass
-        elif self.type == "document":
-            try:
-                self.document = self.instance.get_document(data)
-            except:
-                pass
-        elif self.type == "location":
-            try:
-                self.location = self.instance.get_location(data)
-            except:
-                pass
-        elif self.type == "interactive":
-            try:
-                self.interactive = self.instance.get_interactive_response(data)
-            except:
-                pass
+class Message(BaseMessage):
+    __slots__ = ()
 
     def reply(self, reply_text: str = "", preview_url: bool = True) -> dict:
-        if self.data == {}:
+        if self.author is None:
             return {"error": "No data provided"}
-        author = self.instance.get_author(self.data)
-        payload = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": str(author),
-            "type": "text",
-            "context": {"message_id": self.id},
-            "text": {"preview_url": preview_url, "body": reply_text},
-        }
+        author = self.author
+        payload = text_message(
+            reply_text, str(author), preview_url=preview_url, reply_to=self.id
+        )
         logging.info(f"Replying to {self.id}")
-        r = requests.post(self.url, headers=self.headers, json=payload)
+        r = self.instance._request("POST", self.url, headers=self.headers, json=payload)
         if r.status_code == 200:
-            logging.info(f"Message sent to {self.instance.get_author(self.data)}")
+            logging.info(f"Message sent to {self.author}")
             return r.json()
-        logging.info(f"Message not sent to {self.instance.get_author(self.data)}")
+        logging.info(f"Message not sent to {self.author}")
         logging.info(f"Status code: {r.status_code}")
         logging.error(f"Response: {r.json()}")
         return r.json()
 
     def mark_as_read(self) -> dict:
+        payload = read_receipt(self.id)
 
-        payload = {
-            "messaging_product": "whatsapp",
-            "status": "read",
-            "message_id": self.id,
-        }
-
-        response = requests.post(
-            f"{self.instance.url}", headers=self.instance.headers, json=payload
+        response = self.instance._request(
+            "POST", f"{self.instance.url}", headers=self.instance.headers, json=payload
         )
         if response.status_code == 200:
             logging.info(response.json())
@@ -704,26 +760,10 @@ class Message:
             return response.json()
 
     def send(self, sender=None, preview_url: bool = True) -> dict:
-
-        try:
-            sender = dict(self.instance.l)[sender]
-
-        except:
-            sender = self.instance.phone_number_id
-
-        if sender == None:
-            sender = self.instance.phone_number_id
-
-        url = f"https://graph.facebook.com/{self.instance.LATEST}/{sender}/messages"
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": self.rec,
-            "to": self.to,
-            "type": "text",
-            "text": {"preview_url": preview_url, "body": self.content},
-        }
+        url = messages_url(self.instance, sender)
+        data = text_message(self.content, self.to, self.rec, preview_url)
         logging.info(f"Sending message to {self.to}")
-        r = requests.post(url, headers=self.headers, json=data)
+        r = self.instance._request("POST", url, headers=self.headers, json=data)
         if r.status_code == 200:
             logging.info(f"Message sent to {self.to}")
             return r.json()
@@ -733,15 +773,9 @@ class Message:
         return r.json()
 
     def react(self, emoji: str) -> dict:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": self.to,
-            "type": "reaction",
-            "reaction": {"message_id": self.id, "emoji": emoji},
-        }
+        data = reaction_message(self.id, emoji, self.to)
         logging.info(f"Reacting to {self.id}")
-        r = requests.post(self.url, headers=self.headers, json=data)
+        r = self.instance._request("POST", self.url, headers=self.headers, json=data)
         if r.status_code == 200:
             logging.info(f"Reaction sent to {self.to}")
             return r.json()
@@ -751,202 +785,76 @@ class Message:
         return r.json()
 
 
-class AsyncMessage:
-    # type: ignore
-    def __init__(
-        self,
-        id: int = None,
-        data: dict = {},
-        instance: WhatsApp = None,
-        content: str = "",
-        to: str = "",
-        rec_type: str = "individual",
-    ):
-        self.instance = instance
-        self.url = self.instance.url
-        self.headers = self.instance.headers
-
-        try:
-            self.id = instance.get_message_id(data)
-        except:
-            self.id = id
-        try:
-            self.type = self.instance.get_message_type(data)
-        except:
-            self.type = "text"
-        self.data = data
-        self.rec = rec_type
-        try:
-            self.to =  to if to != "" else self.instance.get_mobile(data)
-        except:
-            self.to = to
-        try:
-            self.content = content if content != "" else self.instance.get_message(data)
-        except:
-            self.content = content
-        try:
-            self.name = self.instance.get_name(data)
-        except:
-            self.name = None
-
-        if self.type == "image":
-            try:
-                self.image = self.instance.get_image(data)
-            except:
-                self.image = None
-        if self.type == "sticker":
-            try:
-                self.sticker = self.instance.get_sticker(data)
-            except:
-                self.sticker = None
-        elif self.type == "video":
-            try:
-                self.video = self.instance.get_video(data)
-            except:
-                self.video = None
-        elif self.type == "audio":
-            try:
-                self.audio = self.instance.get_audio(data)
-            except:
-                pass
-        elif self.type == "document":
-            try:
-                self.document = self.instance.get_document(data)
-            except:
-                pass
-        elif self.type == "location":
-            try:
-                self.location = self.instance.get_location(data)
-            except:
-                pass
-        elif self.type == "interactive":
-            try:
-                self.interactive = self.instance.get_interactive_response(data)
-            except:
-                pass
+class AsyncMessage(BaseMessage):
+    __slots__ = ()
 
     async def reply(
         self, reply_text: str = "", preview_url: bool = True
-    ) -> asyncio.Future:
-        if self.data == {}:
+    ) -> dict:
+        if self.author is None:
             return {"error": "No data provided"}
-        author = self.instance.get_author(self.data)
-        payload = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": str(author),
-            "type": "text",
-            "context": {"message_id": self.id},
-            "text": {"preview_url": preview_url, "body": reply_text},
-        }
+        author = self.author
+        payload = text_message(
+            reply_text, str(author), preview_url=preview_url, reply_to=self.id
+        )
         logging.info(f"Replying to {self.id}")
 
-        async def call():
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.url, headers=self.headers, json=payload
-                ) as response:
-                    if response.status == 200:
-                        logging.info(
-                            f"Message sent to {self.instance.get_author(self.data)}"
-                        )
-                        return await response.json()
-                    logging.info(
-                        f"Message not sent to {self.instance.get_author(self.data)}"
-                    )
-                    logging.info(f"Status code: {response.status}")
-                    logging.error(f"Response: {await response.json()}")
-                    return await response.json()
-
-        f = asyncio.ensure_future(call())
-        await asyncio.sleep(0.001)  # make asyncio run the task
-        return f
-
-    async def mark_as_read(self) -> asyncio.Future:
-
-        payload = {
-            "messaging_product": "whatsapp",
-            "status": "read",
-            "message_id": self.id,
-        }
+        response = await self.instance._request(
+            "POST", self.url, headers=self.headers, json=payload
+        )
+        if response.status == 200:
+            logging.info(
+                f"Message sent to {self.author}"
+            )
+            return await response.json()
+        logging.info(
+            f"Message not sent to {self.author}"
+        )
+        logging.info(f"Status code: {response.status}")
+        logging.error(f"Response: {await response.json()}")
+        return await response.json()
 
-        async def call():
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.instance.url}", headers=self.instance.headers, json=payload
-                ) as response:
-                    if response.status == 200:
-                        logging.info(await response.json())
-                        return await response.json()
-                    else:
-                        logging.error(await response.json())
-                        return await response.json()
-
-        f = asyncio.ensure_future(call())
-        await asyncio.sleep(0.001)  # make asyncio run the task
-        return f
-
-    async def send(self, sender=None, preview_url: bool = True) -> asyncio.Future:
-        try:
-            sender = dict(self.instance.l)[sender]
-
-        except:
-            sender = self.instance.phone_number_id
-
-        if sender == None:
-            sender = self.instance.phone_number_id
-
-        url = f"https://graph.facebook.com/{self.instance.LATEST}/{sender}/messages"
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": self.rec,
-            "to": self.to,
-            "type": "text",
-            "text": {"preview_url": preview_url, "body": self.content},
-        }
+    async def mark_as_read(self) -> dict:
+        payload = read_receipt(self.id)
+
+        response = await self.instance._request(
+            "POST", f"{self.instance.url}", headers=self.instance.headers, json=payload
+        )
+        if response.status == 200:
+            logging.info(await response.json())
+            return await response.json()
+        else:
+            logging.error(await response.json())
+            return await response.json()
+
+    async def send(self, sender=None, preview_url: bool = True) -> dict:
+        url = messages_url(self.instance, sender)
+        data = text_message(self.content, self.to, self.rec, preview_url)
         logging.info(f"Sending message to {self.to}")
 
-        async def call():
-            print("sending")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url, headers=self.headers, json=data
-                ) as response:
-                    if response.status == 200:
-                        logging.info(f"Message sent to {self.to}")
-                        return await response.json()
-                    logging.info(f"Message not sent to {self.to}")
-                    logging.info(f"Status code: {response.status}")
-                    logging.error(f"Response: {await response.json()}")
-                    return await response.json()
-
-        f = asyncio.ensure_future(call())
-        await asyncio.sleep(0.001)  # make asyncio run the task
-        return f
-
-    async def react(self, emoji: str) -> asyncio.Future:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": self.to,
-            "type": "reaction",
-            "reaction": {"message_id": self.id, "emoji": emoji},
-        }
+        print("sending")
+        response = await self.instance._request(
+            "POST", url, headers=self.headers, json=data
+        )
+        if response.status == 200:
+            logging.info(f"Message sent to {self.to}")
+            return await response.json()
+        logging.info(f"Message not sent to {self.to}")
+        logging.info(f"Status code: {response.status}")
+        logging.error(f"Response: {await response.json()}")
+        return await response.json()
+
+    async def react(self, emoji: str) -> dict:
+        data = reaction_message(self.id, emoji, self.to)
         logging.info(f"Reacting to {self.id}")
 
-        async def call():
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.url, headers=self.headers, json=data
-                ) as response:
-                    if response.status == 200:
-                        logging.info(f"Reaction sent to {self.to}")
-                        return await response.json()
-                    logging.info(f"Reaction not sent to {self.to}")
-                    logging.info(f"Status code: {response.status}")
-                    logging.debug(f"Response: {await response.json()}")
-                    return await response.json()
-
-        f = asyncio.ensure_future(call())
-        await asyncio.sleep(0.001)
-        return f
+        response = await self.instance._request(
+            "POST", self.url, headers=self.headers, json=data
+        )
+        if response.status == 200:
+            logging.info(f"Reaction sent to {self.to}")
+            return await response.json()
+        logging.info(f"Reaction not sent to {self.to}")
+        logging.info(f"Status code: {response.status}")
+        logging.debug(f"Response: {await response.json()}")
+        return await response.json()
@@ -0,0 +1,267 @@
+import asyncio
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+    Union,
+)
+from ..ext._bulk import (
+    BulkResult,
+    broadcast_payloads,
+    prepared_payloads,
+    result,
+    summary,
+    template_payloads,
+)
+from ..ext._payloads import messages_url
+from ..prepared import PreparedBody, PreparedMessage, message_kwargs
+
+
+async def aiter_recipients(
+    recipients: Union[Iterable[Any], AsyncIterable[Any]],
+) -> AsyncIterator[Any]:
+    if hasattr(recipients, "__aiter__"):
+        async for item in recipients:
+            yield item
+    else:
+        for item in recipients:
+            yield item
+
+
+async def send_payloads(
+    self,
+    recipients: Union[Iterable[Any], AsyncIterable[Any]],
+    build: Callable[
+        [Iterable[Any]], Iterable[Tuple[str, Union[Dict[str, Any], PreparedBody]]]
+    ],
+    sender: Any,
+    concurrency: int,
+    on_result: Union[Callable[[BulkResult], Any], None],
+) -> List[BulkResult]:
+    url = messages_url(self, sender)
+
+    results: List[BulkResult] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(
+        index: int, recipient: str, payload: Union[Dict[str, Any], PreparedBody]
+    ) -> None:
+        try:
+            r = await self._request("POST", url, **message_kwargs(self, payload))
+            try:
+                data = await r.json(content_type=None)
+            except ValueError:
+                data = None
+            results[index] = result(recipient, r.status, data)
+        except Exception as e:
+            results[index] = BulkResult(recipient, None, None, str(e))
+        finally:
+            slots.release()
+        if on_result is not None:
+            outcome = on_result(results[index])
+            if asyncio.iscoroutine(outcome):
+                await outcome
+
+    # a task is only created once a slot is free, so at most `concurrency` messages
+    # are built and in flight at any time and the recipients can be a stream of any size
+    tasks = set()
+    index = 0
+    async for item in aiter_recipients(recipients):
+        for recipient, payload in build((item,)):
+            await slots.acquire()
+            results.append(None)
+            task = asyncio.create_task(send(index, recipient, payload))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            index += 1
+    if tasks:
+        await asyncio.gather(*tasks)
+    return results
+
+
+async def send_template_bulk(
+    self,
+    template: str,
+    recipients: Union[Iterable[Any], AsyncIterable[Any]],
+    components: Any = None,
+    lang: str = "en_US",
+    sender=None,
+    concurrency: int = 64,
+    on_result: Union[Callable[[BulkResult], Any], None] = None,
+) -> List[BulkResult]:
+    """
+    Sends a template message to many WhatsApp users, with at most `concurrency` requests in flight.
+
+    The requests share the aiohttp session of the instance, keep connector_limit at least as large
+    as concurrency. Errors do not stop the send, they are reported in the result of the recipient.
+
+    Args:
+        template[str]: Template name to be sent to the users
+        recipients[iterable]: Phone numbers of the users, or (phone number, components) tuples to use other components for a user. May be an async iterable
+        components[list]: Components sent to the users without their own components
+        lang[str]: Language of the template message
+        sender[int]: Key of the phone number id to send from
+        concurrency[int]: Maximum number of requests in flight (default: 64)
+        on_result[function]: Function or coroutine function called with each BulkResult as soon as the message is sent
+
+    Returns:
+        list[BulkResult]: The result of every recipient, in the order of recipients
+
+    Example:
+        >>> from whatsapp import AsyncWhatsApp
+        >>> whatsapp = AsyncWhatsApp(token, phone_number_id)
+        >>> results = await whatsapp.send_template_bulk("hello_world", ["5511999999999", "5511888888888"])
+        >>> failed = [r.recipient for r in results if not r.ok]
+    """
+    results = await send_payloads(
+        self,
+        recipients,
+        lambda items: template_payloads(template, items, components, lang),
+        sender,
+        concurrency,
+        on_result,
+    )
+    summary(results, f"Template {template}")
+    return results
+
+
+async def broadcast(
+    self,
+    message: Dict[str, Any],
+    recipients: Union[Iterable[Any], AsyncIterable[Any]],
+    sender=None,
+    concurrency: int = 64,
+    on_result: Union[Callable[[BulkResult], Any], None] = None,
+) -> List[BulkResult]:
+    """
+    Sends the same message to many WhatsApp users, with at most `concurrency` requests in flight.
+
+    Args:
+        message[dict]: Body of the message without the recipient, as sent by send_custom_json
+        recipients[iterable]: Phone numbers of the users, or (phone number, fields) tuples to override fields of the message for a user. May be an async iterable
+        sender[int]: Key of the phone number id to send from
+        concurrency[int]: Maximum number of requests in flight (default: 64)
+        on_result[function]: Function or coroutine function called with each BulkResult as soon as the message is sent
+
+    Returns:
+        list[BulkResult]: The result of every recipient, in the order of recipients
+
+    Example:
+        >>> from whatsapp import AsyncWhatsApp
+        >>> whatsapp = AsyncWhatsApp(token, phone_number_id)
+        >>> await whatsapp.broadcast({"type": "text", "text": {"body": "Hello"}}, ["5511999999999", "5511888888888"])
+    """
+    results = await send_payloads(
+        self,
+        recipients,
+        lambda items: broadcast_payloads(message, items),
+        sender,
+        concurrency,
+        on_result,
+    )
+    summary(results, "Broadcast")
+    return results
+
+
+async def send_prepared_bulk(
+    self,
+    prepared: PreparedMessage,
+    recipients: Union[Iterable[Any], AsyncIterable[Any]],
+    sender=None,
+    concurrency: int = 64,
+    on_result: Union[Callable[[BulkResult], Any], None] = None,
+) -> List[BulkResult]:
+    """
+    Sends a prepared message to many WhatsApp users, with at most `concurrency` requests in flight.
+
+    The message was encoded once when it was prepared, each send only splices the recipient
+    and the values of the slots into it.
+
+    Args:
+        prepared[PreparedMessage]: Message to send
+        recipients[iterable]: Phone numbers of the users, or (phone number, values) tuples where values is a dict of the values of the slots for a user. May be an async iterable
+        sender[int]: Key of the phone number id to send from
+        concurrency[int]: Maximum number of requests in flight (default: 64)
+        on_result[function]: Function or coroutine function called with each BulkResult as soon as the message is sent
+
+    Returns:
+        list[BulkResult]: The result of every recipient, in the order of recipients
+
+    Example:
+        >>> from whatsapp import AsyncWhatsApp, PreparedMessage
+        >>> whatsapp = AsyncWhatsApp(token, phone_number_id)
+        >>> prepared = PreparedMessage.template("hello_world")
+        >>> results = await whatsapp.send_prepared_bulk(prepared, ["5511999999999", "5511888888888"])
+    """
+    results = await send_payloads(
+        self,
+        recipients,
+        lambda items: prepared_payloads(prepared, items),
+        sender,
+        concurrency,
+        on_result,
+    )
+    summary(results, f"Prepared {prepared.type} message")
+    return results
+
+
+async def replay_outbox(
+    self,
+    concurrency: int = 64,
+    on_result: Union[Callable[[BulkResult], Any], None] = None,
+) -> List[BulkResult]:
+    """
+    Sends again the messages the previous run journaled in the outbox but never settled,
+    because the process died while they were being sent. Call it once when the app starts.
+
+    Args:
+        concurrency[int]: Maximum number of requests in flight (default: 64)
+        on_result[function]: Function or coroutine function called with each BulkResult as soon as the message is sent
+
+    Returns:
+        list[BulkResult]: The result of every replayed message
+
+    Example:
+        >>> from whatsapp import AsyncWhatsApp
+        >>> whatsapp = AsyncWhatsApp(token, phone_number_id, outbox="outbox.db")
+        >>> await whatsapp.replay_outbox()
+    """
+    from ._session import deliver
+
+    if self.outbox is None:
+        return []
+    loop = asyncio.get_running_loop()
+    entries = await loop.run_in_executor(None, self.outbox.pending)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(item: Tuple[str, str, Dict[str, Any]]) -> BulkResult:
+        entry, url, payload = item
+        recipient = payload.get("to")
+        async with slots:
+            try:
+                r = await deliver(
+                    self, entry, "POST", url, {"headers": self.headers, "json": payload}
+                )
+                try:
+                    data = await r.json(content_type=None)
+                except ValueError:
+                    data = None
+                outcome = result(recipient, r.status, data)
+            except Exception as e:
+                outcome = BulkResult(recipient, None, None, str(e))
+        if on_result is not None:
+            returned = on_result(outcome)
+            if asyncio.iscoroutine(returned):
+                await returned
+        return outcome
+
+    results = list(await asyncio.gather(*(send(item) for item in entries)))
+    if results:
+        await loop.run_in_executor(None, self.outbox.flush)
+        summary(results, "Outbox replay")
+    return results
@@ -1,7 +1,11 @@
 import logging
-import aiohttp
-import asyncio
 from typing import Dict, Any
+from ..ext._payloads import (
+    interactive_message,
+    list_interactive,
+    messages_url,
+    reply_button_message,
+)
 
 
 def create_button(self, button: Dict[Any, Any]) -> Dict[Any, Any]:
@@ -13,21 +17,12 @@ def create_button(self, button: Dict[Any, Any]) -> Dict[Any, Any]:
     Args:
             button[dict]: A dictionary containing the button data
     """
-    data = {"type": "list", "action": button.get("action")}
-    if button.get("header"):
-        data["header"] = {"type": "text", "text": button.get("header")}
-    if button.get("body"):
-        data["body"] = {"text": button.get("body")}
-    if button.get("footer"):
-        data["footer"] = {"text": button.get("footer")}
-    if button.get("type"):
-        data["type"] = button.get("type")
-    return data
+    return list_interactive(button)
 
 
 async def send_button(
     self, button: Dict[Any, Any], recipient_id: str, sender=None
-) -> asyncio.Future:
+) -> Dict[Any, Any]:
     """
     Sends an interactive buttons message to a WhatsApp user
 
@@ -37,43 +32,23 @@ async def send_button(
 
     check https://github.com/Neurotech-HQ/whatsapp#sending-interactive-reply-buttons for an example.
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    data = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "interactive",
-        "interactive": self.create_button(button),
-    }
+    url = messages_url(self, sender)
+    data = interactive_message(self.create_button(button), recipient_id)
     logging.info(f"Sending buttons to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Buttons sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Buttons not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Buttons sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Buttons not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
 
 
 async def send_reply_button(
     self, button: Dict[Any, Any], recipient_id: str, sender=None
-) -> asyncio.Future:
+) -> Dict[Any, Any]:
     """
     Sends an interactive reply buttons[menu] message to a WhatsApp user
 
@@ -84,39 +59,15 @@ async def send_reply_button(
     Note:
         The maximum number of buttons is 3, more than 3 buttons will rise an error.
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if len(button["action"]["buttons"]) > 3:
-        raise ValueError("The maximum number of buttons is 3.")
-
-    data = {
-        "messaging_product": "whatsapp",
-        "recipient_type": "individual",
-        "to": recipient_id,
-        "type": "interactive",
-        "interactive": button,
-    }
+    url = messages_url(self, sender)
+    data = reply_button_message(button, recipient_id)
     logging.info(f"Sending buttons to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Buttons sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Buttons not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Buttons sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Buttons not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
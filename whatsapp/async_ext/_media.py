@@ -1,24 +1,59 @@
 import logging
-import aiohttp
-import requests
 import asyncio
 import os
 import mimetypes
-from requests_toolbelt.multipart.encoder import MultipartEncoder
-from typing import Union, Dict, Any
+from typing import Any, BinaryIO, Callable, Dict, Union
+from ..cache import media_key
 
+# size of the chunks read from disk and written to the connection while uploading
+UPLOAD_CHUNK_SIZE = 256 * 1024
 
-async def upload_media(self, media: str, sender=None) -> Union[Dict[str, Any], None]:
+
+def multipart(boundary: str, filename: str, content_type: str) -> tuple:
+    """Returns the parts of the multipart body sent before and after the content of the file."""
+    # quotes and line breaks would end the header, they are percent-encoded like browsers do
+    filename = filename.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="messaging_product"\r\n\r\n'
+        "whatsapp\r\n"
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="type"\r\n\r\n'
+        f"{content_type}\r\n"
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head, tail
+
+
+async def upload_media(
+    self,
+    media: str,
+    sender=None,
+    progress: Union[Callable[[int, int], Any], None] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> Union[Dict[str, Any], None]:
     """
     Uploads a media to the cloud api and returns the id of the media
 
+    The file is streamed through the aiohttp session of the instance: it is read in chunks
+    by the default executor and written to the connection without blocking the event loop,
+    so the webhook and the other requests keep running during large uploads.
+    If the instance has a media cache, a file already uploaded from the same phone number
+    is not uploaded again, the cached media id is returned while it is valid.
+
     Args:
         media[str]: Path of the media to be uploaded
+        sender[int]: Key of the phone number id to upload to
+        progress[function]: Function or coroutine function called with (bytes sent, total bytes) after every chunk
+        chunk_size[int]: Size of the chunks read from the file (default: 256 KiB)
 
     Example:
-        >>> from whatsapp import WhatsApp
-        >>> whatsapp = WhatsApp(token, phone_number_id)
-        >>> whatsapp.upload_media("/path/to/media")
+        >>> from whatsapp import AsyncWhatsApp
+        >>> whatsapp = AsyncWhatsApp(token, phone_number_id)
+        >>> await whatsapp.upload_media("/path/to/media", progress=lambda sent, total: print(sent / total))
 
     REFERENCE: https://developers.facebook.com/docs/whatsapp/cloud-api/reference/media#
     """
@@ -31,35 +66,77 @@ async def upload_media(self, media: str, sender=None) -> Union[Dict[str, Any], N
     if sender == None:
         sender = self.phone_number_id
 
-    form_data = {
-        "file": (
-            media,
-            open(os.path.realpath(media), "rb"),
-            mimetypes.guess_type(media)[0],
-        ),
-        "messaging_product": "whatsapp",
-        "type": mimetypes.guess_type(media)[0],
-    }
-    form_data = MultipartEncoder(fields=form_data)
+    loop = asyncio.get_running_loop()
+    key = None
+    if self.media_cache is not None:
+        # hashing the file and reading the cache may touch the disk, not done in the loop
+        def lookup():
+            key = media_key(sender, media)
+            return key, self.media_cache.get(key)
+
+        key, media_id = await loop.run_in_executor(None, lookup)
+        if media_id is not None:
+            logging.info(f"Media {media} already uploaded as {media_id}")
+            return {"id": media_id}
+
+    from uuid import uuid4
+
+    path = os.path.realpath(media)
+    content_type = mimetypes.guess_type(media)[0] or "application/octet-stream"
+    boundary = uuid4().hex
+    head, tail = multipart(boundary, os.path.basename(media), content_type)
+    total = (
+        len(head) + await loop.run_in_executor(None, os.path.getsize, path) + len(tail)
+    )
+
+    async def report(sent: int) -> None:
+        if progress is not None:
+            outcome = progress(sent, total)
+            if asyncio.iscoroutine(outcome):
+                await outcome
+
+    # a new stream is started for every attempt if the upload is retried
+    async def body():
+        f = await loop.run_in_executor(None, open, path, "rb")
+        try:
+            yield head
+            sent = len(head)
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+                sent += len(chunk)
+                await report(sent)
+            yield tail
+            await report(total)
+        finally:
+            await loop.run_in_executor(None, f.close)
+
     headers = self.headers.copy()
-    headers["Content-Type"] = form_data.content_type
-    logging.info(f"Content-Type: {form_data.content_type}")
+    headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+    headers["Content-Length"] = str(total)
+    logging.info(f"Content-Type: {headers['Content-Type']}")
     logging.info(f"Uploading media {media}")
-    r = requests.post(
+    r = await self._request(
+        "POST",
         f"{self.base_url}/{sender}/media",
         headers=headers,
-        data=form_data,
+        data=body,
     )
-    if r.status_code == 200:
+    if r.status == 200:
         logging.info(f"Media {media} uploaded")
-        return r.json()
+        data = await r.json()
+        if key is not None and "id" in data:
+            await loop.run_in_executor(None, self.media_cache.set, key, data["id"])
+        return data
     logging.info(f"Error uploading media {media}")
-    logging.info(f"Status code: {r.status_code}")
-    logging.debug(f"Response: {r.json()}")  # Changed to debug level
-    return r.status_code
+    logging.info(f"Status code: {r.status}")
+    logging.debug(f"Response: {await r.json()}")  # Changed to debug level
+    return r.status
 
 
-async def delete_media(self, media_id: str) -> asyncio.Future:
+async def delete_media(self, media_id: str) -> Dict[Any, Any]:
     """
     Deletes a media from the cloud api
 
@@ -68,34 +145,32 @@ async def delete_media(self, media_id: str) -> asyncio.Future:
     """
     logging.info(f"Deleting media {media_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(
-                f"https://graph.facebook.com/{self.LATEST}/{media_id}",
-                headers=self.headers,
-            ) as r:
-                if r.status == 200:
-                    logging.info(f"Media {media_id} deleted")
-                    return await r.json()
-                logging.info(f"Error deleting media {media_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
-
-
-async def query_media_url(self, media_id: str) -> asyncio.Future:
+    r = await self._request(
+        "DELETE", f"{self.base_url}/{media_id}", headers=self.headers
+    )
+    if r.status == 200:
+        logging.info(f"Media {media_id} deleted")
+        if self.media_cache is not None:
+            self.media_cache.discard(media_id)
+        if self.media_url_cache is not None:
+            self.media_url_cache.pop(media_id)
+        return await r.json()
+    logging.info(f"Error deleting media {media_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
+
+
+async def query_media_url(self, media_id: str) -> Dict[Any, Any]:
     """
-    Query media url from media id obtained either by manually uploading media or received media
+    Query media url from media id obtained either by manually uploading media or received media.
+    Urls are cached for media_url_ttl seconds and concurrent queries of the same id share one request.
 
     Args:
         media_id[str]: Media id of the media
 
     Returns:
-        str: Media url
+        dict: Media url, mime type, sha256 and size
 
     Example:
         >>> from whatsapp import WhatsApp
@@ -105,65 +180,98 @@ async def query_media_url(self, media_id: str) -> asyncio.Future:
 
     logging.info(f"Querying media url for {media_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"https://graph.facebook.com/{self.LATEST}/{media_id}",
-                headers=self.headers,
-            ) as r:
-                if r.status == 200:
-                    logging.info(f"Media url for {media_id} queried")
-                    return await r.json()
-                logging.info(f"Error querying media url for {media_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    async def query():
+        r = await self._request(
+            "GET", f"{self.base_url}/{media_id}", headers=self.headers
+        )
+        if r.status == 200:
+            logging.info(f"Media url for {media_id} queried")
+            data = await r.json()
+            if self.media_url_cache is not None:
+                self.media_url_cache.set(media_id, data)
+            return data
+        logging.info(f"Error querying media url for {media_id}")
+        logging.info(f"Status code: {r.status}")
+        logging.info(f"Response: {await r.json()}")
+        return await r.json()
+
+    if self.media_url_cache is not None:
+        data = self.media_url_cache.get(media_id)
+        if data is not None:
+            logging.info(f"Media url for {media_id} found in cache")
+            return data
+    # concurrent queries of the same media id share a single request
+    return await self._media_url_flight.do(media_id, query)
+
+
+# size of the chunks written to the destination while downloading
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
 
 async def download_media(
-    self, media_url: str, mime_type: str, file_path: str = "temp"
-) -> asyncio.Future:
+    self,
+    media_url: str,
+    mime_type: str,
+    file_path: Union[str, BinaryIO] = "temp",
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    sink: Union[Callable[[bytes], Any], None] = None,
+) -> Union[str, BinaryIO, bool, Dict[Any, Any]]:
     """
     Download media from media url obtained either by manually uploading media or received media
 
+    The media is streamed: it is written to the destination chunk by chunk as it is received,
+    so memory use does not grow with the size of the media. Files are written by the default
+    executor, the event loop is never blocked by the disk.
+
     Args:
         media_url[str]: Media url of the media
         mime_type[str]: Mime type of the media
-        file_path[str]: Path of the file to be downloaded to. Default is "temp"
+        file_path[str | file]: Path of the file to be downloaded to, or a binary file object to write to. Default is "temp"
                         Do not include the file extension. It will be added automatically.
+        chunk_size[int]: Size of the chunks read from the connection (default: 64 KiB)
+        sink[function]: Function or coroutine function called with every chunk instead of writing to file_path
 
     Returns:
-        str: Media url
+        str: Path of the downloaded file, the file object if file_path is one, True if sink is set, the error answer if the download failed
 
     Example:
-        >>> from whatsapp import WhatsApp
-        >>> whatsapp = WhatsApp(token, phone_number_id)
-        >>> whatsapp.download_media("media_url", "image/jpeg")
-        >>> whatsapp.download_media("media_url", "video/mp4", "path/to/file") #do not include the file extension
+        >>> from whatsapp import AsyncWhatsApp
+        >>> whatsapp = AsyncWhatsApp(token, phone_number_id)
+        >>> await whatsapp.download_media("media_url", "image/jpeg")
+        >>> await whatsapp.download_media("media_url", "video/mp4", "path/to/file") #do not include the file extension
+        >>> await whatsapp.download_media("media_url", "video/mp4", sink=upload_to_storage)
     """
     logging.info(f"Downloading media from {media_url}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.get(media_url, headers=self.headers) as r:
-                if r.status == 200:
-                    logging.info(f"Media downloaded from {media_url}")
-                    extension = mime_type.split("/")[1]
-                    save_file_here = (
-                        f"{file_path}.{extension}" if file_path else f"temp.{extension}"
-                    )
-                    with open(save_file_here, "wb") as f:
-                        f.write(await r.read())
-                    return save_file_here
-                logging.info(f"Error downloading media from {media_url}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    loop = asyncio.get_running_loop()
+    async with self._stream("GET", media_url, headers=self.headers) as r:
+        if r.status != 200:
+            logging.info(f"Error downloading media from {media_url}")
+            logging.info(f"Status code: {r.status}")
+            logging.info(f"Response: {await r.json()}")
+            return await r.json()
+        chunks = r.content.iter_chunked(chunk_size)
+        if sink is not None:
+            async for chunk in chunks:
+                outcome = sink(chunk)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+            logging.info(f"Media downloaded from {media_url}")
+            return True
+        if hasattr(file_path, "write"):
+            async for chunk in chunks:
+                await loop.run_in_executor(None, file_path.write, chunk)
+            logging.info(f"Media downloaded from {media_url}")
+            return file_path
+        extension = mime_type.split("/")[1]
+        save_file_here = (
+            f"{file_path}.{extension}" if file_path else f"temp.{extension}"
+        )
+        f = await loop.run_in_executor(None, open, save_file_here, "wb")
+        try:
+            async for chunk in chunks:
+                await loop.run_in_executor(None, f.write, chunk)
+        finally:
+            await loop.run_in_executor(None, f.close)
+        logging.info(f"Media downloaded from {media_url}")
+        return save_file_here
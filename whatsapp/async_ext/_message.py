@@ -1,32 +1,25 @@
 import logging
-import aiohttp
-import asyncio
-
-
-async def react(self, emoji: str) -> asyncio.Future:
-    data = {
-        "messaging_product": "whatsapp",
-        "recipient_type": "individual",
-        "to": self.sender,
-        "type": "reaction",
-        "reaction": {"message_id": self.id, "emoji": emoji},
-    }
-    logging.info(f"Reacting to {self.id}")
+from ..ext._payloads import (
+    messages_url,
+    reaction_message,
+    read_receipt,
+    template_message,
+    text_message,
+)
+
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Reacted to {self.id}")
-                    return await r.json()
-                logging.info(f"Reaction not sent to {self.id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
+async def react(self, emoji: str) -> dict:
+    data = reaction_message(self.id, emoji, self.sender)
+    logging.info(f"Reacting to {self.id}")
 
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self.instance._request("POST", self.url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Reacted to {self.id}")
+        return await r.json()
+    logging.info(f"Reaction not sent to {self.id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
 
 
 async def send_template(
@@ -36,7 +29,7 @@ async def send_template(
     components: str = None,
     lang: str = "en_US",
     sender=None,
-) -> asyncio.Future:
+) -> dict:
     """
     Sends a template message to a WhatsApp user, Template messages can either be;
         1. Text template
@@ -55,124 +48,71 @@ async def send_template(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_template("hello_world", "5511999999999", lang="en_US"))
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    data = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "template",
-        "template": {
-            "name": template,
-            "language": {"code": lang},
-            "components": components,
-        },
-    }
+    url = messages_url(self, sender)
+    data = dict(template_message(template, components, lang), to=recipient_id)
     logging.info(f"Sending template to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Template sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Template not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Template sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Template not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
 
 
 # MESSAGE()
 
 
-async def reply(self, reply_text: str = "", preview_url: bool = True) -> asyncio.Future:
-    if self.data == {}:
+async def reply(self, reply_text: str = "", preview_url: bool = True) -> dict:
+    if self.author is None:
         return {"error": "No data provided"}
-    author = self.instance.get_author(self.data)
-    payload = {
-        "messaging_product": "whatsapp",
-        "recipient_type": "individual",
-        "to": str(author),
-        "type": "text",
-        "context": {"message_id": self.id},
-        "text": {"preview_url": preview_url, "body": reply_text},
-    }
+    author = self.author
+    payload = text_message(
+        reply_text, str(author), preview_url=preview_url, reply_to=self.id
+    )
     logging.info(f"Replying to {self.id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.url, headers=self.headers, json=payload) as r:
-                if r.status == 200:
-                    logging.info(f"Replied to {self.id}")
-                    return await r.json()
-                logging.info(f"Reply not sent to {self.id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
-
-
-async def mark_as_read(self) -> asyncio.Future:
-    payload = {
-        "messaging_product": "whatsapp",
-        "status": "read",
-        "message_id": self.id,
-    }
+    r = await self.instance._request(
+        "POST", self.url, headers=self.headers, json=payload
+    )
+    if r.status == 200:
+        logging.info(f"Replied to {self.id}")
+        return await r.json()
+    logging.info(f"Reply not sent to {self.id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
+
+
+async def mark_as_read(self) -> dict:
+    payload = read_receipt(self.id)
 
     logging.info(f"Marking message {self.id} as read")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.url, headers=self.headers, json=payload) as r:
-                if r.status == 200:
-                    logging.info(f"Message {self.id} marked as read")
-                    return await r.json()
-                logging.info(f"Error marking message {self.id} as read")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
-
-
-async def send(self, preview_url: bool = True) -> asyncio.Future:
-    url = f"https://graph.facebook.com/{self.LATEST}/{self.sender}/messages"
-    data = {
-        "messaging_product": "whatsapp",
-        "recipient_type": self.rec,
-        "to": self.to,
-        "type": "text",
-        "text": {"preview_url": preview_url, "body": self.content},
-    }
+    r = await self.instance._request(
+        "POST", self.url, headers=self.headers, json=payload
+    )
+    if r.status == 200:
+        logging.info(f"Message {self.id} marked as read")
+        return await r.json()
+    logging.info(f"Error marking message {self.id} as read")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
+
+
+async def send(self, preview_url: bool = True) -> dict:
+    url = f"{self.instance.base_url}/{self.sender}/messages"
+    data = text_message(self.content, self.to, self.rec, preview_url)
     logging.info(f"Sending message to {self.to}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Message sent to {self.to}")
-                    return await r.json()
-                logging.info(f"Message not sent to {self.to}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self.instance._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Message sent to {self.to}")
+        return await r.json()
+    logging.info(f"Message not sent to {self.to}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
@@ -1,5 +1,7 @@
-import requests
-
-
-def authorized(self) -> bool:
-    return requests.get(self.url, headers=self.headers).status_code != 401
+async def authorized(self) -> bool:
+    """
+    Whether the API accepts the token of the instance, awaited: `await whatsapp.authorized`.
+    The request goes through the transport like every other, without blocking the event loop.
+    """
+    r = await self._request("GET", self.url, headers=self.headers)
+    return r.status != 401
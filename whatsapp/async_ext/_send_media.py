@@ -1,11 +1,10 @@
 import logging
-import aiohttp
-import asyncio
+from ..ext._payloads import location_message, media_message, messages_url
 
 
 async def send_location(
     self, lat: str, long: str, name: str, address: str, recipient_id: str, sender=None
-) -> asyncio.Future:
+) -> dict:
     """
     Sends a location message to a WhatsApp user
 
@@ -21,43 +20,18 @@ async def send_location(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_location("-23.564", "-46.654", "My Location", "Rua dois, 123", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    data = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "location",
-        "location": {
-            "latitude": lat,
-            "longitude": long,
-            "name": name,
-            "address": address,
-        },
-    }
+    url = messages_url(self, sender)
+    data = location_message(lat, long, name, address, recipient_id)
     logging.info(f"Sending location to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Location sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Location not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Location sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Location not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
 
 
 async def send_image(
@@ -68,7 +42,7 @@ async def send_image(
     caption: str = "",
     link: bool = True,
     sender=None,
-) -> asyncio.Future:
+) -> dict:
     """
     Sends an image message to a WhatsApp user
 
@@ -88,48 +62,18 @@ async def send_image(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_image("https://i.imgur.com/Fh7XVYY.jpeg", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": recipient_type,
-            "to": recipient_id,
-            "type": "image",
-            "image": {"link": image, "caption": caption},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": recipient_type,
-            "to": recipient_id,
-            "type": "image",
-            "image": {"id": image, "caption": caption},
-        }
+    url = messages_url(self, sender)
+    data = media_message("image", image, recipient_id, link, caption, recipient_type)
     logging.info(f"Sending image to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Image sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Image not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Image sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Image not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
 
 
 async def send_sticker(
@@ -139,7 +83,7 @@ async def send_sticker(
     recipient_type: str = "individual",
     link: bool = True,
     sender=None,
-) -> asyncio.Future:
+) -> dict:
     """
     Sends a sticker message to a WhatsApp user
 
@@ -158,53 +102,25 @@ async def send_sticker(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_sticker("170511049062862", "5511999999999", link=False)
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": recipient_type,
-            "to": recipient_id,
-            "type": "sticker",
-            "sticker": {"link": sticker},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": recipient_type,
-            "to": recipient_id,
-            "type": "sticker",
-            "sticker": {"id": sticker},
-        }
+    url = messages_url(self, sender)
+    data = media_message(
+        "sticker", sticker, recipient_id, link, recipient_type=recipient_type
+    )
     logging.info(f"Sending sticker to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Sticker sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Sticker not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Sticker sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Sticker not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
 
 
 async def send_audio(
     self, audio: str, recipient_id: str, link: bool = True, sender=None
-) -> asyncio.Future:
+) -> dict:
     """
     Sends an audio message to a WhatsApp user
     Audio messages can either be sent by passing the audio id or by passing the audio link.
@@ -219,46 +135,18 @@ async def send_audio(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_audio("https://www.soundhelix.com/examples/mp3/SoundHelix-Song-1.mp3", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "audio",
-            "audio": {"link": audio},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "audio",
-            "audio": {"id": audio},
-        }
+    url = messages_url(self, sender)
+    data = media_message("audio", audio, recipient_id, link)
     logging.info(f"Sending audio to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Audio sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Audio not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Audio sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Audio not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
 
 
 async def send_video(
@@ -268,7 +156,7 @@ async def send_video(
     caption: str = "",
     link: bool = True,
     sender=None,
-) -> asyncio.Future:
+) -> dict:
     """ "
     Sends a video message to a WhatsApp user
     Video messages can either be sent by passing the video id or by passing the video link.
@@ -284,46 +172,18 @@ async def send_video(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_video("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "video",
-            "video": {"link": video, "caption": caption},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "video",
-            "video": {"id": video, "caption": caption},
-        }
+    url = messages_url(self, sender)
+    data = media_message("video", video, recipient_id, link, caption)
     logging.info(f"Sending video to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Video sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Video not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Video sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Video not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
 
 
 async def send_document(
@@ -333,7 +193,7 @@ async def send_document(
     caption: str = "",
     link: bool = True,
     sender=None,
-) -> asyncio.Future:
+) -> dict:
     """ "
     Sends a document message to a WhatsApp user
     Document messages can either be sent by passing the document id or by passing the document link.
@@ -349,44 +209,15 @@ async def send_document(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_document("https://www.w3.org/WAI/ER/tests/xhtml/testfiles/resources/pdf/dummy.pdf", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "document",
-            "document": {"link": document, "caption": caption},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "document",
-            "document": {"id": document, "caption": caption},
-        }
-
+    url = messages_url(self, sender)
+    data = media_message("document", document, recipient_id, link, caption)
     logging.info(f"Sending document to {recipient_id}")
 
-    async def call():
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=self.headers, json=data) as r:
-                if r.status == 200:
-                    logging.info(f"Document sent to {recipient_id}")
-                    return await r.json()
-                logging.info(f"Document not sent to {recipient_id}")
-                logging.info(f"Status code: {r.status}")
-                logging.info(f"Response: {await r.json()}")
-                return await r.json()
-
-    f = asyncio.ensure_future(call())
-    await asyncio.sleep(0.001)  # make asyncio run the task
-    return f
+    r = await self._request("POST", url, headers=self.headers, json=data)
+    if r.status == 200:
+        logging.info(f"Document sent to {recipient_id}")
+        return await r.json()
+    logging.info(f"Document not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status}")
+    logging.info(f"Response: {await r.json()}")
+    return await r.json()
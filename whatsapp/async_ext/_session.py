@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import TYPE_CHECKING, Any, Awaitable, Union
+from ..ext import _chain
+from ..transport import BufferedResponse
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+def session(self) -> "aiohttp.ClientSession":
+    """
+    Long-lived aiohttp session shared by every coroutine of the instance.
+
+    The session is created on first use inside the running event loop, so its connector
+    keeps the connection pool, DNS cache and TLS sessions alive between requests.
+    If the instance is used from a new event loop (e.g. a second asyncio.run), a new session is created.
+    """
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    if self._session is None or self._session.closed or self._session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=self.connector_limit,
+            limit_per_host=self.connector_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._session_loop = loop
+    return self._session
+
+
+async def run(self, chain: _chain.Chain, stack: Union[AsyncExitStack, None] = None):
+    """
+    Runs a request chain of ext/_chain awaiting its I/O, returns its result.
+    The responses of streamed requests stay open until stack is closed.
+    """
+    op = next(chain)
+    while True:
+        try:
+            result = await perform(self, op, stack)
+        except Exception as e:
+            resume, value = chain.throw, e
+        else:
+            resume, value = chain.send, result
+        try:
+            op = resume(value)
+        except StopIteration as stop:
+            return stop.value
+
+
+async def perform(self, op: tuple, stack: Union[AsyncExitStack, None] = None) -> Any:
+    """Runs one operation of a request chain."""
+    kind = op[0]
+    if kind == _chain.SEND:
+        method, url, kwargs = op[1:]
+        if kwargs.get("stream"):
+            kwargs = {key: value for key, value in kwargs.items() if key != "stream"}
+            return await stack.enter_async_context(
+                self.transport.stream(method, url, kwargs)
+            )
+        return await self.transport.send(method, url, kwargs)
+    if kind == _chain.STATUS:
+        return op[1].status
+    if kind == _chain.JSON:
+        try:
+            return await op[1].json(content_type=None)
+        except ValueError:
+            return None
+    if kind == _chain.CONTENT:
+        # text() rather than read(): aiohttp refuses to read() a response once it is released
+        return (await op[1].text()).encode()
+    if kind == _chain.BATCH:
+        url, payload = op[1:]
+        status, body = await self.batcher.submit(url, payload)
+        return BufferedResponse(status, body, url)
+    if kind == _chain.ACQUIRE:
+        return await self.rate_limiter.acquire_async(op[1])
+    if kind == _chain.RECORD:
+        return await self.outbox.record_async(*op[1:])
+    if kind == _chain.SLEEP:
+        return await asyncio.sleep(op[1])
+    raise ValueError(f"Unknown operation {kind}")
+
+
+async def request(self, method: str, url: str, **kwargs) -> "aiohttp.ClientResponse":
+    """
+    Sends an HTTP request through the transport of the instance (the shared aiohttp session by default).
+
+    The body is read before the connection is released back to the pool,
+    so the returned response can still be awaited with .json() or .read().
+    If the instance has a rate limiter, messages wait here for the capacity of their sender.
+    If the instance has a retry policy, transient errors and connection failures are retried here;
+    a body that can only be read once must then be passed as a function returning it (see retry.body_factory).
+    If the instance has metrics, the duration, status and error code of the request are recorded here.
+    If the instance has an outbox, messages are journaled before they are sent and marked with the outcome.
+    The chain is shared with WhatsApp, see ext/_chain.py.
+
+    Args:
+        method[str]: HTTP method (GET, POST, DELETE...)
+        url[str]: Full url of the request
+        **kwargs: headers, json, data and timeout, like aiohttp.ClientSession.request
+    """
+    return await run(self, _chain.request(self, method, url, kwargs))
+
+
+async def deliver(
+    self, entry: str, method: str, url: str, kwargs: dict
+) -> "aiohttp.ClientResponse":
+    """Sends a message journaled in the outbox, then marks its entry with the outcome."""
+    return await run(self, _chain.deliver(self, entry, method, url, kwargs))
+
+
+async def post_batch(self, items: list) -> list:
+    """
+    Posts messages in one Graph API batch call.
+
+    Args:
+        items[list]: Url and JSON payload of each message
+
+    Returns:
+        list: The HTTP status and body answered to each message
+    """
+    return await run(self, _chain.post_batch(self, items))
+
+
+@asynccontextmanager
+async def stream(self, method: str, url: str, **kwargs):
+    """
+    Sends an HTTP request and yields the response before its body is read,
+    so it can be consumed in chunks with `response.content.iter_chunked()`.
+
+    The request goes through the same chain as request(), like a streamed request of WhatsApp:
+    error answers and connection failures are retried by the retry policy of the instance,
+    the body of a successful answer is never read twice, and the metrics record the request
+    once its answer has arrived. The responses are released when the block exits.
+
+    Args:
+        method[str]: HTTP method (GET, POST, DELETE...)
+        url[str]: Full url of the request
+        **kwargs: headers, json, data and timeout, like aiohttp.ClientSession.request
+    """
+    kwargs["stream"] = True
+    async with AsyncExitStack() as stack:
+        yield await run(self, _chain.request(self, method, url, kwargs), stack)
+
+
+def spawn(self, awaitable: Awaitable[Any]) -> "asyncio.Task":
+    """
+    Runs a send in the background without waiting for its result (fire and forget).
+
+    The task is tracked by the instance: drain() waits for the pending ones, and so does aclose()
+    (or leaving `async with`), so no message is lost on shutdown. Exceptions are logged.
+
+    Args:
+        awaitable[coroutine]: The send to run, e.g. whatsapp.send_template(...)
+
+    Returns:
+        asyncio.Task: The task running the send, it can still be awaited
+
+    Example:
+        >>> from whatsapp import AsyncWhatsApp
+        >>> whatsapp = AsyncWhatsApp(token, phone_number_id)
+        >>> whatsapp.spawn(whatsapp.send_template("hello_world", "5511999999999"))
+    """
+    task = asyncio.ensure_future(awaitable)
+    self._tasks.add(task)
+
+    def done(task: "asyncio.Task") -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Background send failed: {task.exception()!r}")
+
+    task.add_done_callback(done)
+    return task
+
+
+async def drain(self, timeout: Union[float, None] = None) -> None:
+    """
+    Waits for the sends started with spawn(), including the ones they start meanwhile.
+
+    Args:
+        timeout[float]: Seconds to wait, the sends still running after it are cancelled (default: None, no limit)
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while True:
+        tasks = [task for task in self._tasks if task.get_loop() is loop]
+        if not tasks:
+            return
+        remaining = None if deadline is None else max(deadline - loop.time(), 0)
+        _, pending = await asyncio.wait(tasks, timeout=remaining)
+        if pending:
+            logging.warning(f"Cancelling {len(pending)} background sends")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            return
+
+
+async def aclose(self) -> None:
+    """
+    Waits for the sends started with spawn() and posts the messages waiting in the batcher,
+    then closes the shared session and its connector.
+
+    Example:
+        >>> from whatsapp import AsyncWhatsApp
+        >>> whatsapp = AsyncWhatsApp(token, phone_number_id)
+        >>> await whatsapp.aclose()
+    """
+    if self.batcher is not None:
+        # the spawned sends waiting for a batch call get their answer without waiting the window
+        self.batcher.shutdown()
+    await drain(self)
+    if self.batcher is not None:
+        await self.batcher.aclose()
+    await self.transport.aclose()
+    if self._session is not None and not self._session.closed:
+        await self._session.close()
+    self._session = None
+    self._session_loop = None
+
+
+async def aenter(self):
+    return self
+
+
+async def aexit(self, *args) -> None:
+    await self.aclose()
@@ -0,0 +1,297 @@
+"""
+Coalescing of messages into Graph API batch requests.
+
+The Graph API accepts up to 50 sub-requests in one call (POST {base_url}/ with a batch
+parameter). With batch=True, the messages sent by a client are not posted one by one: they are
+queued, and every window (5 ms by default) or as soon as 50 are waiting, the queued messages are
+posted in one batch call. The answer of each sub-request is handed back to the caller that sent
+the message, which sees the same status and body as if it had been sent alone, so error answers
+go through Handle and the retry policy like any other.
+
+Batching trades a few milliseconds of latency per message for far fewer HTTP requests: it pays
+off when many messages are sent at once (bulk sends, concurrent handlers), not for a lone send.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Union
+from urllib.parse import urlencode
+
+from .ratelimit import sender_of
+
+# maximum number of sub-requests in one batch call
+BATCH_LIMIT = 50
+# seconds the first queued message waits for others before the batch is posted
+BATCH_WINDOW = 0.005
+
+# answered to a sub-request the API did not process (it answers null when the batch timed out)
+UNPROCESSED = json.dumps(
+    {
+        "error": {
+            "message": "(#2) The batch request timed out before this request was processed",
+            "type": "OAuthException",
+            "code": 2,
+        }
+    }
+).encode()
+
+Item = Tuple[str, Dict[str, Any]]
+Answer = Tuple[int, bytes]
+
+
+def batchable(method: str, url: str, kwargs: Dict[str, Any]) -> bool:
+    """Whether a request is a message with a JSON body that can go in a batch call."""
+    return (
+        method == "POST"
+        and isinstance(kwargs.get("json"), dict)
+        and "data" not in kwargs
+        and "files" not in kwargs
+        and sender_of(url) is not None
+    )
+
+
+def batch_form(base_url: str, items: List[Item]) -> Dict[str, str]:
+    """
+    Builds the form of a batch call posting messages.
+
+    Args:
+        base_url[str]: Base url of the Graph API of the client, the sub-request urls are relative to it
+        items[list]: Url and JSON payload of each message
+
+    Returns:
+        dict: The form fields of the call
+    """
+    prefix = base_url.rstrip("/") + "/"
+    batch = []
+    for url, payload in items:
+        # the body of a sub-request is form encoded, objects are passed as JSON strings
+        body = urlencode(
+            {k: v if isinstance(v, str) else json.dumps(v) for k, v in payload.items()}
+        )
+        relative_url = url[len(prefix) :] if url.startswith(prefix) else url
+        batch.append({"method": "POST", "relative_url": relative_url, "body": body})
+    return {"batch": json.dumps(batch), "include_headers": "false"}
+
+
+def split_answers(status: int, body: bytes, count: int) -> List[Answer]:
+    """
+    Splits the answer of a batch call into the status and body of each sub-request.
+
+    If the call itself failed, every sub-request gets its status and body.
+    """
+    answers = None
+    if status == 200:
+        try:
+            answers = json.loads(body)
+        except ValueError:
+            pass
+    if not isinstance(answers, list) or len(answers) != count:
+        if status == 200:
+            logging.error(f"Unexpected answer to a batch of {count} messages: {body!r}")
+            status, body = 500, UNPROCESSED
+        return [(status, body)] * count
+    split = []
+    for answer in answers:
+        if not isinstance(answer, dict):
+            split.append((500, UNPROCESSED))
+        else:
+            split.append(
+                (answer.get("code", 500), str(answer.get("body", "")).encode())
+            )
+    return split
+
+
+class Batcher:
+    """
+    Queues the messages sent from any thread and posts them in batch calls.
+
+    close() posts the messages still queued and stops the threads, it is called by
+    WhatsApp.close() and when the batcher is used as a context manager. A message submitted
+    after close() is posted alone right away, from the thread that submits it.
+
+    Args:
+        post[function]: Posts a list of (url, payload) in one batch call and returns the (status, body) of each
+        window[float]: Seconds the first queued message waits for others (default: 0.005)
+        limit[int]: Maximum number of messages in one call (default: 50)
+        concurrency[int]: Maximum number of batch calls in flight (default: 8)
+    """
+
+    def __init__(
+        self,
+        post: Callable[[List[Item]], List[Answer]],
+        window: float = BATCH_WINDOW,
+        limit: int = BATCH_LIMIT,
+        concurrency: int = 8,
+    ):
+        self.window = window
+        self.limit = min(limit, BATCH_LIMIT)
+        self.batches = 0
+        self._post = post
+        self._pending: List[Tuple[str, Dict[str, Any], Future]] = []
+        self._ready = threading.Condition()
+        self._collector: Union[threading.Thread, None] = None
+        self._closed = False
+        self._pool = ThreadPoolExecutor(
+            concurrency, thread_name_prefix="whatsapp-batch"
+        )
+
+    def submit(self, url: str, payload: Dict[str, Any]) -> "Future[Answer]":
+        """Queues a message, the returned future resolves to the (status, body) answered to it."""
+        future: "Future[Answer]" = Future()
+        with self._ready:
+            closed = self._closed
+            if not closed:
+                self._pending.append((url, payload, future))
+                if self._collector is None:
+                    self._collector = threading.Thread(
+                        target=self._collect, name="whatsapp-batcher", daemon=True
+                    )
+                    self._collector.start()
+                self._ready.notify()
+        if closed:
+            self._flush([(url, payload, future)])
+        return future
+
+    def _collect(self) -> None:
+        while True:
+            with self._ready:
+                while not self._pending and not self._closed:
+                    self._ready.wait()
+                if not self._pending:
+                    return
+                deadline = time.monotonic() + self.window
+                # once closed, the queued messages are posted without waiting for others
+                while len(self._pending) < self.limit and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+                items = self._pending[: self.limit]
+                del self._pending[: self.limit]
+                self.batches += 1
+            self._pool.submit(self._flush, items)
+
+    def _flush(self, items: List[Tuple[str, Dict[str, Any], Future]]) -> None:
+        try:
+            answers = self._post([(url, payload) for url, payload, _ in items])
+        except BaseException as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        for (_, _, future), answer in zip(items, answers):
+            future.set_result(answer)
+
+    def close(self) -> None:
+        """Posts the queued messages, waits for the batch calls in flight and stops the threads."""
+        with self._ready:
+            if self._closed:
+                return
+            self._closed = True
+            collector = self._collector
+            self._ready.notify_all()
+        if collector is not None:
+            collector.join()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "Batcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncBatcher:
+    """
+    Queues the messages sent by the coroutines of an event loop and posts them in batch calls.
+
+    aclose() posts the messages still queued and waits for the batch calls in flight, it is
+    called by AsyncWhatsApp.aclose() and when the batcher is used as an async context manager.
+    A message submitted after shutdown() or aclose() is posted alone right away, until the batcher
+    is used from a new event loop, which batches again.
+
+    Args:
+        post[function]: Coroutine function posting a list of (url, payload) in one batch call and returning the (status, body) of each
+        window[float]: Seconds the first queued message waits for others (default: 0.005)
+        limit[int]: Maximum number of messages in one call (default: 50)
+    """
+
+    def __init__(
+        self,
+        post: Callable[[List[Item]], Awaitable[List[Answer]]],
+        window: float = BATCH_WINDOW,
+        limit: int = BATCH_LIMIT,
+    ):
+        self.window = window
+        self.limit = min(limit, BATCH_LIMIT)
+        self.batches = 0
+        self._post = post
+        self._pending: List[Tuple[str, Dict[str, Any], "asyncio.Future"]] = []
+        self._timer: Union[asyncio.TimerHandle, None] = None
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._tasks: set = set()
+        self._closed = False
+
+    def submit(self, url: str, payload: Dict[str, Any]) -> "asyncio.Future[Answer]":
+        """Queues a message, the returned future resolves to the (status, body) answered to it."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # the messages queued in a previous event loop can't be answered anymore
+            self._loop, self._pending, self._timer = loop, [], None
+            self._closed = False
+        future = loop.create_future()
+        self._pending.append((url, payload, future))
+        if len(self._pending) >= self.limit or self._closed:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if not items:
+            return
+        task = self._loop.create_task(self._send(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def shutdown(self) -> None:
+        """Posts the queued messages, and the ones submitted afterwards without waiting the window."""
+        self._closed = True
+        if self._loop is asyncio.get_running_loop():
+            self._flush()
+
+    async def aclose(self) -> None:
+        """Posts the queued messages and waits for the batch calls in flight."""
+        self.shutdown()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> "AsyncBatcher":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _send(self, items: List[Tuple[str, Dict[str, Any], "asyncio.Future"]]):
+        self.batches += 1
+        try:
+            answers = await self._post([(url, payload) for url, payload, _ in items])
+        except asyncio.CancelledError:
+            for _, _, future in items:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), answer in zip(items, answers):
+            if not future.done():
+                future.set_result(answer)
@@ -0,0 +1,318 @@
+"""
+Caches used by the clients to avoid repeating Graph API calls.
+
+TTLCache is a thread-safe in-memory LRU whose entries expire. The media upload cache maps the
+content hash of a file and the phone number id it was uploaded from to the returned media id,
+with an in-memory backend for one process and a SQLite backend shared by several processes.
+SingleFlight and AsyncSingleFlight collapse concurrent lookups of the same key into one request.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Union
+
+# Meta keeps uploaded media for 30 days
+MEDIA_RETENTION = 30 * 86400
+# media ids are reused for one day less, so an id never expires while a message is being sent
+MEDIA_TTL = MEDIA_RETENTION - 86400
+# the url returned by query_media_url is valid for 5 minutes, it is reused for 4
+MEDIA_URL_TTL = 240
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU mapping whose entries expire `ttl` seconds after they are set.
+
+    Args:
+        maxsize[int]: Maximum number of entries, the least recently used one is evicted first (default: 1024)
+        ttl[float]: Seconds an entry stays valid (default: 300)
+        clock[function]: Source of the current time (default: time.monotonic)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires = item
+            if expires <= self.clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Union[float, None] = None) -> None:
+        expires = self.clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key: Hashable, value: Any = True) -> bool:
+        """
+        Sets key only if it is missing or expired, atomically.
+
+        Returns:
+            bool: True if key was set, False if it already held a valid entry
+        """
+        now = self.clock()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[1] > now:
+                self._data.move_to_end(key)
+                return False
+            self._data[key] = (value, now + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        if item is _MISSING or item[1] <= self.clock():
+            return default
+        return item[0]
+
+    def discard_value(self, value: Any) -> None:
+        """Removes every entry holding `value`."""
+        with self._lock:
+            for key in [k for k, (v, _) in self._data.items() if v == value]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class MediaCache:
+    """
+    Backend of the media upload cache: maps a key (sender and content hash) to a media id.
+
+    Subclass it and implement get, set and discard to store the ids somewhere else (Redis...).
+    """
+
+    ttl: float = MEDIA_TTL
+
+    def get(self, key: str) -> Union[str, None]:
+        """Returns the media id stored for key, None if there is none or it expired."""
+        raise NotImplementedError
+
+    def set(self, key: str, media_id: str) -> None:
+        """Stores the media id uploaded for key."""
+        raise NotImplementedError
+
+    def discard(self, media_id: str) -> None:
+        """Forgets a media id, called when the media is deleted."""
+        raise NotImplementedError
+
+
+class MemoryMediaCache(MediaCache):
+    """
+    Media upload cache kept in the memory of the process.
+
+    Args:
+        maxsize[int]: Maximum number of media ids, the least recently used one is evicted first (default: 1024)
+        ttl[float]: Seconds a media id is reused (default: 29 days)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = MEDIA_TTL):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, key: str) -> Union[str, None]:
+        return self._cache.get(key)
+
+    def set(self, key: str, media_id: str) -> None:
+        self._cache.set(key, media_id)
+
+    def discard(self, media_id: str) -> None:
+        self._cache.discard_value(media_id)
+
+
+class SQLiteMediaCache(MediaCache):
+    """
+    Media upload cache stored in a SQLite file, shared by every process and worker using the same path.
+
+    Args:
+        path[str]: Path of the database file, created if needed
+        ttl[float]: Seconds a media id is reused (default: 29 days)
+    """
+
+    def __init__(self, path: str, ttl: float = MEDIA_TTL):
+        import sqlite3
+
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS media ("
+                "key TEXT PRIMARY KEY, media_id TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS media_by_id ON media (media_id)"
+            )
+
+    def get(self, key: str) -> Union[str, None]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT media_id FROM media WHERE key = ? AND expires > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, media_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO media (key, media_id, expires) VALUES (?, ?, ?)",
+                (key, media_id, now + self.ttl),
+            )
+            self._writes += 1
+            # expired rows are purged from time to time instead of on every read
+            if self._writes % 100 == 0:
+                self._db.execute("DELETE FROM media WHERE expires <= ?", (now,))
+
+    def discard(self, media_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM media WHERE media_id = ?", (media_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Returns the sha256 of the content of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def media_key(sender: str, path: str) -> str:
+    """Key of a file in the media upload cache: the sender phone number id and the sha256 of the file."""
+    return f"{sender}:{file_digest(os.path.realpath(path))}"
+
+
+def create_media_cache(
+    media_cache: Union[MediaCache, str, bool, None],
+) -> Union[MediaCache, None]:
+    """
+    Builds the media upload cache of a client from its media_cache argument:
+    True for an in-memory cache, a path for a SQLite cache, or a MediaCache.
+    """
+    if media_cache is None or media_cache is False:
+        return None
+    if media_cache is True:
+        return MemoryMediaCache()
+    if isinstance(media_cache, (str, os.PathLike)):
+        return SQLiteMediaCache(os.fspath(media_cache))
+    return media_cache
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first thread runs the function,
+    the others wait for it and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """
+    Collapses concurrent awaits for the same key into one: the first coroutine runs the
+    coroutine function, the others await its result (or exception).
+    """
+
+    def __init__(self):
+        self._futures: Dict[Hashable, "asyncio.Future"] = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        future = self._futures.get(key)
+        if future is not None and future.get_loop() is loop:
+            return await asyncio.shield(future)
+        future = self._futures[key] = loop.create_future()
+        # the exception is retrieved even if no other coroutine was waiting for it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._futures.get(key) is future:
+                del self._futures[key]
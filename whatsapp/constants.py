@@ -2,3 +2,6 @@
 # The VERSION constant is used to store the version of the project - it's not only used in the __init__.py file, but also in the pyproject.toml file.
 
 VERSION = "4.3.0"
+
+# Graph API version used when version="latest" can't be resolved (offline mode without a cached version).
+DEFAULT_API_VERSION = "v24.0"
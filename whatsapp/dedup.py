@@ -0,0 +1,146 @@
+"""
+Deduplication of webhook events.
+
+Meta delivers a webhook again when it is not acknowledged fast enough, so the same message or
+status can reach the handlers twice. A Deduplicator remembers the keys of the events already
+dispatched (the message id, or the message id and delivery status of a status) for a time window,
+and dispatch() skips the events it has already seen. The key of an event whose handler fails is
+forgotten, so that the delivery Meta sends again after the error is dispatched again.
+
+MemoryDeduplicator is a bounded LRU kept in the process; SQLiteDeduplicator stores the keys in a
+SQLite file shared by every worker (e.g. uvicorn --workers) pointing at the same path.
+"""
+
+import os
+import threading
+import time
+from typing import Union
+
+from .cache import TTLCache
+
+# Meta keeps retrying a delivery for up to 7 days
+DEDUP_TTL = 7 * 86400
+
+
+def event_key(event) -> Union[str, None]:
+    """Key of a webhook event: the message id, or the message id and status of a status."""
+    if event.id is None:
+        return None
+    if event.kind == "status":
+        return f"status:{event.id}:{event.status}"
+    return f"{event.kind}:{event.id}"
+
+
+class Deduplicator:
+    """
+    Remembers the keys of the webhook events already dispatched.
+
+    Subclass it and implement seen and forget to store the keys somewhere else (Redis...).
+    dispatch() calls them in the default executor, off the event loop, unless blocking is False.
+    """
+
+    # whether seen and forget may block (disk, network), set it to False if they never do
+    blocking = True
+
+    def seen(self, key: str) -> bool:
+        """
+        Records key and tells whether it was already recorded, atomically.
+
+        Returns:
+            bool: True if the event was already dispatched and must be skipped
+        """
+        raise NotImplementedError
+
+    def forget(self, key: str) -> None:
+        """Removes key, recorded by seen for an event whose handler failed."""
+        raise NotImplementedError
+
+
+class MemoryDeduplicator(Deduplicator):
+    """
+    Deduplicator kept in the memory of the process.
+
+    Args:
+        maxsize[int]: Maximum number of keys, the least recently seen one is forgotten first (default: 100000)
+        ttl[float]: Seconds a key is remembered (default: 7 days)
+    """
+
+    blocking = False
+
+    def __init__(self, maxsize: int = 100_000, ttl: float = DEDUP_TTL):
+        self._keys = TTLCache(maxsize, ttl)
+
+    def seen(self, key: str) -> bool:
+        return not self._keys.add(key)
+
+    def forget(self, key: str) -> None:
+        self._keys.pop(key)
+
+
+class SQLiteDeduplicator(Deduplicator):
+    """
+    Deduplicator stored in a SQLite file, shared by every process and worker using the same path.
+
+    Args:
+        path[str]: Path of the database file, created if needed
+        ttl[float]: Seconds a key is remembered (default: 7 days)
+    """
+
+    def __init__(self, path: str, ttl: float = DEDUP_TTL):
+        import sqlite3
+
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # commits are not synced to disk one by one, they survive a crash of the app
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "key TEXT PRIMARY KEY, expires REAL NOT NULL)"
+            )
+
+    def seen(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            # an expired key is replaced, a valid one makes the insert a no-op
+            inserted = self._db.execute(
+                "INSERT INTO events (key, expires) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET expires = excluded.expires "
+                "WHERE events.expires <= ?",
+                (key, now + self.ttl, now),
+            ).rowcount
+            self._writes += 1
+            # expired keys are purged from time to time instead of on every insert
+            if self._writes % 1000 == 0:
+                self._db.execute("DELETE FROM events WHERE expires <= ?", (now,))
+        return inserted == 0
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM events WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def create_deduplicator(
+    dedup: Union[Deduplicator, str, bool, None],
+) -> Union[Deduplicator, None]:
+    """
+    Builds the webhook deduplicator of a client from its dedup argument:
+    True for an in-memory deduplicator, a path for a SQLite one, or a Deduplicator.
+    """
+    if dedup is None or dedup is False:
+        return None
+    if dedup is True:
+        return MemoryDeduplicator()
+    if isinstance(dedup, (str, os.PathLike)):
+        return SQLiteDeduplicator(os.fspath(dedup))
+    return dedup
@@ -0,0 +1,492 @@
+"""
+Local stand-in of the Graph API endpoints used by the clients, for offline tests and benchmarks.
+
+The emulator serves /{phone_number_id}/messages, /{phone_number_id}/media and /{media_id} like
+the Cloud API does, batch calls to / holding such requests, and the media download urls it hands
+out. Latency, error codes (any code of
+whatsapp.errors.pairings) and per phone number rate limits can be configured, so every feature of
+the clients (retries, rate limiting, caches, bulk sends...) can be exercised without a network.
+
+Example:
+    >>> from whatsapp import WhatsApp
+    >>> from whatsapp.emulator import GraphEmulator
+    >>> with GraphEmulator(latency=0.05, rate_limit=80) as emulator:
+    ...     whatsapp = WhatsApp("token", {1: "123456"}, base_url=emulator.base_url, offline=True)
+    ...     whatsapp.send_template("hello_world", "5511999999999")
+
+It can also be started from the command line:
+    python -m whatsapp.emulator --port 8080 --latency 0.05
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+from .batch import BATCH_LIMIT
+from .constants import DEFAULT_API_VERSION
+from .errors import pairings
+from .ratelimit import TokenBucket
+
+# codes answered with HTTP 429 and 5xx, every other error is a 400 like on the real API
+THROTTLING_CODES = (4, 80007, 130429, 131048, 131056, 133016)
+SERVER_ERROR_CODES = (1, 2, 131000, 131016, 131057, 133004)
+AUTH_ERROR_CODES = {0: 401, 190: 401, 3: 403, 10: 403, 200: 403}
+
+
+def error_body(code: int, message: Union[str, None] = None) -> Dict[str, Any]:
+    """Returns the body of a Graph API error with the given code."""
+    if message is None:
+        exception = pairings.get(code)
+        message = exception.__name__ if exception else "Unknown error"
+    return {
+        "error": {
+            "message": f"(#{code}) {message}",
+            "type": "OAuthException",
+            "code": code,
+            "fbtrace_id": "emulator",
+        }
+    }
+
+
+def error_status(code: int) -> int:
+    """Returns the HTTP status the emulator answers an error code with."""
+    if code in THROTTLING_CODES:
+        return 429
+    if code in SERVER_ERROR_CODES:
+        return 503 if code in (2, 131016, 133004) else 500
+    return AUTH_ERROR_CODES.get(code, 400)
+
+
+def parse_multipart(
+    content_type: str, body: bytes
+) -> Dict[str, Tuple[Dict[str, str], str, bytes]]:
+    """
+    Splits a multipart/form-data body into its fields.
+
+    The body is only split on the boundary, so large uploads are parsed at memory speed
+    (the email package decodes them line by line).
+
+    Returns:
+        dict: Disposition parameters, content type and content of each field, by field name
+    """
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if match is None:
+        return {}
+    fields = {}
+    for part in body.split(b"--" + match.group(1).encode())[1:]:
+        if part.startswith(b"--"):
+            break
+        head, _, content = part.partition(b"\r\n\r\n")
+        if content.endswith(b"\r\n"):
+            content = content[:-2]
+        headers = {}
+        for line in head.decode("utf-8", "replace").split("\r\n"):
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+        params = dict(
+            re.findall(r'(\w+)="([^"]*)"', headers.get("content-disposition", ""))
+        )
+        if "name" in params:
+            fields[params["name"]] = (
+                params,
+                headers.get("content-type", "text/plain"),
+                content,
+            )
+    return fields
+
+
+class EmulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 drops the connections opened by a burst of concurrent sends
+    request_queue_size = 1024
+
+
+class GraphEmulator:
+    """
+    Threaded HTTP server emulating the Graph API.
+
+    Args:
+        host[str]: Address to listen on (default: 127.0.0.1)
+        port[int]: Port to listen on, 0 picks a free one (default: 0)
+        version[str]: API version in the path of base_url (default: DEFAULT_API_VERSION)
+        token[str]: Only accept requests with this bearer token, others get error 190 (default: None, any token)
+        latency[float]: Seconds every answer is delayed by (default: 0)
+        jitter[float]: Random extra delay added to latency, in seconds (default: 0)
+        error_rate[float]: Share of the requests answered with one of error_codes (default: 0)
+        error_codes[list[int]]: Codes of whatsapp.errors.pairings used by error_rate (default: 131000)
+        rate_limit[float]: Messages per second accepted from each phone number id, the others get error 130429 (default: None, no limit)
+        rate_burst[int]: Messages each phone number id can send at once (default: rate_limit)
+        record[bool]: Keep the payloads of the messages received in `messages` (default: True)
+        seed[int]: Seed of the random generator used by jitter and error_rate (default: None)
+        clock[function]: Source of the time of the rate limits, a clock the caller advances makes them deterministic (default: time.monotonic)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        version: str = DEFAULT_API_VERSION,
+        token: Union[str, None] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_codes: Iterable[int] = (131000,),
+        rate_limit: Union[float, None] = None,
+        rate_burst: Union[int, None] = None,
+        record: bool = True,
+        seed: Union[int, None] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.error_codes = list(error_codes)
+        for code in self.error_codes:
+            self._check_code(code)
+        self.host = host
+        self.port = port
+        self.version = version
+        self.token = token
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        self.record = record
+        self.clock = clock
+        self.messages: List[Dict[str, Any]] = []
+        self.media: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, Any] = {}
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._injected: List[List[Any]] = []
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._server: Union[ThreadingHTTPServer, None] = None
+        self._thread: Union[threading.Thread, None] = None
+        self.reset()
+
+    @staticmethod
+    def _check_code(code: int) -> None:
+        if code not in pairings:
+            raise ValueError(f"{code} is not an error code of whatsapp.errors.pairings")
+
+    @property
+    def url(self) -> str:
+        """Root url of the server"""
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def base_url(self) -> str:
+        """Url to pass as base_url to the clients"""
+        return f"{self.url}/{self.version}"
+
+    def start(self) -> "GraphEmulator":
+        """Starts serving in a background thread."""
+        if self._server is not None:
+            return self
+        self._server = EmulatorServer((self.host, self.port), self._handler())
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="graph-emulator",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = self._thread = None
+
+    def __enter__(self) -> "GraphEmulator":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def reset(self) -> None:
+        """Forgets the messages, media, injected errors, rate limits and stats."""
+        with self._lock:
+            self.messages.clear()
+            self.media.clear()
+            self._injected.clear()
+            self._buckets.clear()
+            self.stats.clear()
+            self.stats.update(requests=0, batches=0, messages=0, uploads=0, errors={})
+
+    def inject(self, code: int, count: int = 1, path: Union[str, None] = None) -> None:
+        """
+        Answers the next requests with an error.
+
+        Args:
+            code[int]: Error code, one of whatsapp.errors.pairings
+            count[int]: Number of requests that fail (default: 1)
+            path[str]: Only fail requests whose path ends with this, e.g. "/messages" (default: None, any request)
+        """
+        self._check_code(code)
+        with self._lock:
+            self._injected.append([code, count, path])
+
+    def _injected_error(self, path: str) -> Union[int, None]:
+        with self._lock:
+            for injected in self._injected:
+                code, count, suffix = injected
+                if suffix is None or path.endswith(suffix):
+                    injected[1] -= 1
+                    if injected[1] <= 0:
+                        self._injected.remove(injected)
+                    return code
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._random.choice(self.error_codes)
+        return None
+
+    def _throttled(self, sender: str) -> bool:
+        if self.rate_limit is None:
+            return False
+        with self._lock:
+            bucket = self._buckets.get(sender)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_limit, self.rate_burst, self.clock)
+                self._buckets[sender] = bucket
+        if bucket.reserve():
+            bucket.refund()
+            return True
+        return False
+
+    def _delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def _count_error(self, code: int) -> None:
+        with self._lock:
+            self.stats["errors"][code] = self.stats["errors"].get(code, 0) + 1
+
+    def handle(
+        self, method: str, path: str, headers: Any, body: bytes
+    ) -> Tuple[int, str, bytes]:
+        """
+        Answers one request.
+
+        Returns:
+            tuple: HTTP status, content type and body of the answer
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+
+        if self.token is not None:
+            if headers.get("Authorization") != f"Bearer {self.token}":
+                return self._error(190, "Invalid OAuth access token")
+        parts = [p for p in path.split("/") if p]
+        if parts == [self.version] and method == "POST":
+            return self._batch(body)
+        return self._route(method, path, headers, body)
+
+    def _route(
+        self, method: str, path: str, headers: Any, body: bytes
+    ) -> Tuple[int, str, bytes]:
+        code = self._injected_error(path)
+        if code is not None:
+            return self._error(code)
+
+        parts = [p for p in path.split("/") if p]
+        if len(parts) == 2 and parts[0] == "download":
+            return self._download(parts[1])
+        if not parts or parts[0] != self.version:
+            return self._error(100, f"Unknown path {path}")
+        parts = parts[1:]
+        if len(parts) == 2 and parts[1] == "messages":
+            if method == "GET":
+                return self._json({"data": []})
+            if method == "POST":
+                return self._message(parts[0], body)
+        if len(parts) == 2 and parts[1] == "media" and method == "POST":
+            return self._upload(headers.get("Content-Type", ""), body)
+        if len(parts) == 1 and method == "GET":
+            return self._query_media(parts[0])
+        if len(parts) == 1 and method == "DELETE":
+            return self._delete_media(parts[0])
+        return self._error(100, f"Unsupported request {method} {path}")
+
+    def _batch(self, body: bytes) -> Tuple[int, str, bytes]:
+        try:
+            form = dict(parse_qsl(body.decode()))
+            batch = json.loads(form["batch"])
+        except (KeyError, ValueError):
+            return self._error(100, "Parameter batch is required")
+        if not isinstance(batch, list) or len(batch) > BATCH_LIMIT:
+            return self._error(100, f"A batch holds at most {BATCH_LIMIT} requests")
+        with self._lock:
+            self.stats["batches"] += 1
+        answers = []
+        for request in batch:
+            # the body of a sub-request is form encoded, with objects as JSON strings
+            params = {
+                k: json.loads(v) if v[:1] in ("{", "[") else v
+                for k, v in parse_qsl(request.get("body", ""))
+            }
+            status, _, data = self._route(
+                request.get("method", "GET"),
+                f"/{self.version}/{request.get('relative_url', '')}",
+                {},
+                json.dumps(params).encode(),
+            )
+            answers.append({"code": status, "body": data.decode()})
+        return self._json(answers)
+
+    def _json(self, data: Any, status: int = 200) -> Tuple[int, str, bytes]:
+        return status, "application/json", json.dumps(data).encode()
+
+    def _error(
+        self, code: int, message: Union[str, None] = None
+    ) -> Tuple[int, str, bytes]:
+        self._count_error(code)
+        return self._json(error_body(code, message), error_status(code))
+
+    def _message(self, sender: str, body: bytes) -> Tuple[int, str, bytes]:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._error(100, "Invalid JSON body")
+        if payload.get("status") == "read":
+            return self._json({"success": True})
+        if "to" not in payload:
+            return self._error(131008, "Parameter to is required")
+        if self._throttled(sender):
+            return self._error(130429, "Rate limit hit")
+        message_id = f"wamid.emulator.{next(self._ids)}"
+        with self._lock:
+            self.stats["messages"] += 1
+            if self.record:
+                self.messages.append(dict(payload, id=message_id, sender=sender))
+        return self._json(
+            {
+                "messaging_product": "whatsapp",
+                "contacts": [{"input": payload["to"], "wa_id": payload["to"]}],
+                "messages": [{"id": message_id}],
+            }
+        )
+
+    def _upload(self, content_type: str, body: bytes) -> Tuple[int, str, bytes]:
+        upload = parse_multipart(content_type, body).get("file")
+        if upload is None:
+            return self._error(131008, "Parameter file is required")
+        params, mime_type, content = upload
+        media_id = str(next(self._ids))
+        with self._lock:
+            self.stats["uploads"] += 1
+            self.media[media_id] = {
+                "content": content,
+                "mime_type": mime_type,
+                "sha256": hashlib.sha256(content).hexdigest(),
+                "filename": params.get("filename"),
+            }
+        return self._json({"id": media_id})
+
+    def _query_media(self, media_id: str) -> Tuple[int, str, bytes]:
+        media = self.media.get(media_id)
+        if media is None:
+            return self._error(100, f"Unknown media {media_id}")
+        return self._json(
+            {
+                "messaging_product": "whatsapp",
+                "url": f"{self.url}/download/{media_id}",
+                "mime_type": media["mime_type"],
+                "sha256": media["sha256"],
+                "file_size": len(media["content"]),
+                "id": media_id,
+            }
+        )
+
+    def _delete_media(self, media_id: str) -> Tuple[int, str, bytes]:
+        with self._lock:
+            media = self.media.pop(media_id, None)
+        if media is None:
+            return self._error(100, f"Unknown media {media_id}")
+        return self._json({"success": True})
+
+    def _download(self, media_id: str) -> Tuple[int, str, bytes]:
+        media = self.media.get(media_id)
+        if media is None:
+            return self._error(100, f"Unknown media {media_id}")
+        return 200, media["mime_type"], media["content"]
+
+    def _handler(self) -> type:
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                path = urlsplit(self.path).path
+                status, content_type, data = emulator.handle(
+                    self.command, path, self.headers, body
+                )
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = answer
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local emulator of the Graph API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-codes", type=int, nargs="+", default=[131000])
+    parser.add_argument("--rate-limit", type=float, default=None)
+    parser.add_argument("--rate-burst", type=int, default=None)
+    args = parser.parse_args()
+
+    emulator = GraphEmulator(
+        host=args.host,
+        port=args.port,
+        token=args.token,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_codes=args.error_codes,
+        rate_limit=args.rate_limit,
+        rate_burst=args.rate_burst,
+        record=False,
+    ).start()
+    print(f"Graph API emulator listening, base_url: {emulator.base_url}")
+    try:
+        emulator._thread.join()
+    except KeyboardInterrupt:
+        emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
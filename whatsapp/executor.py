@@ -0,0 +1,106 @@
+"""
+Parallel sends for the synchronous client.
+
+WhatsApp.executor is a bounded thread pool attached to the client: its workers share the pooled
+session, rate limiter, retry policy and caches of the client, and every call submitted to it
+returns a concurrent.futures.Future. Sync code (Flask, Django, scripts) gets the throughput of
+concurrent requests without moving to asyncio.
+"""
+
+import collections
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+
+class SendExecutor:
+    """
+    Thread pool running the calls of a client in parallel.
+
+    Every method of the client can be called on the executor, it is then submitted to the pool
+    and a Future is returned instead of the result.
+
+    Args:
+        client[WhatsApp]: The client whose methods are run
+        max_workers[int]: Number of worker threads, keep it at most pool_maxsize so every worker has a pooled connection (default: 10)
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> whatsapp = WhatsApp(token, phone_number_id)
+        >>> future = whatsapp.executor.send_template("hello_world", "5511999999999")
+        >>> future.result()
+        >>> for response in whatsapp.executor.map(whatsapp.send_template, templates, recipients):
+        ...     print(response)
+    """
+
+    def __init__(self, client: Any, max_workers: int = 10):
+        self.client = client
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="whatsapp-executor"
+        )
+
+    def submit(self, function: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Runs function(*args, **kwargs) in the pool.
+
+        Returns:
+            Future: Resolves to the return value of the call, or raises its exception
+        """
+        return self._pool.submit(function, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Callable[..., Future]:
+        method = getattr(self.client, name)
+        if not callable(method):
+            raise AttributeError(f"{name} is not a method of the client")
+
+        @functools.wraps(method)
+        def submit(*args, **kwargs) -> Future:
+            return self._pool.submit(method, *args, **kwargs)
+
+        return submit
+
+    def map(self, function: Callable[..., Any], *iterables: Iterable[Any]) -> Iterator:
+        """
+        Calls function with the items of iterables in parallel, like Executor.map.
+
+        Every call is submitted before map returns, so the sends run even if the results are
+        never consumed. The results are yielded in order, and the calls not yet run are cancelled
+        if the iteration stops early.
+
+        Args:
+            function[function]: Function or method of the client to call, e.g. whatsapp.send_template
+            *iterables: One iterable per positional argument of function
+
+        Returns:
+            Iterator: The result of each call, the exception of a failed call is raised when its result is reached
+        """
+        futures = collections.deque(
+            self._pool.submit(function, *args) for args in zip(*iterables)
+        )
+
+        def results() -> Iterator:
+            try:
+                while futures:
+                    yield futures.popleft().result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return results()
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """
+        Stops the workers.
+
+        Args:
+            wait[bool]: Wait for the submitted calls to finish (default: True)
+            cancel_futures[bool]: Cancel the calls not started yet (default: False)
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self) -> "SendExecutor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
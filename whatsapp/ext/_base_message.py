@@ -0,0 +1,118 @@
+from typing import Any, Dict, Union
+from ._parser import MEDIA_TYPES, WebhookEvent, parse
+
+
+class _Media:
+    """
+    Media, location and interactive attributes of a message, read from the raw
+    message on access instead of being copied on every instance.
+    """
+
+    __slots__ = ("type",)
+
+    def __init__(self, type: str):
+        self.type = type
+
+    def __get__(self, message, owner=None):
+        if message is None:
+            return self
+        if message.type != self.type or message._item is None:
+            return None
+        return message._item.get(self.type)
+
+
+class BaseMessage:
+    """
+    Fields shared by Message and AsyncMessage.
+
+    Instances use __slots__ and only keep references to values already present in the payload;
+    media, location and interactive objects are looked up when they are first read.
+    Passing keep_data=False drops the reference to the webhook payload once it has been parsed,
+    only the received message itself is kept.
+
+    Args:
+        id[str]: Id of the message, used when there is no data
+        data[dict]: The data received from the webhook
+        instance[WhatsApp]: The client used to send the message
+        content[str]: Body of the message to send
+        to[str]: Phone number of the recipient
+        rec_type[str]: Recipient type, individual or group
+        event[WebhookEvent]: The already parsed event, saves parsing data again
+        keep_data[bool]: Keep the webhook payload in the data attribute
+    """
+
+    __slots__ = (
+        "instance",
+        "data",
+        "rec",
+        "id",
+        "type",
+        "to",
+        "content",
+        "name",
+        "author",
+        "_item",
+    )
+
+    image = _Media("image")
+    sticker = _Media("sticker")
+    video = _Media("video")
+    audio = _Media("audio")
+    document = _Media("document")
+    location = _Media("location")
+    interactive = _Media("interactive")
+
+    def __init__(
+        self,
+        id: int = None,
+        data: Dict[Any, Any] = {},
+        instance: Any = None,
+        content: str = "",
+        to: str = "",
+        rec_type: str = "individual",
+        event: WebhookEvent = None,
+        keep_data: bool = True,
+    ):
+        self.instance = instance
+        self.data = data if keep_data else None
+        self.rec = rec_type
+
+        # the payload is parsed once, every field below is read from the parsed event
+        if event is None and data:
+            event = parse(data)
+        if event is None or event.kind != "message":
+            self.id = id
+            self.type = "text"
+            self.to = to
+            self.content = content
+            self.name = None
+            self.author = None
+            self._item = None
+            return
+        self.id = event.id
+        self.type = event.type
+        self.to = to if to != "" else event.mobile
+        self.content = content if content != "" else event.content
+        self.name = event.name
+        self.author = event.author
+        self._item = event.item if event.type in MEDIA_TYPES else None
+
+    @property
+    def url(self) -> str:
+        return self.instance.url
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self.instance.headers
+
+    @property
+    def media(self) -> Union[Dict[Any, Any], None]:
+        """The media, location or interactive object of the message, whatever its type"""
+        if self._item is None:
+            return None
+        return self._item.get(self.type)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__} id={self.id!r} type={self.type!r} to={self.to!r}>"
+        )
@@ -0,0 +1,315 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+from ..prepared import PreparedBody, PreparedMessage, message_kwargs
+from ._payloads import messages_url, template_message
+
+
+class BulkResult:
+    """
+    Outcome of one message of a bulk send.
+
+    Attributes:
+        recipient[str]: Phone number the message was sent to
+        message_id[str]: Id of the sent message, None if it was not sent
+        error_code[int]: Graph API error code (or HTTP status if there is none), None if the message was sent
+        error[str]: Error message, None if the message was sent
+    """
+
+    __slots__ = ("recipient", "message_id", "error_code", "error")
+
+    def __init__(
+        self,
+        recipient: str,
+        message_id: Union[str, None] = None,
+        error_code: Union[int, None] = None,
+        error: Union[str, None] = None,
+    ):
+        self.recipient = recipient
+        self.message_id = message_id
+        self.error_code = error_code
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.message_id is not None
+
+    def __repr__(self) -> str:
+        if self.ok:
+            return f"<BulkResult {self.recipient} sent {self.message_id}>"
+        return f"<BulkResult {self.recipient} failed {self.error_code}: {self.error}>"
+
+
+def result(recipient: str, status: int, data: Any) -> BulkResult:
+    """Builds the result of a send from the status and decoded body of the answer."""
+    if status == 200:
+        try:
+            return BulkResult(recipient, data["messages"][0]["id"])
+        except (KeyError, IndexError, TypeError):
+            return BulkResult(recipient, None, status, "No message id in the response")
+    error = data.get("error") if isinstance(data, dict) else None
+    if isinstance(error, dict):
+        return BulkResult(
+            recipient, None, error.get("code", status), error.get("message")
+        )
+    return BulkResult(recipient, None, status, f"HTTP {status}")
+
+
+def broadcast_payloads(
+    message: Dict[str, Any], recipients: Iterable[Any]
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for item in recipients:
+        if isinstance(item, (tuple, list)):
+            recipient, fields = item
+            payload = {**message, **fields, "to": recipient}
+        else:
+            recipient = item
+            payload = {**message, "to": recipient}
+        payload.setdefault("messaging_product", "whatsapp")
+        yield recipient, payload
+
+
+def template_payloads(
+    template: str, recipients: Iterable[Any], components: Any, lang: str
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    default = template_message(template, components, lang)
+    for item in recipients:
+        if isinstance(item, (tuple, list)):
+            recipient, own = item
+            payload = template_message(template, own, lang)
+        else:
+            recipient, payload = item, default
+        yield recipient, {**payload, "to": recipient}
+
+
+def prepared_payloads(
+    prepared: PreparedMessage, recipients: Iterable[Any]
+) -> Iterator[Tuple[str, PreparedBody]]:
+    for item in recipients:
+        if isinstance(item, (tuple, list)):
+            recipient, values = item
+            yield recipient, prepared.render(recipient, **values)
+        else:
+            yield item, prepared.render(item)
+
+
+def summary(results: List[BulkResult], what: str) -> None:
+    failed = sum(1 for r in results if not r.ok)
+    logging.info(f"{what}: {len(results) - failed} sent, {failed} failed")
+
+
+def send_payloads(
+    self,
+    payloads: Iterable[Tuple[str, Union[Dict[str, Any], PreparedBody]]],
+    sender: Any,
+    concurrency: int,
+    on_result: Union[Callable[[BulkResult], Any], None],
+) -> List[BulkResult]:
+    url = messages_url(self, sender)
+
+    def send(
+        recipient: str, payload: Union[Dict[str, Any], PreparedBody]
+    ) -> BulkResult:
+        try:
+            r = self._request("POST", url, **message_kwargs(self, payload))
+            try:
+                data = r.json()
+            except ValueError:
+                data = None
+            return result(recipient, r.status_code, data)
+        except Exception as e:
+            return BulkResult(recipient, None, None, str(e))
+
+    results: List[BulkResult] = []
+
+    def done(index: int, future) -> None:
+        results[index] = future.result()
+        if on_result is not None:
+            on_result(results[index])
+
+    # at most 2 * concurrency messages are built and waiting at any time,
+    # so the recipients can be a generator of any size
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="whatsapp-bulk") as pool:
+        pending = {}
+        for index, (recipient, payload) in enumerate(payloads):
+            results.append(None)
+            pending[pool.submit(send, recipient, payload)] = index
+            if len(pending) >= 2 * concurrency:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done(pending.pop(future), future)
+        for future in list(pending):
+            future.result()
+            done(pending.pop(future), future)
+    return results
+
+
+def send_template_bulk(
+    self,
+    template: str,
+    recipients: Iterable[Any],
+    components: Any = None,
+    lang: str = "en_US",
+    sender=None,
+    concurrency: int = 16,
+    on_result: Union[Callable[[BulkResult], Any], None] = None,
+) -> List[BulkResult]:
+    """
+    Sends a template message to many WhatsApp users, with at most `concurrency` requests in flight.
+
+    The requests share the pooled session of the instance, keep pool_maxsize at least as large
+    as concurrency so that every worker reuses its connection. Errors do not stop the send,
+    they are reported in the result of the recipient.
+
+    Args:
+        template[str]: Template name to be sent to the users
+        recipients[iterable]: Phone numbers of the users, or (phone number, components) tuples to use other components for a user
+        components[list]: Components sent to the users without their own components
+        lang[str]: Language of the template message
+        sender[int]: Key of the phone number id to send from
+        concurrency[int]: Maximum number of requests in flight (default: 16)
+        on_result[function]: Called with each BulkResult as soon as the message is sent
+
+    Returns:
+        list[BulkResult]: The result of every recipient, in the order of recipients
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> whatsapp = WhatsApp(token, phone_number_id, pool_maxsize=32)
+        >>> results = whatsapp.send_template_bulk("hello_world", ["5511999999999", "5511888888888"], concurrency=32)
+        >>> failed = [r.recipient for r in results if not r.ok]
+    """
+    results = send_payloads(
+        self,
+        template_payloads(template, recipients, components, lang),
+        sender,
+        concurrency,
+        on_result,
+    )
+    summary(results, f"Template {template}")
+    return results
+
+
+def broadcast(
+    self,
+    message: Dict[str, Any],
+    recipients: Iterable[Any],
+    sender=None,
+    concurrency: int = 16,
+    on_result: Union[Callable[[BulkResult], Any], None] = None,
+) -> List[BulkResult]:
+    """
+    Sends the same message to many WhatsApp users, with at most `concurrency` requests in flight.
+
+    Args:
+        message[dict]: Body of the message without the recipient, as sent by send_custom_json
+        recipients[iterable]: Phone numbers of the users, or (phone number, fields) tuples to override fields of the message for a user
+        sender[int]: Key of the phone number id to send from
+        concurrency[int]: Maximum number of requests in flight (default: 16)
+        on_result[function]: Called with each BulkResult as soon as the message is sent
+
+    Returns:
+        list[BulkResult]: The result of every recipient, in the order of recipients
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> whatsapp = WhatsApp(token, phone_number_id)
+        >>> whatsapp.broadcast({"type": "text", "text": {"body": "Hello"}}, ["5511999999999", "5511888888888"])
+    """
+    results = send_payloads(
+        self, broadcast_payloads(message, recipients), sender, concurrency, on_result
+    )
+    summary(results, "Broadcast")
+    return results
+
+
+def send_prepared_bulk(
+    self,
+    prepared: PreparedMessage,
+    recipients: Iterable[Any],
+    sender=None,
+    concurrency: int = 16,
+    on_result: Union[Callable[[BulkResult], Any], None] = None,
+) -> List[BulkResult]:
+    """
+    Sends a prepared message to many WhatsApp users, with at most `concurrency` requests in flight.
+
+    The message was encoded once when it was prepared, each send only splices the recipient
+    and the values of the slots into it.
+
+    Args:
+        prepared[PreparedMessage]: Message to send
+        recipients[iterable]: Phone numbers of the users, or (phone number, values) tuples where values is a dict of the values of the slots for a user
+        sender[int]: Key of the phone number id to send from
+        concurrency[int]: Maximum number of requests in flight (default: 16)
+        on_result[function]: Called with each BulkResult as soon as the message is sent
+
+    Returns:
+        list[BulkResult]: The result of every recipient, in the order of recipients
+
+    Example:
+        >>> from whatsapp import WhatsApp, PreparedMessage, Slot
+        >>> whatsapp = WhatsApp(token, phone_number_id)
+        >>> prepared = PreparedMessage({"type": "text", "text": {"body": Slot("body")}})
+        >>> whatsapp.send_prepared_bulk(prepared, [("5511999999999", {"body": "Hi Ana"}), ("5511888888888", {"body": "Hi Bia"})])
+    """
+    results = send_payloads(
+        self, prepared_payloads(prepared, recipients), sender, concurrency, on_result
+    )
+    summary(results, f"Prepared {prepared.type} message")
+    return results
+
+
+def replay_outbox(
+    self,
+    concurrency: int = 16,
+    on_result: Union[Callable[[BulkResult], Any], None] = None,
+) -> List[BulkResult]:
+    """
+    Sends again the messages the previous run journaled in the outbox but never settled,
+    because the process died while they were being sent. Call it once when the app starts.
+
+    Args:
+        concurrency[int]: Maximum number of requests in flight (default: 16)
+        on_result[function]: Called with each BulkResult as soon as the message is sent
+
+    Returns:
+        list[BulkResult]: The result of every replayed message
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> whatsapp = WhatsApp(token, phone_number_id, outbox="outbox.db")
+        >>> whatsapp.replay_outbox()
+    """
+    from ._session import deliver
+
+    if self.outbox is None:
+        return []
+    entries = self.outbox.pending()
+    if not entries:
+        return []
+
+    def send(item: Tuple[str, str, Dict[str, Any]]) -> BulkResult:
+        entry, url, payload = item
+        recipient = payload.get("to")
+        kwargs = {"headers": self.headers, "json": payload, "timeout": self.timeout}
+        try:
+            r = deliver(self, entry, "POST", url, kwargs)
+            try:
+                data = r.json()
+            except ValueError:
+                data = None
+            outcome = result(recipient, r.status_code, data)
+        except Exception as e:
+            outcome = BulkResult(recipient, None, None, str(e))
+        if on_result is not None:
+            on_result(outcome)
+        return outcome
+
+    with ThreadPoolExecutor(
+        min(concurrency, len(entries)), thread_name_prefix="whatsapp-replay"
+    ) as pool:
+        results = list(pool.map(send, entries))
+    self.outbox.flush()
+    summary(results, "Outbox replay")
+    return results
@@ -1,7 +1,12 @@
 import logging
-import requests
 from typing import Dict, Any
 from ..errors import Handle
+from ._payloads import (
+    interactive_message,
+    list_interactive,
+    messages_url,
+    reply_button_message,
+)
 
 
 def create_button(self, button: Dict[Any, Any]) -> Dict[Any, Any]:
@@ -13,16 +18,7 @@ def create_button(self, button: Dict[Any, Any]) -> Dict[Any, Any]:
     Args:
             button[dict]: A dictionary containing the button data
     """
-    data = {"type": "list", "action": button.get("action")}
-    if button.get("header"):
-        data["header"] = {"type": "text", "text": button.get("header")}
-    if button.get("body"):
-        data["body"] = {"text": button.get("body")}
-    if button.get("footer"):
-        data["footer"] = {"text": button.get("footer")}
-    if button.get("type"):
-        data["type"] = button.get("type")
-    return data
+    return list_interactive(button)
 
 
 def send_button(
@@ -37,24 +33,10 @@ def send_button(
 
     check https://github.com/Neurotech-HQ/whatsapp#sending-interactive-reply-buttons for an example.
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    data = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "interactive",
-        "interactive": self.create_button(button),
-    }
+    url = messages_url(self, sender)
+    data = interactive_message(self.create_button(button), recipient_id)
     logging.info(f"Sending buttons to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Buttons sent to {recipient_id}")
         return r.json()
@@ -77,27 +59,9 @@ def send_reply_button(
     Note:
         The maximum number of buttons is 3, more than 3 buttons will rise an error.
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if len(button["action"]["buttons"]) > 3:
-        raise ValueError("The maximum number of buttons is 3.")
-
-    data = {
-        "messaging_product": "whatsapp",
-        "recipient_type": "individual",
-        "to": recipient_id,
-        "type": "interactive",
-        "interactive": button,
-    }
-    r = requests.post(url, headers=self.headers, json=data)
+    url = messages_url(self, sender)
+    data = reply_button_message(button, recipient_id)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Reply buttons sent to {recipient_id}")
         return r.json()
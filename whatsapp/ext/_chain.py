@@ -0,0 +1,159 @@
+"""
+Request chain of both clients.
+
+Every request goes through the outbox, the metrics, the retry policy, the rate limiter and the
+batcher before it reaches the transport. The chain is written once, as generators that yield
+each I/O they need as an operation and get its result back: WhatsApp runs the operations with
+blocking calls (ext/_session.run) and AsyncWhatsApp awaits them (async_ext/_session.run), so
+only the I/O primitives differ between the clients.
+
+Operations:
+    (SEND, method, url, kwargs)     send one attempt through the transport, returns the response
+                                    (before its body is read if kwargs has stream=True)
+    (BATCH, url, payload)           queue a message in the batcher, returns the response of the message
+    (ACQUIRE, sender)               wait for the capacity of a sender in the rate limiter
+    (RECORD, url, payload)          journal a message in the outbox, returns the entry
+    (SLEEP, seconds)                wait before the next attempt
+    (STATUS, response)              returns the HTTP status of a response
+    (JSON, response)                returns the JSON body of a response, None if it is not JSON
+    (CONTENT, response)             returns the body of a response as bytes
+"""
+
+import logging
+import time
+from typing import Any, Generator, List, Tuple
+from ..batch import batch_form, batchable, split_answers
+from ..metrics import endpoint_of, error_code_of, type_of
+from ..ratelimit import sender_of
+from ..retry import body_factory
+
+SEND = "send"
+BATCH = "batch"
+ACQUIRE = "acquire"
+RECORD = "record"
+SLEEP = "sleep"
+STATUS = "status"
+JSON = "json"
+CONTENT = "content"
+
+# a step of the chain: yields operations, is sent their results and returns its own
+Chain = Generator[Tuple[Any, ...], Any, Any]
+
+
+def request(self, method: str, url: str, kwargs: dict) -> Chain:
+    """Sends a request, journaling it in the outbox first if it is a message the outbox keeps."""
+    kwargs.setdefault("timeout", self.timeout)
+    outbox = self.outbox
+    if outbox is not None and outbox.journals(method, url, kwargs.get("json")):
+        entry = yield RECORD, url, kwargs["json"]
+        return (yield from deliver(self, entry, method, url, kwargs))
+    return (yield from measure(self, method, url, kwargs))
+
+
+def deliver(self, entry: str, method: str, url: str, kwargs: dict) -> Chain:
+    """Sends a message journaled in the outbox, then marks its entry with the outcome."""
+    kwargs.setdefault("timeout", self.timeout)
+    try:
+        r = yield from measure(self, method, url, kwargs)
+    except Exception as e:
+        self.outbox.mark(entry, error=str(e))
+        raise
+    status = yield STATUS, r
+    data = yield JSON, r
+    self.outbox.settle(entry, status, data)
+    return r
+
+
+def measure(self, method: str, url: str, kwargs: dict) -> Chain:
+    """Sends a request, recording it in the metrics of the instance if it has some."""
+    metrics = self.metrics
+    if metrics is None:
+        return (yield from send_retrying(self, method, url, kwargs))
+    labels = (
+        method,
+        endpoint_of(url, self.base_url),
+        type_of(kwargs.get("json", kwargs.get("data"))),
+    )
+    start = time.perf_counter()
+    try:
+        r = yield from send_retrying(self, method, url, kwargs)
+    except Exception:
+        metrics.observe_request(labels, "error", time.perf_counter() - start)
+        raise
+    seconds = time.perf_counter() - start
+    status = yield STATUS, r
+    code = None
+    if status >= 400:
+        code = error_code_of((yield JSON, r))
+    metrics.observe_request(labels, status, seconds, code)
+    return r
+
+
+def send_retrying(self, method: str, url: str, kwargs: dict) -> Chain:
+    """Sends a request, and sends it again after transient failures if the instance has a retry policy."""
+    policy = self.retry_policy
+    body = body_factory(kwargs.get("data"))
+    if policy is None or body is None:
+        if callable(kwargs.get("data")):
+            kwargs["data"] = kwargs["data"]()
+        return (yield from send(self, method, url, kwargs))
+
+    transport = self.transport
+    timeout = kwargs["timeout"]
+    # a message is not idempotent, it is only sent again if the API can't have processed it
+    message = method == "POST" and sender_of(url) is not None
+    state = policy.start(message)
+    while True:
+        kwargs["data"] = body()
+        kwargs["timeout"] = state.timeout(timeout)
+        try:
+            r = yield from send(self, method, url, kwargs)
+        except transport.connection_errors as e:
+            if message:
+                retry = transport.unsent(e)
+            else:
+                # a timeout may happen after the request reached the API, it is not retried
+                retry = not isinstance(e, transport.timeout_errors)
+            delay = state.error(e) if retry else None
+            if delay is None:
+                raise
+            logging.warning(f"{method} {url} failed ({e}), retrying in {delay:.2f}s")
+        else:
+            status = yield STATUS, r
+            if status < 400:
+                return r
+            data = yield JSON, r
+            delay = state.response(status, data, r.headers)
+            if delay is None:
+                return r
+            logging.warning(
+                f"{method} {url} failed with status {status}, retrying in {delay:.2f}s"
+            )
+        yield SLEEP, delay
+
+
+def send(self, method: str, url: str, kwargs: dict) -> Chain:
+    """
+    Sends one attempt of a request, after waiting for the rate limiter if it is a message.
+    If the instance batches messages, a message is queued and posted in the next batch call.
+    """
+    if self.rate_limiter is not None:
+        sender = sender_of(url)
+        if sender is not None:
+            yield ACQUIRE, sender
+    if self.batcher is not None and batchable(method, url, kwargs):
+        return (yield BATCH, url, kwargs["json"])
+    return (yield SEND, method, url, kwargs)
+
+
+def post_batch(self, items: List[Tuple[str, Any]]) -> Chain:
+    """Posts messages in one Graph API batch call, returns the status and body answered to each."""
+    kwargs = {
+        "headers": {"Authorization": self.headers["Authorization"]},
+        "data": batch_form(self.base_url, items),
+        "timeout": self.timeout,
+    }
+    r = yield SEND, "POST", f"{self.base_url}/", kwargs
+    status = yield STATUS, r
+    content = yield CONTENT, r
+    return split_answers(status, content, len(items))
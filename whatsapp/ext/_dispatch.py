@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+from ..dedup import Deduplicator, event_key
+from ._parser import parse_all
+
+
+async def remember(dedup: Deduplicator, method: Callable[[str], Any], key: str) -> Any:
+    """Calls seen or forget of a deduplicator, in the default executor if it may block the loop."""
+    if not dedup.blocking:
+        return method(key)
+    return await asyncio.get_running_loop().run_in_executor(None, method, key)
+
+
+async def call(self, kind: str, handler: Callable[..., Awaitable[Any]], *args) -> None:
+    """Awaits a handler, recording its duration if the instance has metrics."""
+    metrics = self.metrics
+    if metrics is None:
+        await handler(*args)
+        return
+    start = time.perf_counter()
+    try:
+        await handler(*args)
+    except Exception:
+        metrics.observe_handler(kind, time.perf_counter() - start, failed=True)
+        raise
+    metrics.observe_handler(kind, time.perf_counter() - start)
+
+
+async def dispatch(self, data: Dict[Any, Any]) -> None:
+    """
+    Dispatches every message and status of a webhook delivery to the registered handlers.
+
+    Messages are passed to the handler set with on_messages_batch as a single list if there is one,
+    otherwise each message is passed to the on_message and on_event handlers.
+    Statuses are passed one by one to the on_status handler.
+    If the instance has a deduplicator, messages and statuses already dispatched are skipped,
+    and if a handler raises, the events not handled yet are forgotten so a redelivery dispatches them.
+    A deduplicator that may block (SQLite...) is called in the default executor, off the event loop.
+    If the instance has metrics, the duration of every handler call is recorded.
+
+    Args:
+        data[dict]: The data received from the webhook
+    """
+    keep_data = self.keep_message_data
+    dedup = self.deduplicator
+    messages = []
+    # keys recorded by the deduplicator for the events whose handlers have not returned yet
+    pending: Dict[Any, str] = {}
+    try:
+        for event in parse_all(data):
+            key = None
+            if dedup is not None and event.kind in ("message", "status"):
+                key = event_key(event)
+                if key is not None and await remember(dedup, dedup.seen, key):
+                    logging.debug(
+                        f"Skipping {event.kind} {event.id}, already dispatched"
+                    )
+                    if self.metrics is not None:
+                        self.metrics.observe_duplicate(event.kind)
+                    continue
+            if event.kind == "message":
+                # an AsyncMessage on AsyncWhatsApp, its sends are awaited
+                msg = self.create_message(
+                    data=event.data if keep_data else None,
+                    event=event,
+                    keep_data=keep_data,
+                )
+                messages.append(msg)
+                if key is not None:
+                    pending[id(msg)] = key
+            elif event.kind == "status":
+                if key is not None:
+                    pending[id(event)] = key
+                await call(self, "status", self.status_handler, event.data)
+                pending.pop(id(event), None)
+        if not messages:
+            return
+        if self.batch_handler is not None:
+            await call(self, "batch", self.batch_handler, messages)
+            return
+        for msg in messages:
+            await call(self, "message", self.message_handler, msg)
+            # handled: a failure of other_handler must not dispatch the message again
+            pending.pop(id(msg), None)
+            await self.other_handler(msg)
+    except BaseException:
+        for key in pending.values():
+            await remember(dedup, dedup.forget, key)
+        raise
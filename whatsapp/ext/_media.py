@@ -1,16 +1,18 @@
 import logging
-import requests
 import os
 import mimetypes
-from requests_toolbelt.multipart.encoder import MultipartEncoder
-from typing import Union, Dict, Any
+from typing import Any, BinaryIO, Callable, Dict, Union
 from ..errors import Handle
+from ..cache import media_key
 
 
 def upload_media(self, media: str, sender=None) -> Union[Dict[Any, Any], None]:
     """
     Uploads a media to the cloud api and returns the id of the media
 
+    If the instance has a media cache, a file already uploaded from the same phone number
+    is not uploaded again, the cached media id is returned while it is valid.
+
     Args:
         media[str]: Path of the media to be uploaded
 
@@ -30,28 +32,50 @@ def upload_media(self, media: str, sender=None) -> Union[Dict[Any, Any], None]:
     if sender == None:
         sender = self.phone_number_id
 
-    form_data = {
-        "file": (
-            media,
-            open(os.path.realpath(media), "rb"),
-            mimetypes.guess_type(media)[0],
-        ),
-        "messaging_product": "whatsapp",
-        "type": mimetypes.guess_type(media)[0],
-    }
-    form_data = MultipartEncoder(fields=form_data)
+    key = None
+    if self.media_cache is not None:
+        key = media_key(sender, media)
+        media_id = self.media_cache.get(key)
+        if media_id is not None:
+            logging.info(f"Media {media} already uploaded as {media_id}")
+            return {"id": media_id}
+
+    from uuid import uuid4
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+
+    content_type = mimetypes.guess_type(media)[0]
+    boundary = uuid4().hex
+
     headers = self.headers.copy()
-    headers["Content-Type"] = form_data.content_type
-    logging.info(f"Content-Type: {form_data.content_type}")
+    headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+    logging.info(f"Content-Type: {headers['Content-Type']}")
     logging.info(f"Uploading media {media}")
-    r = requests.post(
-        f"{self.base_url}/{sender}/media",
-        headers=headers,
-        data=form_data,
-    )
+    with open(os.path.realpath(media), "rb") as f:
+        # the encoder streams the file and can only be read once, a new one
+        # is built on the rewound file for every attempt if the upload is retried
+        def form_data():
+            f.seek(0)
+            return MultipartEncoder(
+                fields={
+                    "file": (media, f, content_type),
+                    "messaging_product": "whatsapp",
+                    "type": content_type,
+                },
+                boundary=boundary,
+            )
+
+        r = self._request(
+            "POST",
+            f"{self.base_url}/{sender}/media",
+            headers=headers,
+            data=form_data,
+        )
     if r.status_code == 200:
         logging.info(f"Media {media} uploaded")
-        return r.json()
+        data = r.json()
+        if key is not None and "id" in data:
+            self.media_cache.set(key, data["id"])
+        return data
     logging.info(f"Error uploading media {media}")
     logging.info(f"Status code: {r.status_code}")
     logging.debug(f"Response: {r.json()}")  # Changed to debug level
@@ -66,9 +90,13 @@ def delete_media(self, media_id: str) -> Union[Dict[Any, Any], None]:
         media_id[str]: Id of the media to be deleted
     """
     logging.info(f"Deleting media {media_id}")
-    r = requests.delete(f"{self.base_url}/{media_id}", headers=self.headers)
+    r = self._request("DELETE", f"{self.base_url}/{media_id}", headers=self.headers)
     if r.status_code == 200:
         logging.info(f"Media {media_id} deleted")
+        if self.media_cache is not None:
+            self.media_cache.discard(media_id)
+        if self.media_url_cache is not None:
+            self.media_url_cache.pop(media_id)
         return r.json()
     logging.info(f"Error deleting media {media_id}")
     logging.info(f"Status code: {r.status_code}")
@@ -78,7 +106,8 @@ def delete_media(self, media_id: str) -> Union[Dict[Any, Any], None]:
 
 def query_media_url(self, media_id: str) -> Union[str, None]:
     """
-    Query media url from media id obtained either by manually uploading media or received media
+    Query media url from media id obtained either by manually uploading media or received media.
+    Urls are cached for media_url_ttl seconds and concurrent queries of the same id share one request.
 
     Args:
         media_id[str]: Media id of the media
@@ -92,58 +121,97 @@ def query_media_url(self, media_id: str) -> Union[str, None]:
         >>> whatsapp.query_media_url("media_id")
     """
 
-    logging.info(f"Querying media url for {media_id}")
-    r = requests.get(f"{self.base_url}/{media_id}", headers=self.headers)
-    if r.status_code == 200:
-        logging.info(f"Media url queried for {media_id}")
-        return r.json()["url"]
-    logging.info(f"Media url not queried for {media_id}")
-    logging.info(f"Status code: {r.status_code}")
-    logging.debug(f"Response: {r.json()}")  # Changed to debug level
-    return Handle(r.json())
+    if self.media_url_cache is not None:
+        url = self.media_url_cache.get(media_id)
+        if url is not None:
+            logging.info(f"Media url for {media_id} found in cache")
+            return url
+
+    def call():
+        logging.info(f"Querying media url for {media_id}")
+        r = self._request("GET", f"{self.base_url}/{media_id}", headers=self.headers)
+        if r.status_code == 200:
+            logging.info(f"Media url queried for {media_id}")
+            url = r.json()["url"]
+            if self.media_url_cache is not None:
+                self.media_url_cache.set(media_id, url)
+            return url
+        logging.info(f"Media url not queried for {media_id}")
+        logging.info(f"Status code: {r.status_code}")
+        logging.debug(f"Response: {r.json()}")  # Changed to debug level
+        return Handle(r.json())
+
+    # concurrent queries of the same media id share a single request
+    return self._media_url_flight.do(media_id, call)
+
+
+# size of the chunks written to the destination while downloading
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
 
 def download_media(
-    self, media_url: str, mime_type: str, file_path: str = "temp"
-) -> Union[str, None]:
+    self,
+    media_url: str,
+    mime_type: str,
+    file_path: Union[str, BinaryIO] = "temp",
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    sink: Union[Callable[[bytes], Any], None] = None,
+) -> Union[str, BinaryIO, None]:
     """
     Download media from media url obtained either by manually uploading media or received media
 
+    The media is streamed: it is written to the destination chunk by chunk as it is received,
+    so memory use does not grow with the size of the media.
+
     Args:
         media_url[str]: Media url of the media
         mime_type[str]: Mime type of the media
-        file_path[str]: Path of the file to be downloaded to. Default is "temp"
+        file_path[str | file]: Path of the file to be downloaded to, or a binary file object to write to. Default is "temp"
                         Do not include the file extension. It will be added automatically.
+        chunk_size[int]: Size of the chunks read from the connection (default: 64 KiB)
+        sink[function]: Called with every chunk instead of writing to file_path
 
     Returns:
-        str: Media url
+        str: Path of the downloaded file, the file object if file_path is one, True if sink is set
 
     Example:
         >>> from whatsapp import WhatsApp
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.download_media("media_url", "image/jpeg")
         >>> whatsapp.download_media("media_url", "video/mp4", "path/to/file") #do not include the file extension
+        >>> with open("video.mp4", "wb") as f:
+        ...     whatsapp.download_media("media_url", "video/mp4", f)
     """
-    r = requests.get(media_url, headers=self.headers)
-    if r.status_code != 200:
-        logging.error(f"Error downloading media from {media_url}")
-        logging.error(f"Status code: {r.status_code}")
-        logging.error(f"Response: {r.json()}")
-        return Handle(r.json())
-    content = r.content
-    extension = mime_type.split("/")[1]
-    save_file_here = None
-    # create a temporary file
-    try:
-
-        save_file_here = (
-            f"{file_path}.{extension}" if file_path else f"temp.{extension}"
-        )
-        with open(save_file_here, "wb") as f:
-            f.write(content)
-        logging.info(f"Media downloaded to {save_file_here}")
-        return f.name
-    except Exception as e:
-        logging.info(e)
-        logging.error(f"Error downloading media to {save_file_here}")
-        return None
+    r = self._request("GET", media_url, headers=self.headers, stream=True)
+    with r:
+        if r.status_code != 200:
+            logging.error(f"Error downloading media from {media_url}")
+            logging.error(f"Status code: {r.status_code}")
+            logging.error(f"Response: {r.json()}")
+            return Handle(r.json())
+        if sink is not None:
+            for chunk in r.iter_content(chunk_size):
+                sink(chunk)
+            logging.info(f"Media downloaded from {media_url}")
+            return True
+        if hasattr(file_path, "write"):
+            for chunk in r.iter_content(chunk_size):
+                file_path.write(chunk)
+            logging.info(f"Media downloaded from {media_url}")
+            return file_path
+        extension = mime_type.split("/")[1]
+        save_file_here = None
+        # create a temporary file
+        try:
+            save_file_here = (
+                f"{file_path}.{extension}" if file_path else f"temp.{extension}"
+            )
+            with open(save_file_here, "wb") as f:
+                for chunk in r.iter_content(chunk_size):
+                    f.write(chunk)
+            logging.info(f"Media downloaded to {save_file_here}")
+            return f.name
+        except Exception as e:
+            logging.info(e)
+            logging.error(f"Error downloading media to {save_file_here}")
+            return None
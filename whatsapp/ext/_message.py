@@ -1,18 +1,18 @@
 import logging
-import requests
 from ..errors import Handle
+from ._payloads import (
+    messages_url,
+    reaction_message,
+    read_receipt,
+    template_message,
+    text_message,
+)
 
 
 def react(self, emoji: str) -> dict:
-    data = {
-        "messaging_product": "whatsapp",
-        "recipient_type": "individual",
-        "to": self.sender,
-        "type": "reaction",
-        "reaction": {"message_id": self.id, "emoji": emoji},
-    }
+    data = reaction_message(self.id, emoji, self.sender)
     logging.info(f"Reacting to {self.id}")
-    r = requests.post(self.url, headers=self.headers, json=data)
+    r = self.instance._request("POST", self.url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Reaction sent to {self.to}")
         return r.json()
@@ -48,28 +48,10 @@ def send_template(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_template("hello_world", "5511999999999", lang="en_US"))
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    data = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "template",
-        "template": {
-            "name": template,
-            "language": {"code": lang},
-            "components": components,
-        },
-    }
+    url = messages_url(self, sender)
+    data = dict(template_message(template, components, lang), to=recipient_id)
     logging.info(f"Sending template to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Template sent to {recipient_id}")
         return r.json()
@@ -83,37 +65,28 @@ def send_template(
 
 
 def reply(self, reply_text: str = "", preview_url: bool = True) -> dict:
-    if self.data == {}:
+    if self.author is None:
         return {"error": "No data provided"}
-    author = self.instance.get_author(self.data)
-    payload = {
-        "messaging_product": "whatsapp",
-        "recipient_type": "individual",
-        "to": str(author),
-        "type": "text",
-        "context": {"message_id": self.id},
-        "text": {"preview_url": preview_url, "body": reply_text},
-    }
+    author = self.author
+    payload = text_message(
+        reply_text, str(author), preview_url=preview_url, reply_to=self.id
+    )
     logging.info(f"Replying to {self.id}")
-    r = requests.post(self.url, headers=self.headers, json=payload)
+    r = self.instance._request("POST", self.url, headers=self.headers, json=payload)
     if r.status_code == 200:
-        logging.info(f"Message sent to {self.instance.get_author(self.data)}")
+        logging.info(f"Message sent to {self.author}")
         return r.json()
-    logging.info(f"Message not sent to {self.instance.get_author(self.data)}")
+    logging.info(f"Message not sent to {self.author}")
     logging.info(f"Status code: {r.status_code}")
     logging.error(f"Response: {r.json()}")
     return Handle(r.json())
 
 
 def mark_as_read(self) -> dict:
-    payload = {
-        "messaging_product": "whatsapp",
-        "status": "read",
-        "message_id": self.id,
-    }
+    payload = read_receipt(self.id)
 
-    response = requests.post(
-        f"{self.instance.url}", headers=self.instance.headers, json=payload
+    response = self.instance._request(
+        "POST", f"{self.instance.url}", headers=self.instance.headers, json=payload
     )
     if response.status_code == 200:
         logging.info(response.json())
@@ -124,16 +97,10 @@ def mark_as_read(self) -> dict:
 
 
 def send(self, preview_url: bool = True) -> dict:
-    url = f"https://graph.facebook.com/{self.LATEST}/{self.sender}/messages"
-    data = {
-        "messaging_product": "whatsapp",
-        "recipient_type": self.rec,
-        "to": self.to,
-        "type": "text",
-        "text": {"preview_url": preview_url, "body": self.content},
-    }
+    url = f"{self.instance.base_url}/{self.sender}/messages"
+    data = text_message(self.content, self.to, self.rec, preview_url)
     logging.info(f"Sending message to {self.to}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self.instance._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Message sent to {self.to}")
         return r.json()
@@ -0,0 +1,200 @@
+from typing import Any, Dict, Iterator, Union
+
+MEDIA_TYPES = frozenset(
+    ("image", "sticker", "video", "audio", "document", "location", "interactive")
+)
+
+
+class WebhookEvent:
+    """
+    Structured view of one message, status or change of a webhook delivery.
+
+    Every field is extracted by a single walk of the payload, so reading them costs
+    an attribute lookup instead of a new traversal of data["entry"][0]["changes"][0]["value"].
+
+    Attributes:
+        kind[str]: "message", "status", or the changed field for other changes
+        field[str]: The changed field (usually "messages")
+        id[str]: Id of the message or of the message the status refers to
+        type[str]: Type of the message (text, image, interactive...)
+        timestamp[str]: Timestamp of the message or status
+        author[str]: Phone number the message was sent from
+        mobile[str]: WhatsApp id of the contact who sent the message
+        name[str]: Profile name of the contact who sent the message
+        content[str]: Body of a text message
+        media[dict]: Type-specific object of the message (image, location, interactive...)
+        status[str]: Delivery status (sent, delivered, read, failed)
+        value[dict]: The raw value of the change
+        item[dict]: The raw message or status
+        contact[dict]: The raw contact of the message
+    """
+
+    __slots__ = (
+        "kind",
+        "field",
+        "id",
+        "type",
+        "timestamp",
+        "author",
+        "mobile",
+        "name",
+        "content",
+        "media",
+        "status",
+        "value",
+        "item",
+        "contact",
+        "entry_id",
+        "object",
+    )
+
+    def __init__(self, kind: str, field: str, value: Dict[Any, Any]):
+        self.kind = kind
+        self.field = field
+        self.value = value
+        self.id = None
+        self.type = None
+        self.timestamp = None
+        self.author = None
+        self.mobile = None
+        self.name = None
+        self.content = None
+        self.media = None
+        self.status = None
+        self.item = None
+        self.contact = None
+        self.entry_id = None
+        self.object = None
+
+    @property
+    def data(self) -> Dict[Any, Any]:
+        """
+        The event as a webhook payload holding only this message (with its contact) or status,
+        accepted by Message and by every get_* helper.
+        """
+        value = {
+            k: v
+            for k, v in self.value.items()
+            if k not in ("messages", "statuses", "contacts")
+        }
+        if self.kind == "message":
+            value["contacts"] = [self.contact] if self.contact else []
+            value["messages"] = [self.item]
+        elif self.kind == "status":
+            value["statuses"] = [self.item]
+        else:
+            value = self.value
+        return {
+            "object": self.object,
+            "entry": [
+                {
+                    "id": self.entry_id,
+                    "changes": [{"field": self.field, "value": value}],
+                }
+            ],
+        }
+
+
+def parse_message(
+    field: str, value: Dict[Any, Any], message: Dict[Any, Any], contact: Dict[Any, Any]
+) -> WebhookEvent:
+    event = WebhookEvent("message", field, value)
+    event.item = message
+    event.id = message.get("id")
+    event.type = type = message.get("type")
+    event.timestamp = message.get("timestamp")
+    event.author = message.get("from")
+    if contact:
+        event.contact = contact
+        event.mobile = contact.get("wa_id")
+        event.name = contact.get("profile", {}).get("name")
+    if type == "text":
+        event.content = message.get("text", {}).get("body")
+    elif type in MEDIA_TYPES:
+        event.media = message.get(type)
+    return event
+
+
+def parse_status(
+    field: str, value: Dict[Any, Any], status: Dict[Any, Any]
+) -> WebhookEvent:
+    event = WebhookEvent("status", field, value)
+    event.item = status
+    event.id = status.get("id")
+    event.status = status.get("status")
+    event.timestamp = status.get("timestamp")
+    return event
+
+
+def parse_change(change: Dict[Any, Any]) -> Iterator[WebhookEvent]:
+    field = change.get("field")
+    value = change.get("value") or {}
+    messages = value.get("messages")
+    statuses = value.get("statuses")
+    if messages:
+        contacts = value.get("contacts") or []
+        if len(contacts) < 2:
+            contact = contacts[0] if contacts else None
+            for message in messages:
+                yield parse_message(field, value, message, contact)
+        else:
+            by_id = {contact.get("wa_id"): contact for contact in contacts}
+            for message in messages:
+                yield parse_message(
+                    field, value, message, by_id.get(message.get("from"), contacts[0])
+                )
+    if statuses:
+        for status in statuses:
+            yield parse_status(field, value, status)
+    if not messages and not statuses:
+        yield WebhookEvent(field, field, value)
+
+
+def parse_all(data: Dict[Any, Any]) -> Iterator[WebhookEvent]:
+    """
+    Parses every message, status and change of a webhook delivery in one pass.
+
+    Args:
+        data[dict]: The data received from the webhook
+    """
+    object = data.get("object")
+    for entry in data.get("entry") or []:
+        entry_id = entry.get("id")
+        for change in entry.get("changes") or []:
+            for event in parse_change(change):
+                event.entry_id = entry_id
+                event.object = object
+                yield event
+
+
+def parse(data: Dict[Any, Any]) -> Union[WebhookEvent, None]:
+    """
+    Parses the first event of a webhook delivery: entry[0].changes[0] and its first message,
+    or its first status if there are no messages.
+
+    Args:
+        data[dict]: The data received from the webhook
+
+    Returns:
+        WebhookEvent: The parsed event, None if the data has no change
+    """
+    try:
+        entry = data["entry"][0]
+        change = entry["changes"][0]
+    except (KeyError, IndexError, TypeError):
+        return None
+    field = change.get("field")
+    value = change.get("value") or {}
+    messages = value.get("messages")
+    statuses = value.get("statuses")
+    if messages:
+        contacts = value.get("contacts")
+        contact = contacts[0] if contacts else None
+        event = parse_message(field, value, messages[0], contact)
+    elif statuses:
+        event = parse_status(field, value, statuses[0])
+    else:
+        event = WebhookEvent(field, field, value)
+    event.entry_id = entry.get("id")
+    event.object = data.get("object")
+    return event
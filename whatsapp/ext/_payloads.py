@@ -0,0 +1,177 @@
+"""
+Payloads of the messages, built the same way by both clients.
+
+The send methods of ext and async_ext only differ in how they send the payload and read the
+answer; what they send is built here once.
+"""
+
+import logging
+from typing import Any, Dict, List, Union
+
+
+def messages_url(self, sender: Any = None) -> str:
+    """
+    Url of the messages endpoint of a sender.
+
+    Args:
+        sender[int]: Key of the phone number id to send from (default: the first phone number id)
+    """
+    try:
+        sender = dict(self.l)[sender]
+    except Exception:
+        sender = self.phone_number_id
+    if sender is None:
+        sender = self.phone_number_id
+    return f"{self.base_url}/{sender}/messages"
+
+
+def media_message(
+    kind: str,
+    media: str,
+    recipient_id: str,
+    link: bool = True,
+    caption: Union[str, None] = None,
+    recipient_type: Union[str, None] = None,
+) -> Dict[str, Any]:
+    """
+    Message of an image, sticker, audio, video or document.
+
+    Args:
+        kind[str]: Type of the media
+        media[str]: Link of the media if link is True, else its media id
+        recipient_id[str]: Phone number of the user with country code wihout +
+        link[bool]: Whether media is a link or a media id
+        caption[str]: Caption of the media, left out when None
+        recipient_type[str]: Type of the recipient, left out when None
+    """
+    data: Dict[str, Any] = {"messaging_product": "whatsapp"}
+    if recipient_type is not None:
+        data["recipient_type"] = recipient_type
+    data["to"] = recipient_id
+    data["type"] = kind
+    data[kind] = {"link": media} if link else {"id": media}
+    if caption is not None:
+        data[kind]["caption"] = caption
+    return data
+
+
+def location_message(
+    lat: str, long: str, name: str, address: str, recipient_id: str
+) -> Dict[str, Any]:
+    return {
+        "messaging_product": "whatsapp",
+        "to": recipient_id,
+        "type": "location",
+        "location": {
+            "latitude": lat,
+            "longitude": long,
+            "name": name,
+            "address": address,
+        },
+    }
+
+
+def template_message(template: str, components: Any, lang: str) -> Dict[str, Any]:
+    """Template message without its recipient, shared by every recipient of a bulk send."""
+    return {
+        "messaging_product": "whatsapp",
+        "type": "template",
+        "template": {
+            "name": template,
+            "language": {"code": lang},
+            "components": components,
+        },
+    }
+
+
+def list_interactive(button: Dict[Any, Any]) -> Dict[Any, Any]:
+    """Interactive object of a list message, see WhatsApp.create_button."""
+    data = {"type": "list", "action": button.get("action")}
+    if button.get("header"):
+        data["header"] = {"type": "text", "text": button.get("header")}
+    if button.get("body"):
+        data["body"] = {"text": button.get("body")}
+    if button.get("footer"):
+        data["footer"] = {"text": button.get("footer")}
+    if button.get("type"):
+        data["type"] = button.get("type")
+    return data
+
+
+def interactive_message(
+    interactive: Dict[Any, Any],
+    recipient_id: str,
+    recipient_type: Union[str, None] = None,
+) -> Dict[str, Any]:
+    data: Dict[str, Any] = {"messaging_product": "whatsapp"}
+    if recipient_type is not None:
+        data["recipient_type"] = recipient_type
+    data["to"] = recipient_id
+    data["type"] = "interactive"
+    data["interactive"] = interactive
+    return data
+
+
+def reply_button_message(button: Dict[Any, Any], recipient_id: str) -> Dict[str, Any]:
+    if len(button["action"]["buttons"]) > 3:
+        raise ValueError("The maximum number of buttons is 3.")
+    return interactive_message(button, recipient_id, "individual")
+
+
+def contacts_message(
+    contacts: List[Dict[Any, Any]], recipient_id: str
+) -> Dict[str, Any]:
+    return {
+        "messaging_product": "whatsapp",
+        "to": recipient_id,
+        "type": "contacts",
+        "contacts": contacts,
+    }
+
+
+def custom_message(data: Dict[Any, Any], recipient_id: str) -> Dict[Any, Any]:
+    """The custom json of send_custom_json, sent to recipient_id unless it has its own recipient."""
+    if recipient_id:
+        if "to" in data.keys():
+            data_recipient_id = data["to"]
+            logging.info(
+                f"Recipient Id is defined in data ({data_recipient_id}) and recipient_id parameter ({recipient_id})"
+            )
+        else:
+            data["to"] = recipient_id
+    return data
+
+
+def text_message(
+    body: str,
+    recipient_id: str,
+    recipient_type: str = "individual",
+    preview_url: bool = True,
+    reply_to: Union[str, None] = None,
+) -> Dict[str, Any]:
+    """Text message, in reply to the message reply_to if given."""
+    data: Dict[str, Any] = {
+        "messaging_product": "whatsapp",
+        "recipient_type": recipient_type,
+        "to": recipient_id,
+        "type": "text",
+    }
+    if reply_to is not None:
+        data["context"] = {"message_id": reply_to}
+    data["text"] = {"preview_url": preview_url, "body": body}
+    return data
+
+
+def reaction_message(message_id: str, emoji: str, recipient_id: str) -> Dict[str, Any]:
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": recipient_id,
+        "type": "reaction",
+        "reaction": {"message_id": message_id, "emoji": emoji},
+    }
+
+
+def read_receipt(message_id: str) -> Dict[str, Any]:
+    """Marks a received message as read."""
+    return {"messaging_product": "whatsapp", "status": "read", "message_id": message_id}
@@ -1,5 +1,23 @@
-import requests
+from ..executor import SendExecutor
 
 
 def authorized(self) -> bool:
-    return requests.get(self.url, headers=self.headers).status_code != 401
+    return self._request("GET", self.url, headers=self.headers).status_code != 401
+
+
+def executor(self) -> SendExecutor:
+    """
+    Thread pool sending in parallel with the session, rate limiter and retry policy of the instance.
+    Created on first use with executor_workers threads.
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> whatsapp = WhatsApp(token, phone_number_id)
+        >>> future = whatsapp.executor.send_template("hello_world", "5511999999999")
+        >>> future.result()
+    """
+    if self._executor is None:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = SendExecutor(self, self.executor_workers)
+    return self._executor
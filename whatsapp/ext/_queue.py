@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Union
+
+
+class DispatchQueue:
+    """
+    Bounded queue of webhook deliveries drained by a pool of asyncio workers.
+
+    In ack-first mode the webhook only validates and enqueues the delivery, then answers Meta
+    right away; the workers call the handlers in the background, so a slow handler never delays
+    the HTTP 200 and never causes Meta to deliver the same payload again.
+
+    Args:
+        dispatch[function]: Coroutine function called with each delivery
+        workers[int]: Number of worker tasks draining the queue
+        maxsize[int]: Maximum number of deliveries waiting in the queue, 0 for no limit
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[Dict[Any, Any]], Awaitable[None]],
+        workers: int = 4,
+        maxsize: int = 1000,
+    ):
+        if workers < 1:
+            raise ValueError("At least one worker is required")
+        self.dispatch = dispatch
+        self.workers = workers
+        self.maxsize = maxsize
+        self.closing = False
+        self._queue: Union[asyncio.Queue, None] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop = None
+
+    @property
+    def depth(self) -> int:
+        """Number of deliveries waiting to be dispatched"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def start(self) -> None:
+        """
+        Starts the workers on the running event loop. Called by the app on startup,
+        and by put() if the app was mounted somewhere its startup event does not run.
+        Deliveries still waiting in the queue of a previous event loop are moved to the new one.
+        """
+        loop = asyncio.get_running_loop()
+        if self._tasks and self._loop is loop:
+            return
+        pending = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+        self._loop = loop
+        self._queue = asyncio.Queue(self.maxsize)
+        for data in pending:
+            self._queue.put_nowait(data)
+        if pending:
+            logging.info(
+                f"Moved {len(pending)} queued webhook deliveries to the new loop"
+            )
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"whatsapp-dispatch-{i}")
+            for i in range(self.workers)
+        ]
+        self.closing = False
+        logging.debug(f"Started {self.workers} webhook dispatch workers")
+
+    def put(self, data: Dict[Any, Any]) -> bool:
+        """
+        Enqueues a delivery without waiting.
+
+        Args:
+            data[dict]: The data received from the webhook
+
+        Returns:
+            bool: False if the queue is full or shutting down, the delivery must be refused
+        """
+        if self.closing:
+            return False
+        self.start()
+        try:
+            self._queue.put_nowait(data)
+        except asyncio.QueueFull:
+            logging.warning(f"Webhook queue full ({self.maxsize}), refusing delivery")
+            return False
+        return True
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            data = await queue.get()
+            try:
+                await self.dispatch(data)
+            except Exception as e:
+                logging.error(f"Error dispatching webhook data: {e}")
+            finally:
+                queue.task_done()
+
+    async def stop(self, timeout: Union[float, None] = 30) -> int:
+        """
+        Stops accepting deliveries, waits for the queued ones to be dispatched, then stops the workers.
+
+        Args:
+            timeout[float]: Maximum seconds to wait for the queue to drain, None to wait forever
+
+        Returns:
+            int: Number of deliveries dropped because the timeout expired
+        """
+        self.closing = True
+        if not self._tasks:
+            return 0
+        dropped = 0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            dropped = self._queue.qsize()
+            logging.warning(
+                f"Webhook queue not drained after {timeout}s, dropping {dropped} deliveries"
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        return dropped
@@ -1,6 +1,6 @@
 import logging
-import requests
 from ..errors import Handle
+from ._payloads import location_message, media_message, messages_url
 
 
 def send_location(
@@ -21,29 +21,10 @@ def send_location(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_location("-23.564", "-46.654", "My Location", "Rua dois, 123", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    data = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "location",
-        "location": {
-            "latitude": lat,
-            "longitude": long,
-            "name": name,
-            "address": address,
-        },
-    }
+    url = messages_url(self, sender)
+    data = location_message(lat, long, name, address, recipient_id)
     logging.info(f"Sending location to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Location sent to {recipient_id}")
         return r.json()
@@ -81,34 +62,10 @@ def send_image(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_image("https://i.imgur.com/Fh7XVYY.jpeg", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": recipient_type,
-            "to": recipient_id,
-            "type": "image",
-            "image": {"link": image, "caption": caption},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": recipient_type,
-            "to": recipient_id,
-            "type": "image",
-            "image": {"id": image, "caption": caption},
-        }
+    url = messages_url(self, sender)
+    data = media_message("image", image, recipient_id, link, caption, recipient_type)
     logging.info(f"Sending image to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Image sent to {recipient_id}")
         return r.json()
@@ -144,34 +101,12 @@ def send_sticker(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_sticker("170511049062862", "5511999999999", link=False)
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": recipient_type,
-            "to": recipient_id,
-            "type": "sticker",
-            "sticker": {"link": sticker},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": recipient_type,
-            "to": recipient_id,
-            "type": "sticker",
-            "sticker": {"id": sticker},
-        }
+    url = messages_url(self, sender)
+    data = media_message(
+        "sticker", sticker, recipient_id, link, recipient_type=recipient_type
+    )
     logging.info(f"Sending sticker to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Sticker sent to {recipient_id}")
         return r.json()
@@ -198,32 +133,10 @@ def send_audio(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_audio("https://www.soundhelix.com/examples/mp3/SoundHelix-Song-1.mp3", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "audio",
-            "audio": {"link": audio},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "audio",
-            "audio": {"id": audio},
-        }
+    url = messages_url(self, sender)
+    data = media_message("audio", audio, recipient_id, link)
     logging.info(f"Sending audio to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Audio sent to {recipient_id}")
         return r.json()
@@ -256,32 +169,10 @@ def send_video(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_video("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "video",
-            "video": {"link": video, "caption": caption},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "video",
-            "video": {"id": video, "caption": caption},
-        }
+    url = messages_url(self, sender)
+    data = media_message("video", video, recipient_id, link, caption)
     logging.info(f"Sending video to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Video sent to {recipient_id}")
         return r.json()
@@ -314,33 +205,10 @@ def send_document(
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.send_document("https://www.w3.org/WAI/ER/tests/xhtml/testfiles/resources/pdf/dummy.pdf", "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-    if link:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "document",
-            "document": {"link": document, "caption": caption},
-        }
-    else:
-        data = {
-            "messaging_product": "whatsapp",
-            "to": recipient_id,
-            "type": "document",
-            "document": {"id": document, "caption": caption},
-        }
-
+    url = messages_url(self, sender)
+    data = media_message("document", document, recipient_id, link, caption)
     logging.info(f"Sending document to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Document sent to {recipient_id}")
         return r.json()
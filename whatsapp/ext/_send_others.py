@@ -1,7 +1,8 @@
 from typing import Any, Dict, List
-import requests
 import logging
 from ..errors import Handle
+from ..prepared import PreparedMessage, message_kwargs
+from ._payloads import contacts_message, custom_message, messages_url
 
 
 def send_custom_json(self, data: dict, recipient_id: str = "", sender=None):
@@ -19,28 +20,10 @@ def send_custom_json(self, data: dict, recipient_id: str = "", sender=None):
                 "type": "audio",
                 "audio": {"id": audio}}, "5511999999999")
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-
-    if recipient_id:
-        if "to" in data.keys():
-            data_recipient_id = data["to"]
-            logging.info(
-                f"Recipient Id is defined in data ({data_recipient_id}) and recipient_id parameter ({recipient_id})"
-            )
-        else:
-            data["to"] = recipient_id
-
+    url = messages_url(self, sender)
+    data = custom_message(data, recipient_id)
     logging.info(f"Sending custom json to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Custom json sent to {recipient_id}")
         return r.json()
@@ -50,6 +33,37 @@ def send_custom_json(self, data: dict, recipient_id: str = "", sender=None):
     return Handle(r.json())
 
 
+def send_prepared(
+    self, prepared: PreparedMessage, recipient_id: str, sender=None, **values
+) -> Dict[Any, Any]:
+    """
+    Sends a prepared message to a WhatsApp user, splicing the recipient and the values of the
+    slots into the message encoded when it was prepared.
+
+    Args:
+        prepared[PreparedMessage]: Message to send
+        recipient_id[str]: Phone number of the user with country code wihout +
+        sender[int]: Key of the phone number id to send from
+        **values: Value of every slot of the message
+    Example:
+        >>> from whatsapp import WhatsApp, PreparedMessage, Slot
+        >>> whatsapp = WhatsApp(token, phone_number_id)
+        >>> prepared = PreparedMessage({"type": "text", "text": {"body": Slot("body")}})
+        >>> whatsapp.send_prepared(prepared, "5511999999999", body="Your order shipped")
+    """
+    url = messages_url(self, sender)
+    body = prepared.render(recipient_id, **values)
+    logging.info(f"Sending prepared {prepared.type} message to {recipient_id}")
+    r = self._request("POST", url, **message_kwargs(self, body))
+    if r.status_code == 200:
+        logging.info(f"Prepared {prepared.type} message sent to {recipient_id}")
+        return r.json()
+    logging.info(f"Prepared {prepared.type} message not sent to {recipient_id}")
+    logging.info(f"Status code: {r.status_code}")
+    logging.error(f"Response: {r.json()}")
+    return Handle(r.json())
+
+
 def send_contacts(
     self, contacts: List[Dict[Any, Any]], recipient_id: str, sender=None
 ) -> Dict[Any, Any]:
@@ -80,25 +94,10 @@ def send_contacts(
 
     REFERENCE: https://developers.facebook.com/docs/whatsapp/cloud-api/reference/messages#contacts-object
     """
-    try:
-        sender = dict(self.l)[sender]
-
-    except:
-        sender = self.phone_number_id
-
-    if sender == None:
-        sender = self.phone_number_id
-
-    url = f"https://graph.facebook.com/{self.LATEST}/{sender}/messages"
-
-    data = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "contacts",
-        "contacts": contacts,
-    }
+    url = messages_url(self, sender)
+    data = contacts_message(contacts, recipient_id)
     logging.info(f"Sending contacts to {recipient_id}")
-    r = requests.post(url, headers=self.headers, json=data)
+    r = self._request("POST", url, headers=self.headers, json=data)
     if r.status_code == 200:
         logging.info(f"Contacts sent to {recipient_id}")
         return r.json()
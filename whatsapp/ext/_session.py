@@ -0,0 +1,170 @@
+import time
+from typing import TYPE_CHECKING, Any
+from . import _chain
+
+if TYPE_CHECKING:
+    import requests
+
+
+def create_session(
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    max_retries: int = 0,
+    backoff_factor: float = 0.5,
+) -> "requests.Session":
+    """
+    Creates a keep-alive requests session with a connection pool mounted for http and https.
+
+    Args:
+        pool_connections[int]: Number of host pools to cache (default: 10)
+        pool_maxsize[int]: Maximum number of connections kept alive per host (default: 10)
+        max_retries[int]: Number of retries for failed connections and 502/503/504 responses (default: 0)
+        backoff_factor[float]: Backoff factor between retries in seconds (default: 0.5)
+
+    Returns:
+        requests.Session: The pooled session
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retries = Retry(
+        total=max_retries,
+        read=False,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retries,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def run(self, chain: _chain.Chain):
+    """Runs a request chain of _chain with blocking I/O, returns its result."""
+    op = next(chain)
+    while True:
+        try:
+            result = perform(self, op)
+        except Exception as e:
+            resume, value = chain.throw, e
+        else:
+            resume, value = chain.send, result
+        try:
+            op = resume(value)
+        except StopIteration as stop:
+            return stop.value
+
+
+def perform(self, op: tuple) -> Any:
+    """Runs one operation of a request chain."""
+    kind = op[0]
+    if kind == _chain.SEND:
+        return self.transport.send(*op[1:])
+    if kind == _chain.STATUS:
+        return op[1].status_code
+    if kind == _chain.JSON:
+        try:
+            return op[1].json()
+        except ValueError:
+            return None
+    if kind == _chain.CONTENT:
+        return op[1].content
+    if kind == _chain.BATCH:
+        url, payload = op[1:]
+        status, body = self.batcher.submit(url, payload).result()
+        return answer(url, status, body)
+    if kind == _chain.ACQUIRE:
+        return self.rate_limiter.acquire(op[1])
+    if kind == _chain.RECORD:
+        return self.outbox.record(*op[1:])
+    if kind == _chain.SLEEP:
+        return time.sleep(op[1])
+    raise ValueError(f"Unknown operation {kind}")
+
+
+def answer(url: str, status: int, body: bytes) -> "requests.Response":
+    """Builds the response of a message sent in a batch call."""
+    import requests
+
+    r = requests.Response()
+    r.status_code = status
+    r._content = body
+    r.url = url
+    r.encoding = "utf-8"
+    r.headers["Content-Type"] = "application/json"
+    return r
+
+
+def request(self, method: str, url: str, **kwargs) -> "requests.Response":
+    """
+    Sends an HTTP request through the transport of the instance (the pooled requests session by default).
+
+    Every call to the Graph API goes through this method, so connections are reused
+    instead of paying a new TCP + TLS handshake for each message.
+    If the instance has a rate limiter, messages wait here for the capacity of their sender.
+    If the instance has a retry policy, transient errors and connection failures are retried here;
+    a body that can only be read once must then be passed as a function returning it (see retry.body_factory).
+    If the instance has metrics, the duration, status and error code of the request are recorded here.
+    If the instance has an outbox, messages are journaled before they are sent and marked with the outcome.
+    The chain is shared with AsyncWhatsApp, see ext/_chain.py.
+
+    Args:
+        method[str]: HTTP method (GET, POST, DELETE...)
+        url[str]: Full url of the request
+        **kwargs: headers, json, data, stream and timeout, like requests.Session.request
+    """
+    return run(self, _chain.request(self, method, url, kwargs))
+
+
+def deliver(
+    self, entry: str, method: str, url: str, kwargs: dict
+) -> "requests.Response":
+    """Sends a message journaled in the outbox, then marks its entry with the outcome."""
+    return run(self, _chain.deliver(self, entry, method, url, kwargs))
+
+
+def post_batch(self, items: list) -> list:
+    """
+    Posts messages in one Graph API batch call.
+
+    Args:
+        items[list]: Url and JSON payload of each message
+
+    Returns:
+        list: The HTTP status and body answered to each message
+    """
+    return run(self, _chain.post_batch(self, items))
+
+
+def close(self) -> None:
+    """
+    Posts the messages waiting in the batcher, stops the executor and closes the connections.
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> with WhatsApp(token, phone_number_id, batch=True) as whatsapp:
+        ...     whatsapp.send_template_bulk("hello_world", recipients)
+    """
+    if self.batcher is not None:
+        self.batcher.close()
+    if self._executor is not None:
+        self._executor.shutdown()
+    self.transport.close()
+    if self.session is not None:
+        self.session.close()
+
+
+def enter(self):
+    return self
+
+
+def exit(self, *args) -> None:
+    self.close()
@@ -1,4 +1,5 @@
-from typing import Any, Dict, Union
+from typing import Any, Dict, Iterator, Tuple, Union
+from ._parser import parse, parse_all
 
 
 @staticmethod
@@ -11,11 +12,8 @@ def is_message(data: Dict[Any, Any]) -> bool:
     Returns:
         bool: True if the data is a message, False otherwise
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        return True
-    else:
-        return False
+    event = parse(data)
+    return event is not None and event.kind == "message"
 
 
 @staticmethod
@@ -33,9 +31,9 @@ def get_mobile(data: Dict[Any, Any]) -> Union[str, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> mobile = whatsapp.get_mobile(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "contacts" in data:
-        return data["contacts"][0]["wa_id"]
+    event = parse(data)
+    if event is not None:
+        return event.mobile
 
 
 @staticmethod
@@ -52,9 +50,9 @@ def get_name(data: Dict[Any, Any]) -> Union[str, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> mobile = whatsapp.get_name(data)
     """
-    contact = data["entry"][0]["changes"][0]["value"]
-    if contact:
-        return contact["contacts"][0]["profile"]["name"]
+    event = parse(data)
+    if event is not None:
+        return event.name
 
 
 @staticmethod
@@ -71,9 +69,9 @@ def get_message(data: Dict[Any, Any]) -> Union[str, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> message = message.get_message(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        return data["messages"][0]["text"]["body"]
+    event = parse(data)
+    if event is not None:
+        return event.content
 
 
 @staticmethod
@@ -90,9 +88,9 @@ def get_message_id(data: Dict[Any, Any]) -> Union[str, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> message_id = whatsapp.get_message_id(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        return data["messages"][0]["id"]
+    event = parse(data)
+    if event is not None and event.kind == "message":
+        return event.id
 
 
 @staticmethod
@@ -109,9 +107,9 @@ def get_message_timestamp(data: Dict[Any, Any]) -> Union[str, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.get_message_timestamp(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        return data["messages"][0]["timestamp"]
+    event = parse(data)
+    if event is not None and event.kind == "message":
+        return event.timestamp
 
 
 @staticmethod
@@ -132,10 +130,9 @@ def get_interactive_response(data: Dict[Any, Any]) -> Union[Dict, None]:
         >>> message_id = response[interactive_type]["id"]
         >>> message_text = response[interactive_type]["title"]
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        if "interactive" in data["messages"][0]:
-            return data["messages"][0]["interactive"]
+    event = parse(data)
+    if event is not None and event.type == "interactive":
+        return event.media
 
 
 @staticmethod
@@ -154,10 +151,9 @@ def get_location(data: Dict[Any, Any]) -> Union[Dict, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.get_location(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        if "location" in data["messages"][0]:
-            return data["messages"][0]["location"]
+    event = parse(data)
+    if event is not None and event.type == "location":
+        return event.media
 
 
 @staticmethod
@@ -175,10 +171,9 @@ def get_image(data: Dict[Any, Any]) -> Union[Dict, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> image_id = whatsapp.get_image(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        if "image" in data["messages"][0]:
-            return data["messages"][0]["image"]
+    event = parse(data)
+    if event is not None and event.type == "image":
+        return event.media
 
 
 @staticmethod
@@ -196,10 +191,9 @@ def get_sticker(data: Dict[Any, Any]) -> Union[Dict, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> sticker_id = whatsapp.get_sticker(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        if "sticker" in data["messages"][0]:
-            return data["messages"][0]["sticker"]
+    event = parse(data)
+    if event is not None and event.type == "sticker":
+        return event.media
 
 
 @staticmethod
@@ -217,10 +211,9 @@ def get_document(data: Dict[Any, Any]) -> Union[Dict, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> document_id = whatsapp.get_document(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        if "document" in data["messages"][0]:
-            return data["messages"][0]["document"]
+    event = parse(data)
+    if event is not None and event.type == "document":
+        return event.media
 
 
 @staticmethod
@@ -239,10 +232,9 @@ def get_audio(data: Dict[Any, Any]) -> Union[Dict, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.get_audio(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        if "audio" in data["messages"][0]:
-            return data["messages"][0]["audio"]
+    event = parse(data)
+    if event is not None and event.type == "audio":
+        return event.media
 
 
 @staticmethod
@@ -261,10 +253,9 @@ def get_video(data: Dict[Any, Any]) -> Union[Dict, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.get_video(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        if "video" in data["messages"][0]:
-            return data["messages"][0]["video"]
+    event = parse(data)
+    if event is not None and event.type == "video":
+        return event.media
 
 
 @staticmethod
@@ -284,9 +275,9 @@ def get_message_type(data: Dict[Any, Any]) -> Union[str, None]:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.get_message_type(data)
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "messages" in data:
-        return data["messages"][0]["type"]
+    event = parse(data)
+    if event is not None:
+        return event.type
 
 
 @staticmethod
@@ -299,9 +290,9 @@ def get_delivery(data: Dict[Any, Any]) -> Union[Dict, None]:
     Returns:
         dict: The delivery status of the message and message id of the message
     """
-    data = data["entry"][0]["changes"][0]["value"]
-    if "statuses" in data:
-        return data["statuses"][0]["status"]
+    event = parse(data)
+    if event is not None:
+        return event.status
 
 
 @staticmethod
@@ -320,12 +311,40 @@ def changed_field(data: Dict[Any, Any]) -> str:
         >>> whatsapp = WhatsApp(token, phone_number_id)
         >>> whatsapp.changed_field(data)
     """
-    return data["entry"][0]["changes"][0]["field"]
+    event = parse(data)
+    if event is not None:
+        return event.field
 
 
 @staticmethod
 def get_author(data: Dict[Any, Any]) -> Union[str, None]:
-    try:
-        return data["entry"][0]["changes"][0]["value"]["messages"][0]["from"]
-    except Exception:
-        return None
+    event = parse(data)
+    if event is not None:
+        return event.author
+
+
+@staticmethod
+def iter_events(data: Dict[Any, Any]) -> Iterator[Tuple[str, Dict[Any, Any]]]:
+    """
+    Walks every entry, change, message and status of a webhook delivery in one pass.
+
+    Meta batches several messages and statuses into a single delivery under load,
+    while the get_* helpers only look at the first one.
+    Each event is yielded as a webhook payload holding only that message (with its contact) or status,
+    so it can be passed to Message or to any get_* helper.
+
+    Args:
+        data[dict]: The data received from the webhook
+
+    Yields:
+        tuple: ("message", payload) or ("status", payload), or (field, payload) for changes without messages and statuses
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> whatsapp = WhatsApp(token, phone_number_id)
+        >>> for kind, event in whatsapp.iter_events(data):
+        >>>     if kind == "message":
+        >>>         print(whatsapp.get_message(event))
+    """
+    for event in parse_all(data):
+        yield event.kind, event.data
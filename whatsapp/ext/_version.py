@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Union
+from ..constants import VERSION, DEFAULT_API_VERSION
+
+CHANGELOG_URL = "https://developers.facebook.com/docs/graph-api/changelog/"
+PYPI_URL = "https://pypi.org/pypi/whatsapp-python/json"
+# seconds a failed fetch is remembered, so processes started without network don't wait for it again
+FAILURE_TTL = 300
+
+
+def cache_file() -> str:
+    """
+    Path of the on-disk cache shared by every process of the host.
+
+    Defaults to $XDG_CACHE_HOME/whatsapp-python/versions.json (~/.cache if unset),
+    the directory can be changed with the WHATSAPP_CACHE_DIR environment variable.
+    """
+    directory = os.environ.get("WHATSAPP_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "whatsapp-python",
+    )
+    return os.path.join(directory, "versions.json")
+
+
+def read_cache() -> Dict[str, Any]:
+    try:
+        with open(cache_file()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache(key: str, value: str) -> None:
+    """Stores a value in the cache, replacing the file atomically so concurrent workers never read a partial file."""
+    path = cache_file()
+    cache = read_cache()
+    cache[key] = {"value": value, "time": time.time()}
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, path)
+        tmp = None
+    except OSError as e:
+        logging.debug(f"Could not write version cache {path}: {e}")
+    finally:
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+def cached(key: str, ttl: float, offline: bool) -> Union[str, None]:
+    """
+    Returns the cached value of key if it's younger than ttl seconds.
+    In offline mode the cached value is returned regardless of its age.
+    """
+    entry = read_cache().get(key)
+    if entry is None:
+        return None
+    if offline or time.time() - entry["time"] < ttl:
+        return entry["value"]
+    return None
+
+
+def parse_changelog(html: str) -> str:
+    """Extracts the latest Graph API version from the first table of the changelog page."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, features="html.parser")
+    table = soup.find_all("table")[0]
+    result = []
+    for row in table.find_all("tr"):
+        result.append(
+            ["".join(col.find_all(string=True)) for col in row.find_all("td")]
+        )
+    return result[0][1]
+
+
+def latest_api_version(offline: bool = False, ttl: float = 86400) -> str:
+    """
+    Resolves the latest version of the Graph API.
+
+    The changelog page is fetched and parsed at most once per ttl seconds per host,
+    the result is stored in the on-disk cache. In offline mode the cache (even if expired)
+    or DEFAULT_API_VERSION is used and no request is made. A failed fetch is not tried again
+    for FAILURE_TTL seconds, the cache (even if expired) or DEFAULT_API_VERSION is used meanwhile.
+
+    Args:
+        offline[bool]: Never use the network (default: False)
+        ttl[float]: Seconds a resolved version stays valid (default: 86400, one day)
+    """
+    version = cached("graph_api", ttl, offline)
+    if version is not None:
+        return version
+    if offline:
+        logging.info(f"No cached Graph API version, using {DEFAULT_API_VERSION}")
+        return DEFAULT_API_VERSION
+    failure = cached("graph_api_failure", FAILURE_TTL, False)
+    if failure is not None:
+        version = cached("graph_api", ttl, True) or DEFAULT_API_VERSION
+        logging.info(
+            f"Getting the latest Graph API version failed recently ({failure}), using {version}"
+        )
+        return version
+    import requests
+
+    try:
+        version = parse_changelog(requests.get(CHANGELOG_URL, timeout=10).text)
+    except Exception as e:
+        write_cache("graph_api_failure", str(e))
+        version = cached("graph_api", ttl, True) or DEFAULT_API_VERSION
+        logging.warning(
+            f"Could not get the latest Graph API version ({e}), using {version}"
+        )
+        return version
+    write_cache("graph_api", version)
+    return version
+
+
+def check_for_updates(offline: bool = False, ttl: float = 86400) -> None:
+    """
+    Logs a critical message if a newer version of whatsapp-python is published on PyPI.
+
+    The PyPI response and its failures are cached like the Graph API version, and nothing is
+    checked in offline mode.
+    """
+    if offline:
+        return
+    latest = cached("pypi", ttl, False)
+    if latest is None:
+        if cached("pypi_failure", FAILURE_TTL, False) is not None:
+            return
+        import requests
+
+        try:
+            latest = str(requests.get(PYPI_URL, timeout=10).json()["info"]["version"])
+        except Exception as e:
+            write_cache("pypi_failure", str(e))
+            logging.debug(f"Could not check for updates: {e}")
+            return
+        write_cache("pypi", latest)
+    if VERSION != latest:
+        try:
+            version_int = int(VERSION.replace(".", ""))
+        except:
+            version_int = 0
+        try:
+            latest_int = int(latest.replace(".", ""))
+        except:
+            latest_int = 0
+        # this is to avoid the case where the version is 1.0.10 and the latest is 1.0.2 (possible if user is using the github version)
+        if version_int < latest_int:
+            if version_int == 0:
+                logging.critical(
+                    f"There was an error while checking for updates, please check for updates manually. This may be due to the version being a post-release version (e.g. 1.0.0.post1) or a pre-release version (e.g. 1.0.0a1). READ THE CHANGELOG BEFORE UPDATING. NEW VERSIONS MAY BREAK YOUR CODE IF NOT PROPERLY UPDATED."
+                )
+            else:
+                logging.critical(
+                    f"Whatsapp-python is out of date. Please update to the latest version {latest}. READ THE CHANGELOG BEFORE UPDATING. NEW VERSIONS MAY BREAK YOUR CODE IF NOT PROPERLY UPDATED."
+                )
@@ -0,0 +1,101 @@
+import json
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+
+
+def build_app(self) -> FastAPI:
+    """
+    Builds the FastAPI application serving the webhook of the instance.
+
+    This module is only imported the first time `app` is accessed (or `run()` is called),
+    so FastAPI is never loaded by processes that only send messages.
+
+    In ack-first mode (`ack_first=True`) deliveries are validated, put in the dispatch queue and
+    acknowledged immediately; the queue is drained by background workers, a full queue answers
+    503 so that Meta retries later, and queued deliveries are dispatched before the app shuts down.
+
+    If the instance has metrics, they are served in the Prometheus text format on GET /metrics.
+    """
+    queue = self.dispatch_queue
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if queue is not None:
+            queue.start()
+        yield
+        if queue is not None:
+            await queue.stop(self.drain_timeout)
+
+    app = FastAPI(lifespan=lifespan)
+
+    # Verification handler has 1 argument: challenge (str | bool): str if verification is successful, False if not
+
+    @app.get("/")
+    async def verify_endpoint(r: Request):
+        if r.query_params.get("hub.verify_token") == self.verify_token:
+            logging.debug("Webhook verified successfully")
+            challenge = r.query_params.get("hub.challenge")
+            await self.verification_handler(challenge)
+            await self.other_handler(challenge)
+            return int(challenge)
+        logging.error("Webhook Verification failed - token mismatch")
+        await self.verification_handler(False)
+        await self.other_handler(False)
+        return {"success": False}
+
+    if self.metrics is not None:
+        from fastapi.responses import PlainTextResponse
+
+        @app.get("/metrics")
+        async def metrics_endpoint():
+            return PlainTextResponse(
+                self.metrics.render(), media_type="text/plain; version=0.0.4"
+            )
+
+    @app.post("/")
+    async def hook(r: Request):
+        if queue is not None:
+            return await enqueue(r)
+        try:
+            # Handle Webhook Subscriptions
+            data = await r.json()
+            if data is None:
+                return {"success": False}
+            # log the data received only if the log level is debug
+            if logging.root.isEnabledFor(logging.DEBUG):
+                logging.debug(f"Received webhook data: {json.dumps(data, indent=4)}")
+
+            await self.dispatch(data)
+            return {"success": True}
+        except Exception as e:
+            logging.error(f"Error parsing message: {e}")
+            raise HTTPException(
+                status_code=500, detail={"success": False, "error": str(e)}
+            )
+
+    async def enqueue(r: Request):
+        try:
+            data = await r.json()
+        except ValueError as e:
+            logging.error(f"Error parsing webhook data: {e}")
+            raise HTTPException(
+                status_code=400, detail={"success": False, "error": str(e)}
+            )
+        if not isinstance(data, dict) or not isinstance(data.get("entry"), list):
+            logging.error("Invalid webhook data: no entry list")
+            raise HTTPException(
+                status_code=400,
+                detail={"success": False, "error": "Invalid webhook data"},
+            )
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug(f"Received webhook data: {json.dumps(data, indent=4)}")
+        if not queue.put(data):
+            raise HTTPException(
+                status_code=503,
+                detail={"success": False, "error": "Webhook queue full"},
+                headers={"Retry-After": "1"},
+            )
+        return {"success": True}
+
+    return app
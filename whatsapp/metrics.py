@@ -0,0 +1,361 @@
+"""
+Client-side metrics of the Graph API calls and of the webhook.
+
+A Metrics instance records the latency of every request by method, endpoint and message type,
+the number of answers by status and by Graph error code, the retries made by the retry policy
+and the time they waited, the depth of the webhook dispatch queue and the duration of the
+webhook handlers.
+They can be read with snapshot() or exposed in the Prometheus text format with render(),
+which is served by the /metrics route of the webhook app.
+"""
+
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+from urllib.parse import urlsplit
+
+from .prepared import PreparedBody
+
+# upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LABELS = ("method", "endpoint", "type")
+
+
+class Histogram:
+    """
+    Distribution of observed values in cumulative buckets, like a Prometheus histogram.
+
+    Args:
+        buckets[tuple]: Sorted upper bounds of the buckets, +Inf is implied
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation inside its bucket, like histogram_quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def endpoint_of(url: str, base_url: str) -> str:
+    """
+    Name of the Graph API endpoint of a url: "messages", "media" (uploads),
+    "node" (/{media_id} queries and deletions) or "download" (media urls).
+    """
+    if not url.startswith(base_url):
+        return "download"
+    last = urlsplit(url).path.rstrip("/").rpartition("/")[2]
+    if last in ("messages", "media"):
+        return last
+    return "node"
+
+
+def type_of(payload: Any) -> str:
+    """Type of the message sent with a JSON payload ("text", "template"...), "read" for read receipts."""
+    if isinstance(payload, PreparedBody):
+        return payload.type
+    if not isinstance(payload, dict):
+        return ""
+    if payload.get("status") == "read":
+        return "read"
+    return str(payload.get("type", ""))
+
+
+def error_code_of(data: Any) -> Union[int, None]:
+    """Graph API error code of a response body, None if it is not an error."""
+    try:
+        return int(data["error"]["code"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class Metrics:
+    """
+    Registry of the metrics of one or more clients. Thread-safe.
+
+    Args:
+        buckets[tuple]: Upper bounds of the latency histograms, in seconds (default: LATENCY_BUCKETS)
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> whatsapp = WhatsApp(token, phone_number_id, metrics=True)
+        >>> whatsapp.send_template("hello_world", "5511999999999")
+        >>> whatsapp.metrics.snapshot()["requests"]
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, ...], Histogram] = {}
+        self._statuses: Dict[Tuple[str, ...], int] = {}
+        self._errors: Dict[int, int] = {}
+        self._handlers: Dict[str, Histogram] = {}
+        self._handler_errors: Dict[str, int] = {}
+        self._duplicates: Dict[str, int] = {}
+        self._retry_stats: List[Any] = []
+        self._queues: List[Callable[[], int]] = []
+
+    def track_retries(self, stats: Any) -> None:
+        """Includes the counters of a retry.RetryStats in the metrics."""
+        with self._lock:
+            if all(s is not stats for s in self._retry_stats):
+                self._retry_stats.append(stats)
+
+    def track_queue(self, depth: Callable[[], int]) -> None:
+        """Includes a webhook queue, given as a function returning its depth, in the queue depth gauge."""
+        with self._lock:
+            self._queues.append(depth)
+
+    def observe_request(
+        self,
+        labels: Tuple[str, str, str],
+        status: Union[int, str],
+        seconds: float,
+        error_code: Union[int, None] = None,
+    ) -> None:
+        """
+        Records one request to the Graph API.
+
+        Args:
+            labels[tuple]: Method, endpoint and message type of the request
+            status[int | str]: HTTP status of the answer, "error" if no answer was received
+            seconds[float]: Duration of the request, retries included
+            error_code[int]: Graph API error code of the answer, if any
+        """
+        with self._lock:
+            histogram = self._requests.get(labels)
+            if histogram is None:
+                histogram = self._requests[labels] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            key = labels + (str(status),)
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+            if error_code is not None:
+                self._errors[error_code] = self._errors.get(error_code, 0) + 1
+
+    def observe_handler(
+        self, handler: str, seconds: float, failed: bool = False
+    ) -> None:
+        """
+        Records one call of a webhook handler.
+
+        Args:
+            handler[str]: Kind of handler ("message", "status" or "batch")
+            seconds[float]: Duration of the call
+            failed[bool]: Whether the handler raised an exception
+        """
+        with self._lock:
+            histogram = self._handlers.get(handler)
+            if histogram is None:
+                histogram = self._handlers[handler] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if failed:
+                self._handler_errors[handler] = self._handler_errors.get(handler, 0) + 1
+
+    def observe_duplicate(self, kind: str) -> None:
+        """Records a webhook event skipped because it was already dispatched."""
+        with self._lock:
+            self._duplicates[kind] = self._duplicates.get(kind, 0) + 1
+
+    def _retries(self) -> Dict[str, int]:
+        retries: Dict[str, int] = {}
+        for stats in self._retry_stats:
+            for reason, count in stats.snapshot()["reasons"].items():
+                retries[reason] = retries.get(reason, 0) + count
+        return retries
+
+    def _backoff_seconds(self) -> float:
+        return sum(stats.snapshot()["backoff_seconds"] for stats in self._retry_stats)
+
+    def queue_depth(self) -> int:
+        """Number of webhook deliveries waiting in the tracked dispatch queues"""
+        return sum(depth() for depth in self._queues)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns a copy of the metrics.
+
+        Returns:
+            dict: requests (latency summary and count by status, per method, endpoint and type),
+            errors (count by Graph error code), retries (count by reason), retry_backoff_seconds
+            (total time waited between attempts), webhook_queue_depth,
+            handlers (duration summary and errors, per handler) and duplicates (skipped events by kind)
+        """
+        with self._lock:
+            requests = []
+            for labels, histogram in self._requests.items():
+                entry = dict(zip(REQUEST_LABELS, labels))
+                entry.update(histogram.summary())
+                entry["statuses"] = {
+                    key[-1]: count
+                    for key, count in self._statuses.items()
+                    if key[:-1] == labels
+                }
+                requests.append(entry)
+            handlers = {
+                name: dict(
+                    histogram.summary(), errors=self._handler_errors.get(name, 0)
+                )
+                for name, histogram in self._handlers.items()
+            }
+            return {
+                "requests": requests,
+                "errors": dict(self._errors),
+                "retries": self._retries(),
+                "retry_backoff_seconds": self._backoff_seconds(),
+                "webhook_queue_depth": self.queue_depth(),
+                "handlers": handlers,
+                "duplicates": dict(self._duplicates),
+            }
+
+    def reset(self) -> None:
+        """Forgets the recorded requests and handler calls."""
+        with self._lock:
+            self._requests.clear()
+            self._statuses.clear()
+            self._errors.clear()
+            self._handlers.clear()
+            self._handler_errors.clear()
+            self._duplicates.clear()
+
+    def _histogram(
+        self,
+        lines: List[str],
+        name: str,
+        names: Tuple[str, ...],
+        values: Tuple[Any, ...],
+        histogram: Histogram,
+    ) -> None:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            labels = _labels(names + ("le",), values + (le,))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _labels(names, values)
+        lines.append(f"{name}_sum{labels} {histogram.sum}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            lines += [
+                "# HELP whatsapp_request_duration_seconds Duration of the Graph API requests, retries included",
+                "# TYPE whatsapp_request_duration_seconds histogram",
+            ]
+            for labels, histogram in self._requests.items():
+                self._histogram(
+                    lines,
+                    "whatsapp_request_duration_seconds",
+                    REQUEST_LABELS,
+                    labels,
+                    histogram,
+                )
+            lines += [
+                "# HELP whatsapp_requests_total Graph API requests by HTTP status",
+                "# TYPE whatsapp_requests_total counter",
+            ]
+            for key, count in self._statuses.items():
+                labels = _labels(REQUEST_LABELS + ("status",), key)
+                lines.append(f"whatsapp_requests_total{labels} {count}")
+            lines += [
+                "# HELP whatsapp_api_errors_total Graph API error answers by error code",
+                "# TYPE whatsapp_api_errors_total counter",
+            ]
+            for code, count in self._errors.items():
+                lines.append(f'whatsapp_api_errors_total{{code="{code}"}} {count}')
+            lines += [
+                "# HELP whatsapp_retries_total Requests sent again by the retry policy, by reason",
+                "# TYPE whatsapp_retries_total counter",
+            ]
+            for reason, count in self._retries().items():
+                lines.append(
+                    f'whatsapp_retries_total{{reason="{_escape(reason)}"}} {count}'
+                )
+            lines += [
+                "# HELP whatsapp_retry_backoff_seconds_total Time waited between the attempts of the retry policy",
+                "# TYPE whatsapp_retry_backoff_seconds_total counter",
+                f"whatsapp_retry_backoff_seconds_total {self._backoff_seconds()}",
+            ]
+            lines += [
+                "# HELP whatsapp_webhook_queue_depth Webhook deliveries waiting to be dispatched",
+                "# TYPE whatsapp_webhook_queue_depth gauge",
+                f"whatsapp_webhook_queue_depth {self.queue_depth()}",
+                "# HELP whatsapp_handler_duration_seconds Duration of the webhook handlers",
+                "# TYPE whatsapp_handler_duration_seconds histogram",
+            ]
+            for name, histogram in self._handlers.items():
+                self._histogram(
+                    lines,
+                    "whatsapp_handler_duration_seconds",
+                    ("handler",),
+                    (name,),
+                    histogram,
+                )
+            lines += [
+                "# HELP whatsapp_handler_errors_total Webhook handler calls that raised an exception",
+                "# TYPE whatsapp_handler_errors_total counter",
+            ]
+            for name, count in self._handler_errors.items():
+                lines.append(
+                    f'whatsapp_handler_errors_total{{handler="{_escape(name)}"}} {count}'
+                )
+            lines += [
+                "# HELP whatsapp_webhook_duplicates_total Webhook events skipped because they were already dispatched",
+                "# TYPE whatsapp_webhook_duplicates_total counter",
+            ]
+            for kind, count in self._duplicates.items():
+                lines.append(
+                    f'whatsapp_webhook_duplicates_total{{kind="{_escape(kind)}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+def create_metrics(metrics: Union[Metrics, bool, None]) -> Union[Metrics, None]:
+    """Builds the metrics of a client from its metrics argument: True for new metrics, or a Metrics."""
+    if metrics is None or metrics is False:
+        return None
+    if metrics is True:
+        return Metrics()
+    return metrics
@@ -0,0 +1,288 @@
+"""
+Durable journal of the messages sent by a client.
+
+With an outbox, every message is recorded in a SQLite file (WAL mode) before it is sent, and the
+entry is marked with the outcome once the Graph API answers. If the process dies in between, the
+entry stays pending and is sent again by replay_outbox() when the client starts again, so a crash
+or a redeploy never loses a message (it may be delivered twice if the process died after the API
+accepted it but before the outcome was written).
+
+The writes are committed by a background thread in batches: every intent recorded while the
+previous transaction was committing goes in the next one, so concurrent senders share a commit
+instead of paying one each. An intent is only sent once its transaction is committed.
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Tuple, Union
+
+from .ext._bulk import result
+from .ratelimit import sender_of
+
+# settled entries are kept for one day, then purged
+OUTBOX_RETENTION = 86400
+
+
+class Outbox:
+    """
+    SQLite journal of outgoing messages.
+
+    Use one file per process: the entries found pending when the file is opened are the ones
+    the previous process left unsettled, and are the only ones replay_outbox() sends again.
+
+    Args:
+        path[str]: Path of the database file, created if needed
+        batch_size[int]: Maximum number of writes committed in one transaction (default: 256)
+        synchronous[str]: SQLite synchronous mode: "NORMAL" survives crashes of the process, "FULL" survives power losses too, at the cost of an fsync per commit (default: NORMAL)
+        retention[float]: Seconds settled entries are kept before they are purged (default: 1 day)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 256,
+        synchronous: str = "NORMAL",
+        retention: float = OUTBOX_RETENTION,
+    ):
+        import sqlite3
+
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Invalid synchronous mode {synchronous}")
+        self.path = path
+        self.batch_size = batch_size
+        self.retention = retention
+        self.commits = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(f"PRAGMA synchronous={synchronous.upper()}")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id TEXT PRIMARY KEY, url TEXT NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, created REAL NOT NULL, updated REAL NOT NULL, "
+                "message_id TEXT, error_code INTEGER, error TEXT)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_by_status ON outbox (status, updated)"
+            )
+            self._db.commit()
+            self._recovered = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT id FROM outbox WHERE status = 'pending' ORDER BY created"
+                )
+            ]
+        if self._recovered:
+            logging.warning(
+                f"Outbox {path}: {len(self._recovered)} messages left pending by the previous run"
+            )
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._run, name="whatsapp-outbox", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def journals(method: str, url: str, payload: Any) -> bool:
+        """Whether a request is a message to journal (read receipts are not)."""
+        return (
+            method == "POST"
+            and isinstance(payload, dict)
+            and payload.get("status") != "read"
+            and sender_of(url) is not None
+        )
+
+    def _insert(self, url: str, payload: Dict[str, Any]) -> Tuple[str, tuple]:
+        if self._closed:
+            raise RuntimeError("The outbox is closed")
+        entry = uuid.uuid4().hex
+        now = time.time()
+        return entry, (entry, url, json.dumps(payload), now, now)
+
+    def record(self, url: str, payload: Dict[str, Any]) -> str:
+        """
+        Journals a message and waits until it is committed.
+
+        Args:
+            url[str]: Url the message is posted to
+            payload[dict]: Body of the message
+
+        Returns:
+            str: Id of the outbox entry
+        """
+        entry, row = self._insert(url, payload)
+        committed = threading.Event()
+        failure: List[BaseException] = []
+
+        def done(error: Union[BaseException, None]) -> None:
+            if error is not None:
+                failure.append(error)
+            committed.set()
+
+        self._queue.put(("insert", row, done))
+        committed.wait()
+        if failure:
+            raise failure[0]
+        return entry
+
+    async def record_async(self, url: str, payload: Dict[str, Any]) -> str:
+        """
+        Journals a message and waits, without blocking the event loop, until it is committed.
+
+        Args:
+            url[str]: Url the message is posted to
+            payload[dict]: Body of the message
+
+        Returns:
+            str: Id of the outbox entry
+        """
+        entry, row = self._insert(url, payload)
+        loop = asyncio.get_running_loop()
+        committed = loop.create_future()
+
+        def resolve(error: Union[BaseException, None]) -> None:
+            if committed.done():
+                return
+            if error is not None:
+                committed.set_exception(error)
+            else:
+                committed.set_result(None)
+
+        self._queue.put(
+            ("insert", row, lambda error: loop.call_soon_threadsafe(resolve, error))
+        )
+        await committed
+        return entry
+
+    def settle(self, entry: str, status: int, data: Any) -> None:
+        """Marks an entry as sent or failed from the answer of the API, without waiting for the commit."""
+        outcome = result("", status, data)
+        self.mark(entry, outcome.message_id, outcome.error_code, outcome.error)
+
+    def mark(
+        self,
+        entry: str,
+        message_id: Union[str, None] = None,
+        error_code: Union[int, None] = None,
+        error: Union[str, None] = None,
+    ) -> None:
+        """
+        Marks an entry as sent (with a message id) or failed, without waiting for the commit.
+
+        Args:
+            entry[str]: Id of the outbox entry
+            message_id[str]: Id of the sent message
+            error_code[int]: Graph API error code (or HTTP status) of a failure
+            error[str]: Error message of a failure
+        """
+        status = "sent" if message_id is not None else "failed"
+        row = (status, time.time(), message_id, error_code, error, entry)
+        self._queue.put(("update", row, None))
+
+    def pending(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Returns the entries left pending by the previous run, as (entry, url, payload) tuples.
+        """
+        if not self._recovered:
+            return []
+        entries = []
+        with self._lock:
+            for entry in self._recovered:
+                row = self._db.execute(
+                    "SELECT url, payload FROM outbox WHERE id = ? AND status = 'pending'",
+                    (entry,),
+                ).fetchone()
+                if row is not None:
+                    entries.append((entry, row[0], json.loads(row[1])))
+        return entries
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of entries by status (pending, sent, failed)."""
+        self.flush()
+        with self._lock:
+            return dict(
+                self._db.execute(
+                    "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+                ).fetchall()
+            )
+
+    def flush(self) -> None:
+        """Waits until every write queued so far is committed."""
+        if self._closed:
+            return
+        committed = threading.Event()
+        self._queue.put(("flush", None, lambda error: committed.set()))
+        committed.wait()
+
+    def _commit(self, ops: List[Tuple[str, Any, Any]]) -> None:
+        inserts = [row for kind, row, _ in ops if kind == "insert"]
+        updates = [row for kind, row, _ in ops if kind == "update"]
+        error = None
+        try:
+            with self._lock, self._db:
+                if inserts:
+                    self._db.executemany(
+                        "INSERT INTO outbox (id, url, payload, status, created, updated) "
+                        "VALUES (?, ?, ?, 'pending', ?, ?)",
+                        inserts,
+                    )
+                if updates:
+                    self._db.executemany(
+                        "UPDATE outbox SET status = ?, updated = ?, message_id = ?, "
+                        "error_code = ?, error = ? WHERE id = ?",
+                        updates,
+                    )
+                self.commits += 1
+                # settled entries are purged from time to time instead of on every commit
+                if self.commits % 1000 == 0:
+                    self._db.execute(
+                        "DELETE FROM outbox WHERE status != 'pending' AND updated < ?",
+                        (time.time() - self.retention,),
+                    )
+        except Exception as e:
+            logging.error(f"Outbox {self.path}: commit failed ({e})")
+            error = e
+        for _, _, done in ops:
+            if done is not None:
+                done(error)
+
+    def _run(self) -> None:
+        while True:
+            ops = [self._queue.get()]
+            # everything queued while the previous batch was committing goes in this one
+            while len(ops) < self.batch_size:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(op is None for op in ops)
+            self._commit([op for op in ops if op is not None])
+            if stop:
+                return
+
+    def close(self) -> None:
+        """Commits the queued writes and closes the database."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            self._db.close()
+        atexit.unregister(self.close)
+
+
+def create_outbox(outbox: Union[Outbox, str, None]) -> Union[Outbox, None]:
+    """Builds the outbox of a client from its outbox argument: a path, or an Outbox."""
+    if outbox is None or isinstance(outbox, Outbox):
+        return outbox
+    return Outbox(outbox)
@@ -0,0 +1,144 @@
+"""
+Messages serialized once and sent to many recipients.
+
+send_template and send_custom_json build a new dict for every message, which the HTTP library
+then encodes to JSON from scratch. A PreparedMessage encodes its message once, with the recipient
+and the values marked with a Slot left as placeholders, and every send only splices the escaped
+recipient and values into the encoded bytes: nothing is built or encoded again, which matters
+when the same message goes to a large audience (see WhatsApp.send_prepared_bulk).
+"""
+
+import json
+import re
+import secrets
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, List, Union
+from .ext._payloads import template_message
+
+
+class Slot:
+    """
+    Placeholder of a value of a prepared message, filled in at every send.
+
+    Args:
+        name[str]: Name of the value, passed as a keyword argument when the message is sent
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"Slot({self.name!r})"
+
+
+class PreparedBody(bytes):
+    """JSON body of a prepared message for one recipient, sent as it is."""
+
+    # type of the message ("text", "template"...), for the metrics
+    type = ""
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, str):
+        return encode_basestring_ascii(value).encode()
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+class PreparedMessage:
+    """
+    Message encoded once, sent to any number of recipients.
+
+    The recipient ("to") is always a slot, the other values to fill in at every send are marked
+    with Slot(name), anywhere in the message: the text parameters of a template, the body of a
+    text... A slot takes any JSON value, usually a string.
+
+    Args:
+        message[dict]: Body of the message without the recipient, as sent by send_custom_json
+
+    Example:
+        >>> from whatsapp import PreparedMessage, Slot
+        >>> prepared = PreparedMessage.template(
+        ...     "order_shipped",
+        ...     [{"type": "body", "parameters": [{"type": "text", "text": Slot("name")}]}],
+        ... )
+        >>> prepared.render("5511999999999", name="Ana")
+    """
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self.type = str(message.get("type", ""))
+        # strings that can't appear in the message stand for the slots while it is encoded
+        marker = f"slot-{secrets.token_hex(8)}-"
+        slots: List[str] = []
+
+        def placeholder(value: Any) -> str:
+            if not isinstance(value, Slot):
+                raise TypeError(f"{type(value).__name__} is not JSON serializable")
+            slots.append(value.name)
+            return f"{marker}{len(slots) - 1}"
+
+        payload = {"messaging_product": "whatsapp", **message, "to": Slot("to")}
+        encoded = json.dumps(payload, default=placeholder, separators=(",", ":"))
+        # the placeholders are replaced with their quotes, the encoded value brings its own
+        parts = re.split(f'"{marker}(\\d+)"', encoded)
+        self.slots = tuple(slots[int(index)] for index in parts[1::2])
+        self._format = b"%s".join(
+            part.encode().replace(b"%", b"%%") for part in parts[::2]
+        )
+
+    @classmethod
+    def template(
+        cls, template: str, components: Any = None, lang: str = "en_US"
+    ) -> "PreparedMessage":
+        """
+        Prepares a template message, like send_template sends it.
+
+        Args:
+            template[str]: Template name to be sent to the users
+            components[list]: Components of the template, their parameters may be slots
+            lang[str]: Language of the template message
+        """
+        return cls(template_message(template, components, lang))
+
+    def render(self, to: str, **values: Any) -> PreparedBody:
+        """
+        Builds the body of the message for a recipient.
+
+        Args:
+            to[str]: Phone number of the recipient
+            **values: Value of every other slot of the message
+
+        Returns:
+            PreparedBody: The JSON body of the message
+        """
+        values["to"] = to
+        try:
+            encoded = tuple(_encode(values[name]) for name in self.slots)
+        except KeyError as e:
+            raise ValueError(f"No value for the slot {e.args[0]} of the message")
+        body = PreparedBody(self._format % encoded)
+        body.type = self.type
+        return body
+
+    def payload(self, to: str, **values: Any) -> Dict[str, Any]:
+        """Builds the message for a recipient as a dict, like send_custom_json sends it."""
+        return json.loads(self.render(to, **values))
+
+    def __repr__(self) -> str:
+        return f"<PreparedMessage {self.type} slots={sorted(set(self.slots))}>"
+
+
+def message_kwargs(client: Any, message: Union[Dict[str, Any], PreparedBody]) -> dict:
+    """
+    Arguments of the request sending a message built as a dict or a prepared body.
+
+    A prepared body is sent as it is, unless the client journals messages in an outbox or
+    coalesces them in batch calls: both need the message as a dict.
+    """
+    if not isinstance(message, PreparedBody):
+        return {"headers": client.headers, "json": message}
+    if client.outbox is not None or client.batcher is not None:
+        return {"headers": client.headers, "json": json.loads(message)}
+    return {"headers": client.headers, "data": message}
@@ -0,0 +1,188 @@
+"""
+Client-side throughput limits for outbound messages.
+
+Meta limits how many messages each business phone number can send per second, and answers with
+throttling errors (codes 4, 80007, 130429, 131056) once it is exceeded. A RateLimiter keeps one
+token bucket per phone number id, so the client waits for capacity instead of hitting those errors.
+The buckets are thread-safe and are shared by the sync and async clients using the same limiter.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Union
+from urllib.parse import urlsplit
+
+# default throughput of a WhatsApp business phone number, in messages per second
+DEFAULT_RATE = 80
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens per second, holding up to `burst` tokens.
+
+    Tokens are reserved immediately and the caller sleeps for the time the reservation needs
+    to be covered, so concurrent threads and coroutines are served in order without polling.
+
+    Args:
+        rate[float]: Tokens added per second
+        burst[int]: Maximum number of tokens, the requests that can be sent at once (default: rate)
+        clock[function]: Source of the current time (default: time.monotonic)
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Union[int, None] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.clock = clock
+        self._tokens = float(self.burst)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 1) -> float:
+        """
+        Takes `tokens` from the bucket.
+
+        Returns:
+            float: Seconds to wait before the tokens are available, 0 if they already are
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def refund(self, tokens: int = 1) -> None:
+        """Gives back tokens reserved by a caller that gave up waiting."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + tokens)
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Blocks until `tokens` are available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """
+        Waits without blocking the event loop until `tokens` are available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.refund(tokens)
+                raise
+        return delay
+
+
+class RateLimiter:
+    """
+    One token bucket per sender phone number id.
+
+    Args:
+        rate[float]: Messages per second allowed for each phone number (default: 80)
+        burst[int]: Messages that can be sent at once by each phone number (default: rate)
+        rates[dict]: Rate of specific phone number ids, for numbers with a higher throughput tier
+        clock[function]: Source of the current time of the buckets (default: time.monotonic)
+
+    Example:
+        >>> from whatsapp import WhatsApp, AsyncWhatsApp
+        >>> from whatsapp.ratelimit import RateLimiter
+        >>> limiter = RateLimiter(80)
+        >>> whatsapp = WhatsApp(token, phone_number_id, rate_limit=limiter)
+        >>> async_whatsapp = AsyncWhatsApp(token, phone_number_id, rate_limit=limiter)
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: Union[int, None] = None,
+        rates: Union[Dict[str, float], None] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.rates = {str(k): v for k, v in (rates or {}).items()}
+        self.clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = TokenBucket(
+                        self.rates.get(key, self.rate), self.burst, self.clock
+                    )
+                    self._buckets[key] = bucket
+        return bucket
+
+    def acquire(self, key: str) -> float:
+        """
+        Blocks until the phone number can send another message.
+
+        Args:
+            key[str]: Phone number id of the sender
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        return self.bucket(key).acquire()
+
+    async def acquire_async(self, key: str) -> float:
+        """
+        Waits until the phone number can send another message.
+
+        Args:
+            key[str]: Phone number id of the sender
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        return await self.bucket(key).acquire_async()
+
+
+def sender_of(url: str) -> Union[str, None]:
+    """
+    Returns the phone number id a request is sent from, None if the request does not send a message.
+
+    Every send url has the form {base_url}/{phone_number_id}/messages.
+    """
+    path = urlsplit(url).path.rstrip("/")
+    head, _, last = path.rpartition("/")
+    if last != "messages":
+        return None
+    return head.rpartition("/")[2] or None
+
+
+def create_limiter(
+    rate_limit: Union[float, RateLimiter, None], burst: Union[int, None] = None
+) -> Union[RateLimiter, None]:
+    """Builds the limiter of a client from its rate_limit argument."""
+    if rate_limit is None or isinstance(rate_limit, RateLimiter):
+        return rate_limit
+    return RateLimiter(rate_limit, burst)
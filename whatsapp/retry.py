@@ -0,0 +1,324 @@
+"""
+Retries of Graph API calls that failed for a transient reason.
+
+The errors worth retrying are taken from the taxonomy of whatsapp.errors: throttling, service
+unavailable, maintenance and "retry later" codes are retried, every other error code is returned
+to the caller at once. HTTP 429/5xx answers without a Graph error code and connection failures
+are retried too. Messages are not idempotent: a 500 answer or a connection lost mid-request may
+come after the API accepted the message, so messages are only retried on 429/503 answers and on
+connection failures raised before the request was sent (Transport.unsent). Delays grow exponentially with full jitter, a Retry-After header is honored,
+and an optional deadline bounds the total time spent on one request.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Tuple, Type, Union
+
+from .errors import (
+    pairings,
+    AppRateLimitException,
+    CoupleRateLimitException,
+    MaintenanceException,
+    RateLimitException,
+    RetryLaterException,
+    ServerTemporaryUnavailableException,
+    ServiceUnavailableException,
+    StreamThrottlingException,
+    UnknownAPIException,
+    UserRateLimitException,
+)
+
+# exceptions of whatsapp.errors raised for errors that may succeed if the request is sent again
+RETRYABLE_EXCEPTIONS: Tuple[Type[Exception], ...] = (
+    UnknownAPIException,
+    ServiceUnavailableException,
+    RateLimitException,
+    UserRateLimitException,
+    AppRateLimitException,
+    CoupleRateLimitException,
+    StreamThrottlingException,
+    MaintenanceException,
+    ServerTemporaryUnavailableException,
+    RetryLaterException,
+)
+
+# HTTP statuses retried when the body has no Graph error code
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# statuses of a message that was not processed, the others may come after it was sent
+MESSAGE_RETRY_STATUSES = (429, 503)
+
+
+class RetryStats:
+    """
+    Counters of a retry policy, shared by every request using it.
+
+    Attributes:
+        requests[int]: Requests sent through the policy
+        retries[int]: Attempts sent again after a transient failure
+        gave_up[int]: Requests that still failed after the last attempt
+        deadline_exceeded[int]: Requests not retried because the deadline would be exceeded
+        backoff_seconds[float]: Total time spent waiting between attempts
+        reasons[dict]: Number of retries by reason ("code 4", "status 503", "ConnectionError"...)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.gave_up = 0
+        self.deadline_exceeded = 0
+        self.backoff_seconds = 0.0
+        self.reasons: Dict[str, int] = {}
+
+    def retried(self, reason: str, delay: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns a copy of the counters"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "gave_up": self.gave_up,
+                "deadline_exceeded": self.deadline_exceeded,
+                "backoff_seconds": self.backoff_seconds,
+                "reasons": dict(self.reasons),
+            }
+
+
+class RetryPolicy:
+    """
+    When and how long to wait before sending a failed request again.
+
+    Args:
+        max_attempts[int]: Maximum number of attempts, including the first one (default: 4)
+        base_delay[float]: Delay before the first retry, doubled for every further retry (default: 0.5)
+        max_delay[float]: Maximum delay between two attempts (default: 30)
+        deadline[float]: Maximum seconds spent on one request including retries, None for no deadline (default: None)
+        retryable[tuple]: Exceptions of whatsapp.errors whose codes are retried (default: RETRYABLE_EXCEPTIONS)
+        statuses[tuple]: HTTP statuses retried when the answer has no error code (default: 429, 500, 502, 503, 504)
+        message_statuses[tuple]: HTTP statuses retried for messages when the answer has no error code (default: 429, 503)
+        respect_retry_after[bool]: Wait for the time given by the Retry-After header if there is one (default: True)
+
+    Example:
+        >>> from whatsapp import WhatsApp
+        >>> from whatsapp.retry import RetryPolicy
+        >>> whatsapp = WhatsApp(token, phone_number_id, retry=RetryPolicy(max_attempts=5, deadline=60))
+        >>> whatsapp.retry_policy.stats.snapshot()
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        deadline: Union[float, None] = None,
+        retryable: Tuple[Type[Exception], ...] = RETRYABLE_EXCEPTIONS,
+        statuses: Tuple[int, ...] = RETRY_STATUSES,
+        respect_retry_after: bool = True,
+        message_statuses: Tuple[int, ...] = MESSAGE_RETRY_STATUSES,
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retryable = retryable
+        self.statuses = statuses
+        self.message_statuses = message_statuses
+        self.respect_retry_after = respect_retry_after
+        self.stats = RetryStats()
+
+    def is_retryable_code(self, code: Any) -> bool:
+        """
+        Whether a Graph API error code is transient.
+
+        Args:
+            code[int]: The error code of the answer
+        """
+        exception = pairings.get(code)
+        return exception is not None and issubclass(exception, self.retryable)
+
+    def reason(self, status: int, body: Any, message: bool = False) -> Union[str, None]:
+        """
+        Why a failed answer should be retried, None if it should not.
+
+        Args:
+            status[int]: HTTP status of the answer
+            body[dict]: Decoded body of the answer
+            message[bool]: Whether the request sends a message, retried on message_statuses only
+        """
+        if 200 <= status < 300:
+            return None
+        error = body.get("error") if isinstance(body, dict) else None
+        code = error.get("code") if isinstance(error, dict) else None
+        if code is not None:
+            return f"code {code}" if self.is_retryable_code(code) else None
+        if status in (self.message_statuses if message else self.statuses):
+            return f"status {status}"
+        return None
+
+    def backoff(self, retry: int) -> float:
+        """
+        Jittered exponential delay before the given retry (0 for the first one).
+
+        The delay is drawn uniformly between 0 and base_delay * 2 ** retry, capped to max_delay,
+        so clients throttled at the same time do not retry at the same time.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+    def start(self, message: bool = False) -> "RetryState":
+        """
+        Returns the state of a new request.
+
+        Args:
+            message[bool]: Whether the request sends a message (default: False)
+        """
+        with self.stats._lock:
+            self.stats.requests += 1
+        return RetryState(self, message)
+
+
+def retry_after(value: Union[str, None]) -> Union[float, None]:
+    """
+    Parses a Retry-After header, given in seconds or as an HTTP date.
+
+    Returns:
+        float: Seconds to wait, None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryState:
+    """
+    Attempts of one request. The transports call `response()` or `error()` after every attempt
+    and sleep for the returned delay, or stop when it returns None.
+    """
+
+    __slots__ = ("policy", "message", "attempt", "started")
+
+    def __init__(self, policy: RetryPolicy, message: bool = False):
+        self.policy = policy
+        self.message = message
+        self.attempt = 1
+        self.started = time.monotonic()
+
+    def remaining(self) -> Union[float, None]:
+        """Seconds left before the deadline, None if the policy has no deadline"""
+        if self.policy.deadline is None:
+            return None
+        return max(0.0, self.policy.deadline - (time.monotonic() - self.started))
+
+    def timeout(self, timeout: float) -> float:
+        """Timeout of the next attempt: the client timeout, shortened to end at the deadline"""
+        remaining = self.remaining()
+        if remaining is None or (timeout is not None and timeout < remaining):
+            return timeout
+        return remaining
+
+    def response(
+        self, status: int, body: Any, headers: Any = None
+    ) -> Union[float, None]:
+        """
+        Decides whether to retry after an answer.
+
+        Args:
+            status[int]: HTTP status of the answer
+            body[dict]: Decoded body of the answer, only needed if the status is not 2xx
+            headers[dict]: Headers of the answer
+
+        Returns:
+            float: Seconds to wait before the next attempt, None to return the answer
+        """
+        reason = self.policy.reason(status, body, self.message)
+        if reason is None:
+            return None
+        wait = None
+        if self.policy.respect_retry_after and headers is not None:
+            wait = retry_after(headers.get("Retry-After"))
+        return self.next(reason, wait)
+
+    def error(self, error: Exception) -> Union[float, None]:
+        """
+        Decides whether to retry after a connection error. Only call it for errors raised
+        before the request could reach the API, and for a message only if it was not sent.
+
+        Returns:
+            float: Seconds to wait before the next attempt, None to raise the error
+        """
+        return self.next(type(error).__name__)
+
+    def next(self, reason: str, wait: Union[float, None] = None) -> Union[float, None]:
+        policy = self.policy
+        stats = policy.stats
+        # a Retry-After longer than max_delay is not shortened, the answer is returned instead
+        if self.attempt >= policy.max_attempts or (
+            wait is not None and wait > policy.max_delay
+        ):
+            with stats._lock:
+                stats.gave_up += 1
+            return None
+        delay = wait if wait is not None else policy.backoff(self.attempt - 1)
+        remaining = self.remaining()
+        if remaining is not None and delay >= remaining:
+            with stats._lock:
+                stats.deadline_exceeded += 1
+                stats.gave_up += 1
+            return None
+        self.attempt += 1
+        stats.retried(reason, delay)
+        return delay
+
+
+def create_policy(retry: Union[int, RetryPolicy, None]) -> Union[RetryPolicy, None]:
+    """Builds the retry policy of a client from its retry argument (a number of retries or a policy)."""
+    if retry is None or isinstance(retry, RetryPolicy):
+        return retry
+    if retry <= 0:
+        return None
+    return RetryPolicy(max_attempts=retry + 1)
+
+
+def body_factory(data: Any) -> Union[Callable[[], Any], None]:
+    """
+    Returns a function giving the body of every attempt of a request, None if the body
+    can only be sent once.
+
+    Bytes, strings and dicts are sent again as they are, seekable files are rewound to their
+    initial position, and a function is called again so streamed bodies (multipart encoders)
+    are rebuilt for every attempt.
+    """
+    if callable(data):
+        return data
+    if hasattr(data, "__next__") or hasattr(data, "__anext__"):
+        return None
+    if hasattr(data, "read"):
+        try:
+            if not data.seekable():
+                return None
+            position = data.tell()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+        def rewind():
+            data.seek(position)
+            return data
+
+        return rewind
+    return lambda: data
@@ -0,0 +1,569 @@
+"""
+HTTP transports of the clients.
+
+Every request of a client goes through its transport: WhatsApp sends with a Transport and
+AsyncWhatsApp with an AsyncTransport. The rate limiter, retry policy, metrics, outbox and batching
+sit above the transport, in the request chain of the client, so they behave the same whatever the
+HTTP stack. The stack is picked with the transport argument of the clients:
+
+    "requests"  RequestsTransport, the pooled requests session (default of WhatsApp)
+    "aiohttp"   AiohttpTransport, the shared aiohttp session (default of AsyncWhatsApp)
+    "httpx"     HttpxTransport and AsyncHttpxTransport, over HTTP/2 when the h2 package is installed
+                (pip install whatsapp-python[httpx])
+
+AsyncHttpxTransport is slower than aiohttp: the async connection pool of httpx is several times
+slower per request over HTTP/1.1, and slows down further as requests pile up (see the transport
+benchmark). Prefer it only for its HTTP/2 multiplexing, or to share an httpx stack with the app.
+
+Any other HTTP library can be plugged in by subclassing Transport or AsyncTransport.
+"""
+
+import asyncio
+import importlib.util
+import json
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Tuple, Union
+
+if TYPE_CHECKING:
+    import aiohttp
+    import httpx
+    import requests
+
+# size of the chunks read from file objects sent as request bodies
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def http2_available() -> bool:
+    """Whether httpx can speak HTTP/2 (it needs the h2 package)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class BufferedResponse:
+    """
+    Response whose body is already read, with the interface of an aiohttp response.
+
+    Attributes:
+        status[int]: HTTP status of the answer
+        url[str]: Url of the request
+        headers[dict]: Headers of the answer
+    """
+
+    __slots__ = ("status", "url", "headers", "_body")
+
+    def __init__(
+        self, status: int, body: bytes, url: str, headers: Union[Any, None] = None
+    ):
+        self.status = status
+        self.url = url
+        self.headers = (
+            headers if headers is not None else {"Content-Type": "application/json"}
+        )
+        self._body = body
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        return self._body.decode(encoding)
+
+    async def json(self, content_type: Union[str, None] = None, **kwargs) -> Any:
+        return json.loads(self._body)
+
+
+class Transport:
+    """
+    Sends the HTTP requests of a WhatsApp client. Subclass it to use another HTTP library.
+
+    Attributes:
+        connection_errors[tuple]: Exceptions raised when a request could not be sent, retried by the retry policy
+        timeout_errors[tuple]: Connection errors that may happen after the request reached the API, never retried
+        unsent_errors[tuple]: Connection errors raised before the request was sent, the only ones retried for messages
+    """
+
+    connection_errors: Tuple[type, ...] = ()
+    timeout_errors: Tuple[type, ...] = ()
+    unsent_errors: Tuple[type, ...] = ()
+
+    def unsent(self, error: Exception) -> bool:
+        """Whether a connection error was raised before the request was sent, so a message can be sent again."""
+        return isinstance(error, self.unsent_errors)
+
+    def send(self, method: str, url: str, kwargs: Dict[str, Any]) -> Any:
+        """
+        Sends one request.
+
+        Args:
+            method[str]: HTTP method (GET, POST, DELETE...)
+            url[str]: Full url of the request
+            kwargs[dict]: headers, json, data (bytes, a form dict, a file object or an iterable of bytes), timeout (seconds) and stream (return before the body is read)
+
+        Returns:
+            requests.Response: Or any object with its status_code, ok, headers, content, json(), iter_content() and close()
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Releases the connections of the transport."""
+
+
+class AsyncTransport:
+    """
+    Sends the HTTP requests of an AsyncWhatsApp client. Subclass it to use another HTTP library.
+
+    Attributes:
+        connection_errors[tuple]: Exceptions raised when a request could not be sent, retried by the retry policy
+        timeout_errors[tuple]: Connection errors that may happen after the request reached the API, never retried
+        unsent_errors[tuple]: Connection errors raised before the request was sent, the only ones retried for messages
+    """
+
+    connection_errors: Tuple[type, ...] = ()
+    timeout_errors: Tuple[type, ...] = ()
+    unsent_errors: Tuple[type, ...] = ()
+
+    def unsent(self, error: Exception) -> bool:
+        """Whether a connection error was raised before the request was sent, so a message can be sent again."""
+        return isinstance(error, self.unsent_errors)
+
+    async def send(self, method: str, url: str, kwargs: Dict[str, Any]) -> Any:
+        """
+        Sends one request and reads the body of the answer.
+
+        Args:
+            method[str]: HTTP method (GET, POST, DELETE...)
+            url[str]: Full url of the request
+            kwargs[dict]: headers, json, data (bytes, a form dict or an async iterable of bytes) and timeout (seconds)
+
+        Returns:
+            aiohttp.ClientResponse: Released, or any object with its status, ok, headers, text() and json()
+        """
+        raise NotImplementedError
+
+    def stream(self, method: str, url: str, kwargs: Dict[str, Any]) -> Any:
+        """
+        Sends one request and yields the answer before its body is read.
+
+        Returns:
+            An async context manager yielding a response like send(), whose body is read with response.content.iter_chunked(size)
+        """
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        """Releases the connections of the transport."""
+
+
+def _session_of(session: Any) -> Any:
+    # a session, or a function returning the current one
+    return session() if callable(session) else session
+
+
+class RequestsTransport(Transport):
+    """
+    Transport sending with a requests session.
+
+    Args:
+        session[requests.Session | function]: Session to send with, or a function returning it (default: a new pooled session)
+    """
+
+    def __init__(self, session: Union[Any, Callable[[], Any], None] = None):
+        self._owned = session is None
+        if session is None:
+            from .ext._session import create_session
+
+            session = create_session()
+        self._session = session
+
+    @property
+    def session(self) -> "requests.Session":
+        return _session_of(self._session)
+
+    @property
+    def connection_errors(self) -> Tuple[type, ...]:
+        import requests
+
+        return (requests.ConnectionError,)
+
+    def unsent(self, error: Exception) -> bool:
+        import requests
+        from urllib3.exceptions import NewConnectionError
+
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        # requests wraps the urllib3 error raised when the connection could not be opened
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    def send(
+        self, method: str, url: str, kwargs: Dict[str, Any]
+    ) -> "requests.Response":
+        return self.session.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        if self._owned:
+            self.session.close()
+
+
+def _httpx_options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Translates the arguments of a requests or aiohttp call into those of httpx.build_request."""
+    options: Dict[str, Any] = {}
+    headers = kwargs.get("headers")
+    if headers is not None:
+        options["headers"] = headers
+    if "json" in kwargs:
+        options["json"] = kwargs["json"]
+    if "timeout" in kwargs:
+        options["timeout"] = kwargs["timeout"]
+    data = kwargs.get("data")
+    if isinstance(data, dict):
+        options["data"] = data
+    elif data is not None:
+        if hasattr(data, "read"):
+            # file objects and streaming encoders (MultipartEncoder) are sent in chunks
+            length = getattr(data, "len", None)
+            if length is not None:
+                options["headers"] = dict(
+                    headers or {}, **{"Content-Length": str(length)}
+                )
+            options["content"] = iter(lambda: data.read(UPLOAD_CHUNK_SIZE), b"")
+        else:
+            options["content"] = data
+    return options
+
+
+class HttpxResponse:
+    """Answer of HttpxTransport, with the interface of a requests response."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: "httpx.Response"):
+        self.raw = raw
+
+    @property
+    def status_code(self) -> int:
+        return self.raw.status_code
+
+    @property
+    def ok(self) -> bool:
+        return self.raw.status_code < 400
+
+    @property
+    def headers(self) -> Any:
+        return self.raw.headers
+
+    @property
+    def url(self) -> str:
+        return str(self.raw.url)
+
+    @property
+    def http_version(self) -> str:
+        return self.raw.http_version
+
+    @property
+    def content(self) -> bytes:
+        return self.raw.read()
+
+    @property
+    def text(self) -> str:
+        self.raw.read()
+        return self.raw.text
+
+    def json(self, **kwargs) -> Any:
+        return json.loads(self.content, **kwargs)
+
+    def iter_content(self, chunk_size: int = 1) -> Any:
+        return self.raw.iter_bytes(chunk_size)
+
+    def close(self) -> None:
+        self.raw.close()
+
+    def __enter__(self) -> "HttpxResponse":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class HttpxTransport(Transport):
+    """
+    Transport sending with an httpx client, over HTTP/2 by default: every request is multiplexed
+    on one connection per host instead of taking a connection of the pool.
+
+    Args:
+        http2[bool]: Use HTTP/2, needs the h2 package (default: True)
+        max_connections[int]: Maximum number of connections (default: 10)
+        client[httpx.Client]: Client to send with, instead of a new one
+        **options: Any other argument of httpx.Client
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 10,
+        client: Union["httpx.Client", None] = None,
+        **options,
+    ):
+        import httpx
+
+        self._owned = client is None
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            )
+            client = httpx.Client(http2=http2, limits=limits, **options)
+        self.client = client
+        self.connection_errors = (httpx.TransportError,)
+        self.timeout_errors = (httpx.ReadTimeout, httpx.WriteTimeout)
+        self.unsent_errors = (
+            httpx.ConnectError,
+            httpx.ConnectTimeout,
+            httpx.PoolTimeout,
+        )
+
+    def send(self, method: str, url: str, kwargs: Dict[str, Any]) -> HttpxResponse:
+        request = self.client.build_request(method, url, **_httpx_options(kwargs))
+        return HttpxResponse(
+            self.client.send(request, stream=bool(kwargs.get("stream")))
+        )
+
+    def close(self) -> None:
+        if self._owned:
+            self.client.close()
+
+
+class AiohttpTransport(AsyncTransport):
+    """
+    Transport sending with an aiohttp session.
+
+    Args:
+        session[aiohttp.ClientSession | function]: Session to send with, or a function returning the one of the running event loop (default: a new session per event loop, closed by aclose())
+    """
+
+    def __init__(self, session: Union[Any, Callable[[], Any], None] = None):
+        self._session = session
+        self._owned: Any = None
+        self._loop: Any = None
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        if self._session is not None:
+            return _session_of(self._session)
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._owned is None or self._owned.closed or self._loop is not loop:
+            self._owned, self._loop = aiohttp.ClientSession(), loop
+        return self._owned
+
+    @property
+    def connection_errors(self) -> Tuple[type, ...]:
+        import aiohttp
+
+        return (aiohttp.ClientConnectionError,)
+
+    @property
+    def timeout_errors(self) -> Tuple[type, ...]:
+        return (asyncio.TimeoutError,)
+
+    @property
+    def unsent_errors(self) -> Tuple[type, ...]:
+        import aiohttp
+
+        return (aiohttp.ClientConnectorError,)
+
+    @staticmethod
+    def _options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        timeout = kwargs.get("timeout")
+        if isinstance(timeout, (int, float)):
+            import aiohttp
+
+            kwargs = dict(kwargs, timeout=aiohttp.ClientTimeout(total=timeout))
+        return kwargs
+
+    async def send(
+        self, method: str, url: str, kwargs: Dict[str, Any]
+    ) -> "aiohttp.ClientResponse":
+        async with self.session.request(method, url, **self._options(kwargs)) as r:
+            await r.read()
+            return r
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, url: str, kwargs: Dict[str, Any]
+    ) -> AsyncIterator["aiohttp.ClientResponse"]:
+        async with self.session.request(method, url, **self._options(kwargs)) as r:
+            yield r
+
+    async def aclose(self) -> None:
+        if self._owned is not None and not self._owned.closed:
+            await self._owned.close()
+        self._owned = self._loop = None
+
+
+class _Chunks:
+    """response.content of a streamed httpx answer, read like an aiohttp StreamReader."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: "httpx.Response"):
+        self.raw = raw
+
+    def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        return self.raw.aiter_bytes(size)
+
+    async def read(self) -> bytes:
+        return await self.raw.aread()
+
+
+class HttpxStreamedResponse:
+    """Streamed answer of AsyncHttpxTransport, with the interface of an aiohttp response."""
+
+    __slots__ = ("raw", "content")
+
+    def __init__(self, raw: "httpx.Response"):
+        self.raw = raw
+        self.content = _Chunks(raw)
+
+    @property
+    def status(self) -> int:
+        return self.raw.status_code
+
+    @property
+    def ok(self) -> bool:
+        return self.raw.status_code < 400
+
+    @property
+    def headers(self) -> Any:
+        return self.raw.headers
+
+    async def read(self) -> bytes:
+        return await self.raw.aread()
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        return (await self.raw.aread()).decode(encoding)
+
+    async def json(self, content_type: Union[str, None] = None, **kwargs) -> Any:
+        return json.loads(await self.raw.aread())
+
+
+class AsyncHttpxTransport(AsyncTransport):
+    """
+    Transport sending with an httpx async client, over HTTP/2 by default: every request is
+    multiplexed on one connection per host instead of taking a connection of the pool.
+    It sends fewer messages per second than AiohttpTransport, see the module docstring.
+
+    Args:
+        http2[bool]: Use HTTP/2, needs the h2 package (default: True)
+        max_connections[int]: Maximum number of connections (default: 100)
+        timeout[float]: Default timeout of the requests, in seconds (default: 10)
+        **options: Any other argument of httpx.AsyncClient
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 100,
+        timeout: float = 10,
+        **options,
+    ):
+        import httpx
+
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.options = options
+        self.connection_errors = (httpx.TransportError,)
+        self.timeout_errors = (httpx.ReadTimeout, httpx.WriteTimeout)
+        self.unsent_errors = (
+            httpx.ConnectError,
+            httpx.ConnectTimeout,
+            httpx.PoolTimeout,
+        )
+        self._client: Any = None
+        self._loop: Any = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """Client of the running event loop, created on first use."""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            )
+            self._client = httpx.AsyncClient(
+                http2=self.http2, limits=limits, timeout=self.timeout, **self.options
+            )
+            self._loop = loop
+        return self._client
+
+    async def send(
+        self, method: str, url: str, kwargs: Dict[str, Any]
+    ) -> BufferedResponse:
+        client = self.client
+        r = await client.send(
+            client.build_request(method, url, **_httpx_options(kwargs))
+        )
+        return BufferedResponse(r.status_code, r.content, str(r.url), r.headers)
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, url: str, kwargs: Dict[str, Any]
+    ) -> AsyncIterator[HttpxStreamedResponse]:
+        client = self.client
+        r = await client.send(
+            client.build_request(method, url, **_httpx_options(kwargs)), stream=True
+        )
+        try:
+            yield HttpxStreamedResponse(r)
+        finally:
+            await r.aclose()
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = self._loop = None
+
+
+def create_transport(
+    transport: Union[Transport, str, None],
+    session: Callable[[], Any],
+    max_connections: int,
+) -> Transport:
+    """
+    Builds the transport of a WhatsApp client from its transport argument:
+    "requests" (the session returned by session), "httpx", or a Transport.
+    """
+    if transport is None or transport == "requests":
+        return RequestsTransport(session)
+    if transport == "httpx":
+        return HttpxTransport(http2=http2_available(), max_connections=max_connections)
+    if isinstance(transport, str):
+        raise ValueError(f"Unknown transport {transport}, use requests or httpx")
+    return transport
+
+
+def create_async_transport(
+    transport: Union[AsyncTransport, str, None],
+    session: Callable[[], Any],
+    max_connections: int,
+    timeout: float,
+) -> AsyncTransport:
+    """
+    Builds the transport of an AsyncWhatsApp client from its transport argument:
+    "aiohttp" (the session returned by session), "httpx", or an AsyncTransport.
+    """
+    if transport is None or transport == "aiohttp":
+        return AiohttpTransport(session)
+    if transport == "httpx":
+        return AsyncHttpxTransport(
+            http2=http2_available(), max_connections=max_connections, timeout=timeout
+        )
+    if isinstance(transport, str):
+        raise ValueError(f"Unknown transport {transport}, use aiohttp or httpx")
+    return transport